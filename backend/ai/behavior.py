@@ -1,66 +1,57 @@
-import time
-from collections import defaultdict
+import numpy as np
+
+from backend.ai.rules import DEFAULT_RULES, LoiteringRules
+from backend.ai.tracker import IoUTracker
 
 class BehaviorAnalyzer:
-    def __init__(self):
-        # Track person movement: {track_id: [(timestamp, x, y), ...]}
-        self.tracks = defaultdict(list)
-        self.loitering_threshold = 10  # seconds
-        self.movement_threshold = 50   # pixels
-        
+    def __init__(self, loitering_threshold=10, movement_threshold=50, rules=None):
+        self.movement_threshold = movement_threshold    # pixels
+        # Track person movement across frames (persistent IDs, bounded history)
+        self.tracker = IoUTracker(movement_threshold=movement_threshold)
+        if rules is None:
+            default = DEFAULT_RULES["rules"][1]
+            rules = LoiteringRules([{**default, "confirm": float(loitering_threshold)}])
+        self.set_rules(rules)
+
+    def set_rules(self, rules, movement_threshold=None):
+        """Swaps in compiled loitering rules (and the stationary radius); tracks and their history are kept."""
+        self.rules = rules
+        self._seconds = np.array(rules.seconds, dtype=np.float64)
+        self.loitering_threshold = rules.seconds[0] if len(rules) else None # seconds, shortest rule
+        if movement_threshold is not None:
+            self.movement_threshold = self.tracker.movement_threshold = movement_threshold
+
     def analyze(self, detections, timestamp):
         """Analyzes detections to identify suspicious behaviors."""
         incidents = []
-        current_ids = set()
-        
-        for det in detections:
-            if det['class'] == 'person':
-                # Simplified tracking (real system would use ByteTrack ID)
-                # Here we use a dummy ID for demonstration
-                track_id = hash(tuple(det['bbox'])) 
-                current_ids.add(track_id)
-                
-                center_x = (det['bbox'][0] + det['bbox'][2]) / 2
-                center_y = (det['bbox'][1] + det['bbox'][3]) / 2
-                
-                self.tracks[track_id].append((timestamp, center_x, center_y))
-                
-                # Analyze Loitering
-                if self._is_loitering(track_id):
+        persons = [det for det in detections if det['class'] == 'person']
+        boxes = np.array([det['bbox'] for det in persons], dtype=np.float32).reshape(-1, 4)
+        slots = self.tracker.update(boxes, timestamp)
+        slots = slots[slots >= 0]
+
+        # Analyze Loitering: stayed within movement_threshold of one spot for longer than a rule's time.
+        # Each rule is reported once per stationary episode; moving away re-arms the track.
+        rules, seconds = self.rules, self._seconds
+        if slots.size and seconds.size:
+            dwell = self.tracker.dwell(slots, timestamp)
+            reached = np.searchsorted(seconds, dwell, side="left") # Rules whose time has passed
+            new = reached > self.tracker.flagged[slots]
+            if new.any():
+                active = rules.schedule.active(timestamp)
+                for slot, level, stayed in zip(slots[new], reached[new].tolist(), dwell[new].tolist()):
+                    self.tracker.flagged[slot] = level
+                    rule = level - 1 # Only the longest rule reached, if several were crossed at once
+                    if not active[rule]:
+                        continue
                     incidents.append({
-                        "type": "Loitering",
-                        "severity": "Medium",
-                        "description": f"Person (ID: {track_id}) detected in zone for over {self.loitering_threshold}s."
+                        "type": rules.types[rule],
+                        "severity": rules.severity(rule, stayed),
+                        "description": f"Person (ID: {self.tracker.ids[slot]}) detected in zone for over {rules.seconds[rule]:g}s."
                     })
-                    
+
         # Analyze Aggressive Movement (placeholder logic)
         # In a real system, we'd check velocity and sudden changes in trajectory or proximity between persons
-        
-        # Cleanup old tracks
-        self._cleanup_tracks(current_ids)
-        
-        return incidents
 
-    def _is_loitering(self, track_id):
-        track = self.tracks[track_id]
-        if len(track) < 2:
-            return False
-            
-        duration = track[-1][0] - track[0][0]
-        if duration > self.loitering_threshold:
-            # Check if person moved significantly
-            start_pos = (track[0][1], track[0][2])
-            end_pos = (track[-1][1], track[-1][2])
-            dist = ((start_pos[0] - end_pos[0])**2 + (start_pos[1] - end_pos[1])**2)**0.5
-            
-            if dist < self.movement_threshold:
-                return True
-        return False
-
-    def _cleanup_tracks(self, current_ids):
-        # Remove tracks not present in current frame
-        keys_to_remove = [k for k in self.tracks if k not in current_ids]
-        for k in keys_to_remove:
-            del self.tracks[k]
+        return incidents
 
 behavior_analyzer = BehaviorAnalyzer()
@@ -0,0 +1,199 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from backend import config
+from backend.ai.processor import AIProcessor, HAS_AI_LIBS
+from backend.ai.rules import load_rules
+from backend.ai.zones import load_zones
+
+logger = logging.getLogger(__name__)
+
+# Key used for the local capture pipeline when no camera rows exist yet
+LOCAL_CAMERA_ID = "WEB-01"
+
+
+def parse_source(source_url):
+    """Maps a `Camera.source_url` to something cv2.VideoCapture accepts."""
+    if source_url is None:
+        return None
+    source_url = str(source_url).strip()
+    if not source_url:
+        return None
+    if source_url.isdigit():
+        return int(source_url) # Local device index, e.g. "0"
+    return source_url
+
+
+class CameraPool:
+    """Starts, stops and supervises one AIProcessor pipeline per camera.
+
+    Capture and scheduling run on threads per camera (they mostly wait on
+    I/O or the clock), while analysis and JPEG encode for every camera share
+    one bounded worker pool so CPU work scales with cores instead of with the
+    number of streams. With SENTINEL_CAMERA_MODE=process each camera runs in
+    its own worker process instead (see `backend.ai.worker`).
+    """
+
+    def __init__(self, max_workers=None, supervise_interval=None):
+        self.max_workers = max_workers or config.MAX_WORKERS
+        self.supervise_interval = supervise_interval or config.SUPERVISE_INTERVAL
+        self.executor = None
+        self.loop = None
+        self.callbacks = {}
+        self.pipelines = {} # camera_id -> AIProcessor
+        self.sources = {}   # camera_id -> (source, owner_id)
+        self.lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._supervisor = None
+        self.detection = None # Shared DetectionScheduler, batches inference across cameras
+
+    def configure(self, broadcast_callback=None, save_incident_callback=None, realtime_callback=None,
+                  update_incident_callback=None, status_callback=None):
+        self.callbacks = {
+            "broadcast_callback": broadcast_callback,
+            "save_incident_callback": save_incident_callback,
+            "realtime_callback": realtime_callback,
+            "update_incident_callback": update_incident_callback,
+            "status_callback": status_callback,
+        }
+
+    @property
+    def is_running(self):
+        return self.executor is not None
+
+    def start(self, cameras, loop=None):
+        """Spins up the worker pool and one pipeline per `Camera` row."""
+        with self.lock:
+            if self.is_running:
+                return
+            self.loop = loop
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="camera-worker")
+            self._start_detection()
+            self._stop_event.clear()
+
+            for cam in cameras:
+                self.attach_camera(cam)
+            if not self.pipelines:
+                # Preserve the single-webcam behaviour on a fresh install
+                self.attach(LOCAL_CAMERA_ID, parse_source(config.DEFAULT_SOURCE))
+
+        self._supervisor = threading.Thread(target=self._supervise, name="camera-supervisor", daemon=True)
+        self._supervisor.start()
+        logger.info(f"Camera pool started: {len(self.pipelines)} pipeline(s), {self.max_workers} worker(s).")
+
+    def _start_detection(self):
+        if not HAS_AI_LIBS or config.CAMERA_MODE == "process":
+            return # Worker processes run their own detector
+        from backend.ai.detector import DetectionScheduler, create_detector
+        detector = create_detector()
+        if detector is None:
+            logger.info("Object detection disabled; running motion analysis only.")
+            return
+        self.detection = DetectionScheduler(detector)
+        self.detection.start()
+        logger.info(f"Object detection enabled ({detector.name}, batch <= {self.detection.max_batch}).")
+
+    def attach_camera(self, camera):
+        source = parse_source(camera.source_url)
+        if source is not None and LOCAL_CAMERA_ID in self.sources:
+            # The fresh-install webcam fallback gives way (and the device) to the first real camera
+            self.detach(LOCAL_CAMERA_ID)
+        return self.attach(str(camera.id), source, camera.owner_id or "admin",
+                           zones=load_zones(camera.zones), rules=load_rules(getattr(camera, "rules", None)),
+                           target_fps=getattr(camera, "analysis_fps", None))
+
+    def attach(self, camera_id, source, owner_id="admin", zones=None, rules=None, target_fps=None):
+        """Hot-attaches a pipeline. Replaces any existing one with the same id."""
+        if source is None:
+            logger.warning(f"Camera {camera_id} has no source configured; not attaching.")
+            return None
+        with self.lock:
+            self.detach(camera_id)
+            self.sources[camera_id] = (source, owner_id)
+            if not self.is_running:
+                return None
+            if config.CAMERA_MODE == "process":
+                from backend.ai.worker import CameraWorker # Needs OpenCV/NumPy for shared memory frames
+                processor = CameraWorker(loop=self.loop, zones=zones, rules=rules, target_fps=target_fps,
+                                         **self.callbacks)
+            else:
+                processor = AIProcessor(executor=self.executor, loop=self.loop, detector=self.detection, zones=zones,
+                                        rules=rules, target_fps=target_fps, **self.callbacks)
+            processor.start_feed(source=source, camera_id=camera_id, owner_id=owner_id)
+            self.pipelines[camera_id] = processor
+        logger.info(f"Attached camera pipeline {camera_id} ({source}).")
+        return processor
+
+    def detach(self, camera_id):
+        with self.lock:
+            self.sources.pop(camera_id, None)
+            processor = self.pipelines.pop(camera_id, None)
+        if processor is not None:
+            processor.stop()
+            logger.info(f"Detached camera pipeline {camera_id}.")
+        return processor is not None
+
+    def set_zones(self, camera_id, zones):
+        """Pushes edited zones to a running pipeline. Returns False if it is not running."""
+        processor = self.get(camera_id)
+        if processor is None:
+            return False
+        processor.set_zones(zones)
+        return True
+
+    def set_rules(self, camera_id, rules):
+        """Pushes edited rules to a running pipeline without restarting it. Returns False if it is not running."""
+        processor = self.get(camera_id)
+        if processor is None:
+            return False
+        processor.set_rules(rules)
+        return True
+
+    def get(self, camera_id):
+        return self.pipelines.get(str(camera_id))
+
+    # The read paths below run on the event loop, so they never take `lock`: a restart or detach
+    # can hold it for seconds. Copying the dict is atomic under the GIL.
+
+    def stats(self):
+        """Per-stage timing and drop counters for every pipeline."""
+        return {camera_id: p.pipeline_stats() for camera_id, p in self.pipelines.copy().items()}
+
+    def health(self):
+        """Liveness per camera: thread state, age of the last frame and frame rates."""
+        return {camera_id: p.health() for camera_id, p in self.pipelines.copy().items()}
+
+    def default(self):
+        """The first attached pipeline; backs the legacy `/video_feed` endpoint."""
+        return next(iter(self.pipelines.copy().values()), None)
+
+    def _supervise(self):
+        while not self._stop_event.wait(self.supervise_interval):
+            with self.lock:
+                dead = [(cid, p) for cid, p in self.pipelines.items() if not p.is_alive()]
+            # Restarting a worker process can take seconds; attach/detach must not wait on it
+            for camera_id, processor in dead:
+                logger.warning(f"Camera pipeline {camera_id} died; restarting.")
+                processor.restart()
+                with self.lock:
+                    detached = self.pipelines.get(camera_id) is not processor
+                if detached:
+                    processor.stop() # Detached or replaced meanwhile: don't leave it running
+
+    def shutdown(self):
+        self._stop_event.set()
+        with self.lock:
+            processors = list(self.pipelines.values())
+            self.pipelines.clear()
+            executor, self.executor = self.executor, None
+        for processor in processors:
+            processor.stop()
+        if executor is not None:
+            executor.shutdown(wait=False)
+        if self.detection is not None:
+            self.detection.stop()
+            self.detection = None
+
+
+camera_pool = CameraPool()
@@ -0,0 +1,94 @@
+import functools
+import logging
+import os
+import random
+import threading
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Camera connection states, persisted to `Camera.status`
+CONNECTING = "connecting" # Opening the source (with backoff between attempts)
+LIVE = "live"             # Frames are arriving
+STALLED = "stalled"       # Open, but reads failed or no frame within the read timeout
+OFFLINE = "offline"       # Several consecutive opens failed; still retrying at the maximum backoff
+
+
+def backoff_delay(attempt, base, maximum, rng=random):
+    """Exponential backoff with jitter: half the delay is fixed, the other half random.
+
+    The jitter keeps many cameras behind one failed switch from reconnecting in lockstep.
+    """
+    delay = min(maximum, base * 2 ** attempt)
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+
+def is_network_source(source):
+    return isinstance(source, str) and "://" in source
+
+
+def _create_capture(source, open_timeout, read_timeout):
+    if is_network_source(source) and hasattr(cv2, "CAP_PROP_OPEN_TIMEOUT_MSEC"):
+        # Lets FFmpeg give up on its own instead of blocking for its (long) defaults
+        return cv2.VideoCapture(source, cv2.CAP_FFMPEG, [
+            cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(open_timeout * 1000),
+            cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(read_timeout * 1000),
+        ])
+    return cv2.VideoCapture(source)
+
+
+def open_capture(source, open_timeout, read_timeout):
+    """Opens `source` on a helper thread and waits at most `open_timeout` seconds.
+
+    Returns an opened capture, or None. A capture that only opens after the
+    caller gave up is released by the helper thread.
+    """
+    lock = threading.Lock()
+    done = threading.Event()
+    result = {"cap": None, "abandoned": False}
+
+    def target():
+        cap = None
+        try:
+            cap = _create_capture(source, open_timeout, read_timeout)
+            if not cap.isOpened():
+                cap.release()
+                cap = None
+        except Exception as e:
+            logger.warning(f"Opening camera source failed: {e}")
+            cap = None
+        with lock:
+            if result["abandoned"]:
+                if cap is not None:
+                    cap.release()
+            else:
+                result["cap"] = cap
+        done.set()
+
+    threading.Thread(target=target, name="camera-open", daemon=True).start()
+    done.wait(open_timeout)
+    with lock:
+        if not done.is_set():
+            result["abandoned"] = True
+            logger.warning(f"Opening camera source timed out after {open_timeout}s.")
+        return result["cap"]
+
+
+def source_frame_interval(cap, source):
+    """Recorded files have no natural frame clock, so they are paced at their own FPS."""
+    if isinstance(source, str) and os.path.isfile(source):
+        return 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 25.0)
+    return 0.0
+
+
+@functools.lru_cache(maxsize=None)
+def placeholder_jpeg(status):
+    """JPEG shown to viewers while a camera is not live; encoded once per status."""
+    placeholder = np.zeros((480, 640, 3), dtype=np.uint8)
+    text = "ESTABLISHING_SECURE_LINK" if status == CONNECTING else "ENCRYPTED_FEED_OFFLINE"
+    (w, h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 1, 2)
+    cv2.putText(placeholder, text, ((640 - w) // 2, 240 + h // 2), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+    ok, data = cv2.imencode('.jpg', placeholder)
+    return data.tobytes() if ok else b""
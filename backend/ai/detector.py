@@ -0,0 +1,194 @@
+import importlib.util
+import logging
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from backend import config
+from backend.ai.pipeline import StageStats
+
+logger = logging.getLogger(__name__)
+
+
+class Detector:
+    """Object detector backend. Implementations run one inference call per batch."""
+
+    name = "base"
+
+    def detect_batch(self, frames):
+        """Returns one list of {'class', 'bbox': [x1, y1, x2, y2], 'confidence'} per frame."""
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Loads whatever the first batch would otherwise wait for; called in the background at startup."""
+
+
+class StubDetector(Detector):
+    """Deterministic, dependency-free detector for tests, replays and benchmarks.
+
+    Every bright blob in the frame is reported as a person. `batch_cost` and
+    `frame_cost` (seconds) simulate the fixed and per-frame inference cost of
+    a real model so batching behaviour can be measured offline.
+    """
+
+    name = "stub"
+
+    def __init__(self, threshold=200, min_area=100, batch_cost=0.0, frame_cost=0.0):
+        self.threshold = threshold
+        self.min_area = min_area
+        self.batch_cost = batch_cost
+        self.frame_cost = frame_cost
+
+    def detect_batch(self, frames):
+        if self.batch_cost or self.frame_cost:
+            time.sleep(self.batch_cost + self.frame_cost * len(frames))
+        results = []
+        for frame in frames:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+            _, mask = cv2.threshold(gray, self.threshold, 255, cv2.THRESH_BINARY)
+            count, _, boxes, _ = cv2.connectedComponentsWithStats(mask)
+            results.append([
+                {"class": "person", "bbox": [int(x), int(y), int(x + w), int(y + h)], "confidence": 1.0}
+                for x, y, w, h, area in boxes[1:count] if area >= self.min_area
+            ])
+        return results
+
+
+class UltralyticsDetector(Detector):
+    """CPU inference through ultralytics; loads a .pt or exported .onnx model on first use."""
+
+    name = "ultralytics"
+
+    def __init__(self, model_path=None, imgsz=None, confidence=None):
+        self.model_path = model_path or config.DETECTOR_MODEL
+        self.imgsz = imgsz or config.DETECTOR_IMGSZ
+        self.confidence = confidence or config.DETECTOR_CONFIDENCE
+        self._model = None
+        self._lock = threading.Lock() # Warm-up and the first batch may race to load it
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from ultralytics import YOLO # Heavy import, deferred until warm-up or the first batch
+                    self._model = YOLO(self.model_path)
+        return self._model
+
+    def warm_up(self):
+        # One dummy inference also initialises the runtime's kernels/graph
+        self.detect_batch([np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)])
+
+    def detect_batch(self, frames):
+        results = self.model(frames, device="cpu", imgsz=self.imgsz, conf=self.confidence, verbose=False)
+        detections = []
+        for result in results:
+            names = result.names
+            boxes = result.boxes
+            detections.append([
+                {"class": names[int(c)], "bbox": box, "confidence": float(p)}
+                for box, c, p in zip(boxes.xyxy.tolist(), boxes.cls.tolist(), boxes.conf.tolist())
+            ])
+        return detections
+
+
+def create_detector(name=None):
+    """Builds the configured backend, or returns None when detection is disabled."""
+    name = (name or config.DETECTOR).lower()
+    if name == "auto":
+        name = "ultralytics" if importlib.util.find_spec("ultralytics") else "none"
+    if name == "ultralytics":
+        return UltralyticsDetector()
+    if name == "stub":
+        return StubDetector()
+    if name != "none":
+        logger.warning(f"Unknown detector backend '{name}'; object detection disabled.")
+    return None
+
+
+class DetectionScheduler:
+    """Batches frames from many cameras into single inference calls.
+
+    A batch is dispatched once it holds `max_batch` frames or the oldest frame
+    has waited `max_wait` seconds. Callbacks run on the scheduler thread with
+    (detections, timestamp) and must be quick.
+    """
+
+    def __init__(self, detector, max_batch=None, max_wait=None, max_queue=256):
+        self.detector = detector
+        self.max_batch = max_batch or config.DETECTOR_MAX_BATCH
+        self.max_wait = config.DETECTOR_MAX_WAIT if max_wait is None else max_wait
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_stats = {} # batch size -> StageStats (inference latency)
+        self.latency = StageStats("detection") # Submit -> callback, per frame
+        self.rejected = 0
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="detection-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, camera_id, frame, timestamp, callback):
+        """Queues a frame for detection; returns False (frame skipped) when saturated."""
+        try:
+            self.queue.put_nowait((time.perf_counter(), camera_id, frame, timestamp, callback))
+            return True
+        except queue.Full:
+            self.rejected += 1
+            return False
+
+    def stats(self):
+        return {
+            "backend": self.detector.name,
+            "queue_depth": self.queue.qsize(),
+            "rejected": self.rejected,
+            "latency": self.latency.snapshot(),
+            "batches": {size: s.snapshot() for size, s in sorted(self.batch_stats.items())},
+        }
+
+    def _collect(self):
+        try:
+            batch = [self.queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = batch[0][0] + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            start = time.perf_counter()
+            try:
+                results = self.detector.detect_batch([item[2] for item in batch])
+            except Exception as e:
+                logger.error(f"Detector batch of {len(batch)} failed: {e}")
+                results = [[] for _ in batch]
+            done = time.perf_counter()
+            self.batch_stats.setdefault(len(batch), StageStats(f"batch_{len(batch)}")).record(done - start)
+
+            for (submitted, camera_id, _, timestamp, callback), detections in zip(batch, results):
+                self.latency.record(done - submitted)
+                try:
+                    callback(detections, timestamp)
+                except Exception as e:
+                    logger.error(f"Detection callback failed for {camera_id}: {e}")
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+
+import cv2
+
+from backend import config
+
+
+class FrameBroadcaster:
+    """Latest-frame fan-out for live viewers.
+
+    The capture side publishes raw frames; nothing is encoded until a viewer
+    asks for one. Each frame is JPEG-encoded at most once per quality level
+    and shared by every subscriber, and a subscriber that falls behind simply
+    skips to the newest frame instead of building a backlog.
+    """
+
+    def __init__(self, stats=None):
+        self.stats = stats # Optional StageStats for encode timing
+        self._lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+        self._frame = None # Raw BGR frame
+        self._valid = None # Optional check that a borrowed frame buffer was not overwritten
+        self._jpeg = None  # Pre-encoded frame (e.g. the offline placeholder)
+        self._encoded = {} # (quality, scale) -> bytes for the current seq
+        self._waiters = set()
+        self.seq = 0
+        self.closed = False
+
+    @property
+    def subscribers(self):
+        return len(self._waiters)
+
+    def publish(self, frame, valid=None):
+        """Publishes a raw frame. If the frame borrows a buffer that may be reused (shared
+        memory), `valid()` tells whether it is still intact once it has been encoded."""
+        with self._lock:
+            self._frame, self._jpeg, self._valid = frame, None, valid
+            self._publish_locked()
+
+    def publish_jpeg(self, data):
+        with self._lock:
+            self._frame, self._jpeg, self._valid = None, data, None
+            self._publish_locked()
+
+    def _publish_locked(self):
+        self.seq += 1
+        self._encoded.clear()
+        for loop, event in self._waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def close(self):
+        """Ends every subscription, e.g. when the camera is detached."""
+        with self._lock:
+            self.closed = True
+            for loop, event in self._waiters:
+                loop.call_soon_threadsafe(event.set)
+
+    def latest(self):
+        """(seq, raw frame) of the newest published frame; the frame is None for pre-encoded JPEGs."""
+        with self._lock:
+            return self.seq, self._frame
+
+    async def wait_newer(self, seq):
+        """Waits until a frame newer than `seq` is published or the broadcaster is closed."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = (loop, event)
+        with self._lock:
+            if self.seq != seq or self.closed:
+                return
+            self._waiters.add(waiter)
+        try:
+            await event.wait()
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+    def encode(self, quality=None, scale=1.0):
+        """Returns (seq, jpeg bytes) for the newest frame, encoding it at most once per quality/scale."""
+        quality = quality or config.JPEG_QUALITY
+        key = (int(quality), scale)
+        with self._encode_lock:
+            with self._lock:
+                seq, frame, jpeg, valid = self.seq, self._frame, self._jpeg, self._valid
+                cached = self._encoded.get(key)
+            if jpeg is not None:
+                return seq, jpeg
+            if cached is not None:
+                return seq, cached
+            if frame is None:
+                return seq, None
+            start = time.perf_counter()
+            if scale < 1.0:
+                size = (max(1, int(frame.shape[1] * scale)), max(1, int(frame.shape[0] * scale)))
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+            if valid is not None and not valid():
+                return seq, None # Overwritten while encoding; the next frame will do
+            data = buffer.tobytes()
+            if self.stats is not None:
+                self.stats.record(time.perf_counter() - start)
+            with self._lock:
+                if self.seq == seq:
+                    self._encoded[key] = data
+            return seq, data
+
+    async def frames(self, quality=None, max_fps=None, executor=None):
+        """Yields the newest JPEG each time a frame is published, capped at `max_fps`."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = (loop, event)
+        min_interval = 1.0 / max_fps if max_fps else 0.0
+        last_seq = 0
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            while not self.closed:
+                if self.seq == last_seq:
+                    event.clear()
+                    if self.seq == last_seq and not self.closed:
+                        await event.wait()
+                    continue
+                sent_at = time.monotonic()
+                last_seq, data = await loop.run_in_executor(executor, self.encode, quality)
+                if data is not None:
+                    yield data
+                if min_interval:
+                    delay = min_interval - (time.monotonic() - sent_at)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
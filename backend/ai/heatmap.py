@@ -0,0 +1,199 @@
+"""Per-camera motion heatmaps: where on the image motion happens, over time.
+
+The motion analyzer's dilated mask (analysis resolution, cropped to the
+zone ROI) is sampled onto a small grid covering the whole frame and
+folded into an exponentially decaying "live" map plus running sums for the
+current hour and day, which become snapshots when the hour/day ends.
+Every cell holds the fraction of frames in which it saw motion (0 - 1).
+"""
+import threading
+from collections import deque
+
+import cv2
+import numpy as np
+
+from backend import config
+
+WINDOWS = ("live", "hour", "day")
+_SPANS = {"hour": 3600, "day": 86400}
+
+
+class MotionHeatmap:
+    """Low-resolution activity map for one camera, fed one motion mask per analysed frame.
+
+    The per-frame path is three OpenCV calls on preallocated buffers and
+    never allocates. Rather than area-averaging the whole mask every frame,
+    each frame samples one mask pixel per cell and the sample position cycles
+    through the cell's block on successive frames, so the hour/day averages
+    (and the live map, over a few dozen frames) still weigh every pixel.
+    Grids are kept in 0-255 units (the mask's) and only normalised when read.
+    """
+
+    def __init__(self, width=None, half_life=None, hours=None, days=None):
+        self.width = width or config.HEATMAP_WIDTH
+        self.half_life = half_life or config.HEATMAP_HALF_LIFE
+        self.hourly = deque(maxlen=hours or config.HEATMAP_HOURS) # (hour start, grid), oldest first
+        self.daily = deque(maxlen=days or config.HEATMAP_DAYS)
+        self.version = 0 # Bumped whenever a snapshot is added
+        self.size = None # Analysis (width, height) the grid covers
+        self.shape = None
+        self.updated = None
+        self._roi = None
+        self._lock = threading.Lock()
+
+    def _allocate(self, size):
+        w, h = size
+        gw = min(self.width, w)
+        gh = max(1, int(round(h * gw / w)))
+        self.size = size
+        self.shape = (gh, gw)
+        self.live = np.zeros(self.shape, np.float32)
+        self.hour_sum = np.zeros(self.shape, np.float32)
+        self.day_sum = np.zeros(self.shape, np.float32)
+        self.hour_frames = self.day_frames = 0
+        self.hour_start = self.day_start = None
+        self.hourly.clear()
+        self.daily.clear()
+        self._cells = np.zeros(self.shape, np.uint8)
+        self._roi = None
+
+    def _map_roi(self, roi):
+        """Grid cells covered by the analysed ROI; the rest of the grid sees no motion."""
+        w, h = self.size
+        gh, gw = self.shape
+        x, y, rw, rh = roi
+        x0, y0 = min(gw - 1, x * gw // w), min(gh - 1, y * gh // h)
+        x1, y1 = max(x0 + 1, -(-(x + rw) * gw // w)), max(y0 + 1, -(-(y + rh) * gh // h))
+        self._roi = roi
+        self._target = (slice(y0, y1), slice(x0, x1))
+        self._cells[:] = 0
+        # Without zones the ROI is the whole grid and the samples go straight into it
+        whole = (y1 - y0, x1 - x0) == self.shape
+        self._roi_cells = self._cells if whole else np.empty((y1 - y0, x1 - x0), np.uint8)
+        # Mask pixels per cell along each axis: the offsets the sample cycles through
+        self._block = (max(1, rw // (x1 - x0)), max(1, rh // (y1 - y0)))
+        self._phase = 0
+
+    def update(self, mask, roi, size, timestamp):
+        """Folds one frame's motion mask (covering `roi` of an analysis frame of `size`) into the maps."""
+        with self._lock:
+            if size != self.size:
+                self._allocate(size)
+            if roi != self._roi:
+                self._map_roi(roi)
+            self._roll(timestamp)
+
+            bx, by = self._block
+            self._phase = (self._phase + 1) % (bx * by)
+            dy, dx = divmod(self._phase, bx)
+            cv2.resize(mask[dy:, dx:], (self._roi_cells.shape[1], self._roi_cells.shape[0]), dst=self._roi_cells,
+                       interpolation=cv2.INTER_NEAREST)
+            if self._roi_cells is not self._cells:
+                self._cells[self._target] = self._roi_cells
+            dt = timestamp - self.updated if self.updated is not None else 0.0
+            # Weight of this frame so that older frames halve every `half_life` seconds, whatever the frame rate
+            alpha = 1.0 - 0.5 ** (max(dt, 1e-3) / self.half_life)
+            cv2.accumulateWeighted(self._cells, self.live, alpha)
+            cv2.accumulate(self._cells, self.hour_sum)
+            self.hour_frames += 1
+            self.updated = timestamp
+
+    def _roll(self, timestamp):
+        """Closes the hour (and day) snapshot once `timestamp` has moved past it."""
+        hour = timestamp - timestamp % _SPANS["hour"]
+        day = timestamp - timestamp % _SPANS["day"]
+        if self.hour_start is None:
+            self.hour_start, self.day_start = hour, day
+            return
+        if hour != self.hour_start:
+            if self.hour_frames:
+                self.hourly.append((self.hour_start, self.hour_sum / (255.0 * self.hour_frames)))
+                self.version += 1
+            cv2.add(self.day_sum, self.hour_sum, dst=self.day_sum)
+            self.day_frames += self.hour_frames
+            self.hour_sum[:] = 0
+            self.hour_frames = 0
+            self.hour_start = hour
+        if day != self.day_start:
+            if self.day_frames:
+                self.daily.append((self.day_start, self.day_sum / (255.0 * self.day_frames)))
+                self.version += 1
+            self.day_sum[:] = 0
+            self.day_frames = 0
+            self.day_start = day
+
+    def grid(self, window="live", start=None):
+        """(start, grid) with values 0-1 for the live map, the current hour/day, or the snapshot beginning at `start`.
+
+        Returns (None, None) if there is no such map yet.
+        """
+        with self._lock:
+            if self.size is None:
+                return None, None
+            if window == "live":
+                return self.updated, self.live / 255.0
+            snapshots = self.hourly if window == "hour" else self.daily
+            if start is not None:
+                start = start - start % _SPANS[window]
+                for begin, grid in snapshots:
+                    if begin == start:
+                        return begin, grid.copy()
+                if start != (self.hour_start if window == "hour" else self.day_start):
+                    return None, None
+            if window == "hour":
+                frames, total = self.hour_frames, self.hour_sum
+                begin = self.hour_start
+            else:
+                frames, total = self.day_frames + self.hour_frames, self.day_sum + self.hour_sum
+                begin = self.day_start
+            return begin, (total / (255.0 * frames) if frames else np.zeros(self.shape, np.float32))
+
+    def snapshots(self):
+        """Start times of the stored hourly and daily snapshots."""
+        with self._lock:
+            return {"hour": [start for start, _ in self.hourly], "day": [start for start, _ in self.daily]}
+
+    def state(self, full=True):
+        """Picklable copy of the maps, e.g. to mirror a worker process's heatmap in the API process.
+
+        With `full=False` the (larger) snapshot history is left out.
+        """
+        with self._lock:
+            if self.size is None:
+                return None
+            state = {
+                "size": self.size, "updated": self.updated, "version": self.version,
+                "live": self.live.copy(), "hour_sum": self.hour_sum.copy(), "day_sum": self.day_sum.copy(),
+                "hour_frames": self.hour_frames, "day_frames": self.day_frames,
+                "hour_start": self.hour_start, "day_start": self.day_start,
+            }
+            if full:
+                state["hourly"], state["daily"] = list(self.hourly), list(self.daily)
+            return state
+
+    def load_state(self, state):
+        with self._lock:
+            if state["size"] != self.size:
+                self._allocate(state["size"])
+            for key in ("updated", "version", "live", "hour_sum", "day_sum", "hour_frames", "day_frames",
+                        "hour_start", "day_start"):
+                setattr(self, key, state[key])
+            if "hourly" in state:
+                self.hourly.clear()
+                self.hourly.extend(state["hourly"])
+                self.daily.clear()
+                self.daily.extend(state["daily"])
+
+
+def render_png(grid, width=None, scale=None):
+    """Heatmap as a transparent PNG overlay (BGRA); `scale` is the value drawn fully hot (default: the grid's max)."""
+    scale = scale or float(grid.max()) or 1.0
+    level = np.clip(grid / scale * 255.0, 0, 255).astype(np.uint8)
+    if width:
+        height = max(1, int(round(grid.shape[0] * width / grid.shape[1])))
+        level = cv2.resize(level, (width, height), interpolation=cv2.INTER_LINEAR)
+    colored = cv2.applyColorMap(level, cv2.COLORMAP_JET)
+    # Cold cells stay see-through so the overlay only tints where motion happens
+    alpha = np.minimum(255, level.astype(np.uint16) * 3 // 2).astype(np.uint8)
+    ok, png = cv2.imencode(".png", np.dstack([colored, alpha]))
+    return png.tobytes() if ok else None
@@ -0,0 +1,180 @@
+import math
+
+import cv2
+import numpy as np
+
+from backend import config
+from backend.ai.zones import DEFAULT_ZONE_THRESHOLD
+
+
+class ZoneMasks:
+    """Zone polygons rasterized once at a fixed analysis resolution.
+
+    Exclusion polygons are cut out of every zone. Without any include zone
+    the whole frame acts as one implicit zone, so a camera with no zones
+    scores exactly like before. Masks are cropped to `roi`, the bounding
+    rectangle of all active pixels, which is the only region analysed.
+    """
+
+    def __init__(self, zones, size):
+        w, h = size
+        include = [z for z in zones if not z["exclude"]]
+        excluded = np.zeros((h, w), dtype=np.uint8)
+        for zone in zones:
+            if zone["exclude"]:
+                cv2.fillPoly(excluded, [self._scale(zone["points"], w, h)], 255)
+
+        full_masks = []
+        if include:
+            for zone in include:
+                mask = np.zeros((h, w), dtype=np.uint8)
+                cv2.fillPoly(mask, [self._scale(zone["points"], w, h)], 255)
+                full_masks.append(mask)
+            self.names = [z["name"] for z in include]
+            self.thresholds = np.array([z["threshold"] for z in include], dtype=np.float64)
+        else:
+            full_masks.append(np.full((h, w), 255, dtype=np.uint8))
+            self.names = ["frame"]
+            self.thresholds = np.array([DEFAULT_ZONE_THRESHOLD])
+        for mask in full_masks:
+            cv2.bitwise_and(mask, cv2.bitwise_not(excluded), dst=mask)
+
+        active = full_masks[0].copy()
+        for mask in full_masks[1:]:
+            cv2.bitwise_or(active, mask, dst=active)
+        # Unrestricted: no polygon at all, so the mask step can be skipped entirely
+        self.unrestricted = not zones
+        self.roi = cv2.boundingRect(active) if cv2.countNonZero(active) else None # (x, y, w, h)
+        if self.roi is None:
+            self.active, self.masks = None, []
+            self.pixels = np.zeros(len(full_masks))
+            return
+        x, y, rw, rh = self.roi
+        self.active = np.ascontiguousarray(active[y:y + rh, x:x + rw])
+        self.masks = [np.ascontiguousarray(m[y:y + rh, x:x + rw]) for m in full_masks]
+        self.active_pixels = cv2.countNonZero(self.active)
+        self.pixels = np.array([max(1, cv2.countNonZero(m)) for m in self.masks], dtype=np.float64)
+
+    @staticmethod
+    def _scale(points, w, h):
+        pts = np.asarray(points, dtype=np.float64).clip(0.0, 1.0) * (w - 1, h - 1)
+        return np.round(pts).astype(np.int32)
+
+
+class MotionAnalyzer:
+    """Scores motion on a downscaled grayscale copy of each frame.
+
+    Frames are resized once to the analysis resolution and compared against a
+    running-average background (`cv2.accumulateWeighted`) rather than the
+    previous frame. Every intermediate image lives in a buffer allocated on
+    the first frame, so the per-frame path does not allocate.
+
+    With zones configured only the bounding rectangle of the active zones is
+    cropped, resized and diffed, and changed pixels are counted per zone.
+    """
+
+    def __init__(self, analysis_width=None, learning_rate=None, diff_threshold=None, dilate_iterations=2, zones=None):
+        self.analysis_width = analysis_width or config.ANALYSIS_WIDTH
+        self.learning_rate = learning_rate or config.MOTION_LEARNING_RATE
+        self.diff_threshold = diff_threshold or config.MOTION_DIFF_THRESHOLD
+        self.dilate_iterations = dilate_iterations
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+        self.zones = zones or []
+        self.frame_shape = None
+        self.size = None # (width, height) at analysis resolution
+        self.roi = None # (x, y, w, h) analysed region at analysis resolution
+        self.mask = None # Dilated motion mask of the last frame, covering `roi`
+        self.zone_masks = None
+        self.zone_fractions = None # Changed fraction per zone, last frame
+
+    def set_zones(self, zones):
+        """Replaces the zones; masks are re-rasterized (and the background relearned) on the next frame."""
+        self.zones = zones or []
+        self.frame_shape = None
+
+    def _allocate(self, frame):
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.analysis_width / float(width))
+        w, h = max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+        self.frame_shape = frame.shape
+        self.size = (w, h)
+        self.zone_masks = ZoneMasks(self.zones, self.size)
+        self.zone_fractions = np.zeros(len(self.zone_masks.names))
+        self.roi = self.zone_masks.roi
+        self.primed = False
+        if self.roi is None:
+            return
+
+        # Source crop in frame coordinates covering the analysis ROI
+        x, y, rw, rh = self.roi
+        self.crop = (slice(int(y / scale), min(height, math.ceil((y + rh) / scale))),
+                     slice(int(x / scale), min(width, math.ceil((x + rw) / scale))))
+        self.pixels = self.zone_masks.active_pixels
+        self.small = np.empty((rh, rw, 3), dtype=np.uint8)
+        self.gray = np.empty((rh, rw), dtype=np.uint8)
+        self.background = np.empty((rh, rw), dtype=np.float32)
+        self.background_u8 = np.empty((rh, rw), dtype=np.uint8)
+        self.diff = np.empty((rh, rw), dtype=np.uint8)
+        self.blur = np.empty((rh, rw), dtype=np.uint8)
+        self.thresh = np.empty((rh, rw), dtype=np.uint8)
+        self.mask = np.zeros((rh, rw), dtype=np.uint8)
+        self.zone_hits = np.empty((rh, rw), dtype=np.uint8)
+
+    def reset(self):
+        """Forgets the background model, e.g. after the camera reconnects."""
+        self.frame_shape = None
+
+    def score(self, frame):
+        """Returns the fraction of analysed (in-zone) pixels that changed (0.0 - 1.0)."""
+        if frame.shape != self.frame_shape:
+            self._allocate(frame)
+        if self.roi is None:
+            return 0.0 # Everything is excluded
+
+        source = frame[self.crop]
+        if source.shape[:2] == self.small.shape[:2]:
+            np.copyto(self.small, source)
+        else:
+            cv2.resize(source, (self.roi[2], self.roi[3]), dst=self.small, interpolation=cv2.INTER_LINEAR)
+        cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.gray)
+
+        if not self.primed:
+            self.background[...] = self.gray
+            self.primed = True
+            return 0.0
+
+        cv2.convertScaleAbs(self.background, dst=self.background_u8)
+        cv2.absdiff(self.gray, self.background_u8, dst=self.diff)
+        cv2.GaussianBlur(self.diff, (5, 5), 0, dst=self.blur)
+        cv2.threshold(self.blur, self.diff_threshold, 255, cv2.THRESH_BINARY, dst=self.thresh)
+        cv2.dilate(self.thresh, self.kernel, dst=self.mask, iterations=self.dilate_iterations)
+        cv2.accumulateWeighted(self.gray, self.background, self.learning_rate)
+
+        zm = self.zone_masks
+        if not zm.unrestricted:
+            cv2.bitwise_and(self.mask, zm.active, dst=self.mask)
+        changed = cv2.countNonZero(self.mask)
+        if len(zm.masks) == 1:
+            self.zone_fractions[0] = changed / zm.pixels[0]
+        else:
+            for i, zone_mask in enumerate(zm.masks):
+                cv2.bitwise_and(self.mask, zone_mask, dst=self.zone_hits)
+                self.zone_fractions[i] = cv2.countNonZero(self.zone_hits) / zm.pixels[i]
+        return changed / self.pixels
+
+    def activity(self):
+        """Escalation target (0.0 - 1.0): the most active zone relative to its own threshold."""
+        if self.zone_masks is None or self.roi is None:
+            return 0.0
+        return float(np.minimum(1.0, self.zone_fractions / self.zone_masks.thresholds).max())
+
+    def zone_scores(self):
+        """Changed fraction per zone name for the last frame."""
+        if self.zone_masks is None:
+            return {}
+        return {name: round(float(f), 3) for name, f in zip(self.zone_masks.names, self.zone_fractions)}
+
+    def hottest_zone(self):
+        if self.zone_masks is None or self.roi is None:
+            return None
+        return self.zone_masks.names[int(np.argmax(self.zone_fractions / self.zone_masks.thresholds))]
@@ -0,0 +1,87 @@
+import threading
+import time
+
+
+class StageStats:
+    """Timing and drop counters for one pipeline stage.
+
+    Counters are updated without locking from the stage's own thread; readers
+    get a best-effort snapshot, which is all the dashboards need. Optional
+    `histogram`/`drop_counter` metric children mirror the values for /metrics.
+    """
+
+    def __init__(self, name, histogram=None, drop_counter=None):
+        self.name = name
+        self.histogram = histogram
+        self.drop_counter = drop_counter
+        self.count = 0
+        self.drops = 0
+        self.total_time = 0.0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.avg_ms = 0.0 # Exponentially weighted
+        self.fps = 0.0    # Exponentially weighted completion rate
+        self._last_done = None
+
+    def record(self, seconds):
+        now = time.monotonic()
+        ms = seconds * 1000.0
+        self.count += 1
+        self.total_time += seconds
+        self.last_ms = ms
+        self.max_ms = max(self.max_ms, ms)
+        self.avg_ms = ms if self.count == 1 else self.avg_ms * 0.9 + ms * 0.1
+        if self._last_done is not None and now > self._last_done:
+            rate = 1.0 / (now - self._last_done)
+            self.fps = rate if self.count == 2 else self.fps * 0.9 + rate * 0.1
+        self._last_done = now
+        if self.histogram is not None:
+            self.histogram.observe(seconds)
+
+    def drop(self, n=1):
+        self.drops += n
+        if self.drop_counter is not None:
+            self.drop_counter.inc(n)
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "drops": self.drops,
+            "fps": round(self.fps, 2),
+            "avg_ms": round(self.avg_ms, 3),
+            "last_ms": round(self.last_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class LatestFrame:
+    """Single-slot hand-off between capture and analysis.
+
+    `put` always replaces whatever is waiting, so the consumer only ever sees
+    the newest frame; replaced frames are reported back as dropped.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._timestamp = None
+
+    def put(self, frame, timestamp):
+        with self._cond:
+            replaced = self._frame is not None
+            self._frame, self._timestamp = frame, timestamp
+            self._cond.notify()
+        return replaced
+
+    def take(self, timeout=None):
+        """Returns (frame, timestamp), or (None, None) if nothing arrived in time."""
+        with self._cond:
+            if self._frame is None:
+                self._cond.wait(timeout)
+            frame, timestamp = self._frame, self._timestamp
+            self._frame = self._timestamp = None
+        return frame, timestamp
+
+    def clear(self):
+        with self._cond:
+            self._frame = self._timestamp = None
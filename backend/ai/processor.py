@@ -4,163 +4,418 @@ import threading
 import random
 from datetime import datetime
 import asyncio
-import queue
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+from backend import config
+from backend.ai.pipeline import LatestFrame, StageStats
+from backend.ai.rules import compile_rules
+from backend.services import metrics
+
 # Critical Vision Libs
 try:
     import cv2
     import numpy as np
+    from backend.ai.motion import MotionAnalyzer
+    from backend.ai.heatmap import MotionHeatmap
+    from backend.ai.frame_buffer import FrameBroadcaster
+    from backend.ai.recorder import IncidentRecorder, clip_store
+    from backend.ai.behavior import BehaviorAnalyzer
+    from backend.ai import connection
     HAS_AI_LIBS = True
 except ImportError:
     HAS_AI_LIBS = False
     logger.warning("CRITICAL: OpenCV/NumPy not found. Webcam will NOT work.")
 
-# Advanced AI Libs (Optional/Conceptual for now)
-try:
-    import tensorflow as tf
-    import google.generativeai as genai
-    HAS_ADVANCED_AI = True
-except ImportError:
-    HAS_ADVANCED_AI = False
-    logger.warning("Advanced AI (TF/GenAI) not found. Using logic placeholders.")
+# Heavy optional backends (ultralytics, Gemini) are imported by their own modules on
+# first use and warmed up in the background after startup (see backend.services.readiness)
 
 class AIProcessor:
-    def __init__(self, broadcast_callback=None, save_incident_callback=None, realtime_callback=None):
+    def __init__(self, broadcast_callback=None, save_incident_callback=None, realtime_callback=None,
+                 executor=None, loop=None, target_fps=None, update_incident_callback=None, detector=None,
+                 zones=None, clock=None, status_callback=None, rules=None):
         self.is_running = False
+        # Wall clock for timestamps and the confirmation/cooldown windows; replays inject a simulated one
+        self.clock = clock or time.time
         self.broadcast_callback = broadcast_callback
         self.save_incident_callback = save_incident_callback
         self.realtime_callback = realtime_callback
+        self.update_incident_callback = update_incident_callback
+        # Persists connection state changes, e.g. to Camera.status (called from the connection thread)
+        self.status_callback = status_callback
         self.camera_id = "WEB-01"
         self.owner_id = "admin"
-        self.frame_queue = queue.Queue(maxsize=10)
+        self.source = None
         self.escalation_score = 0.0
-        self.escalation_start_time = None # Track when escalation began
-        self.cap = None
-        
+        # Compiled per-camera thresholds, confirmation/cooldown windows, schedules and severities
+        self.rules = compile_rules(rules, self.clock())
+        self.status = "connecting"
+        self.threads = []
+        self._epoch = 0 # Bumped on stop/restart so stale threads retire themselves
+        self._generation = 0 # Bumped whenever the current capture is abandoned
+        self._reader = None
+        self._read_failed = threading.Event()
+        self._live_since = None
+        # Shared worker pool for analysis (None = run inline on the scheduler thread)
+        self.executor = executor
+        # Server event loop that owns the WebSocket connections
+        self.loop = loop
+        self.target_fps = target_fps or config.TARGET_ANALYSIS_FPS
+        self.stages = {name: StageStats(name) for name in ("capture", "schedule", "analysis", "encode")}
+        self.latest = LatestFrame() # Bounded capture -> analysis hand-off
+        self._pending = None # In-flight analysis job, at most one per camera
+        self.frames = FrameBroadcaster(stats=self.stages["encode"]) if HAS_AI_LIBS else None
+        self.motion = MotionAnalyzer(zones=zones) if HAS_AI_LIBS else None
+        self.heatmap = MotionHeatmap() if HAS_AI_LIBS else None
+        self.recorder = None
+        # Shared DetectionScheduler (None = motion-only analysis)
+        self.detector = detector
+        self.behavior = BehaviorAnalyzer(movement_threshold=self.rules.movement_threshold,
+                                         rules=self.rules.loitering) if HAS_AI_LIBS else None
+        self._detect_pending = False
+        self._last_detection = 0.0
+        self.last_frame_time = None # monotonic time of the last captured frame
+        self.reconnects = 0
+        self._reconnect_counter = None
+
     def start_feed(self, source=0, camera_id="DEMO-USER-CAM", owner_id="admin"):
         self.camera_id = camera_id
         self.owner_id = owner_id
+        self.source = source
         if self.is_running: return
+        if HAS_AI_LIBS and (self.recorder is None or self.recorder.camera_id != camera_id):
+            self.recorder = IncidentRecorder(camera_id, clip_store)
         self.is_running = True
-        self.thread = threading.Thread(target=self._process_loop, args=(source,), daemon=True)
-        self.thread.start()
-        
-    def _process_loop(self, source):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        last_incident_time = time.time()
-        frame1 = None
-        
-        # Safe Placeholder
-        placeholder_bytes = b""
-        if HAS_AI_LIBS:
+        self._bind_metrics()
+        self.threads = [
+            threading.Thread(target=self._connect_loop, args=(source, self._epoch), name=f"connect-{camera_id}", daemon=True),
+            threading.Thread(target=self._schedule_loop, args=(self._epoch,), name=f"schedule-{camera_id}", daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def restart(self):
+        """Restarts the capture/scheduler threads, keeping viewers attached."""
+        self._join()
+        self.start_feed(self.source, self.camera_id, self.owner_id)
+
+    def is_alive(self):
+        return self.is_running and bool(self.threads) and all(t.is_alive() for t in self.threads)
+
+    def _bind_metrics(self):
+        """Mirrors this pipeline's stage timings and drops into the /metrics registry."""
+        for name, stage in self.stages.items():
+            stage.histogram = metrics.STAGE_SECONDS.labels(self.camera_id, name)
+            stage.drop_counter = metrics.FRAMES_DROPPED.labels(self.camera_id, name)
+        self._reconnect_counter = metrics.CAPTURE_RECONNECTS.labels(self.camera_id)
+        metrics.LAST_FRAME_AGE.labels(self.camera_id).set_function(self.last_frame_age)
+        metrics.CAPTURE_FPS.labels(self.camera_id).set_function(lambda: self.stages["capture"].fps)
+        metrics.CAMERA_LIVE.labels(self.camera_id).set_function(lambda: self.status == "live")
+
+    def last_frame_age(self):
+        """Seconds since the last captured frame, or None if none has arrived yet."""
+        if self.last_frame_time is None:
+            return None
+        return time.monotonic() - self.last_frame_time
+
+    def health(self):
+        age = self.last_frame_age()
+        return {
+            "status": self.status,
+            "alive": self.is_alive(),
+            "last_frame_age": round(age, 2) if age is not None else None,
+            "capture_fps": round(self.stages["capture"].fps, 2),
+            "analysis_fps": round(self.stages["analysis"].fps, 2),
+            "reconnects": self.reconnects,
+        }
+
+    def pipeline_stats(self):
+        return {
+            "camera_id": self.camera_id,
+            "target_fps": self.target_fps,
+            "viewers": self.frames.subscribers if self.frames is not None else 0,
+            "stages": {name: stage.snapshot() for name, stage in self.stages.items()},
+        }
+
+    def set_zones(self, zones):
+        """Applies edited zones; the cached masks are rebuilt on the next analysed frame."""
+        if self.motion is not None:
+            self.motion.set_zones(zones)
+
+    def set_rules(self, rules):
+        """Applies edited rules from the next frame on; confirmation timers restart, cooldowns carry over."""
+        self.rules = compile_rules(rules, self.clock(), previous=self.rules)
+        if self.behavior is not None:
+            self.behavior.set_rules(self.rules.loitering, self.rules.movement_threshold)
+
+    def _dispatch(self, coro):
+        """Runs an async callback on the server loop, or standalone when there is none."""
+        if self.loop is not None and self.loop.is_running():
+            return asyncio.run_coroutine_threadsafe(coro, self.loop)
+        asyncio.run(coro)
+
+    def _submit(self, frame, timestamp):
+        """Hands a frame to the worker pool, skipping it if this camera is still busy."""
+        if self.executor is None:
+            self._timed_analyze(frame, timestamp)
+            return
+        if self._pending is not None and not self._pending.done():
+            self.stages["analysis"].drop()
+            return
+        self._pending = self.executor.submit(self._timed_analyze, frame, timestamp)
+
+    def _timed_analyze(self, frame, timestamp):
+        start = time.perf_counter()
+        try:
+            self._analyze_frame(frame, timestamp)
+        except Exception as e:
+            metrics.ERRORS.labels("analysis").inc()
+            logger.error(f"Analysis failed for {self.camera_id}: {e}")
+        self.stages["analysis"].record(time.perf_counter() - start)
+
+    def _set_status(self, status):
+        """Records a connection state change, persists it and pushes it to WebSocket clients."""
+        previous, self.status = self.status, status
+        if previous == status:
+            return
+        logger.info(f"Camera {self.camera_id}: {previous} -> {status}")
+        if self.status_callback:
             try:
-                self.cap = cv2.VideoCapture(source)
-                placeholder = np.zeros((480, 640, 3), dtype=np.uint8)
-                cv2.putText(placeholder, "ENCRYPTED_FEED_OFFLINE", (150, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                _, placeholder_bytes = cv2.imencode('.jpg', placeholder)
-                placeholder_bytes = placeholder_bytes.tobytes()
+                self.status_callback(self.camera_id, status)
             except Exception as e:
-                logger.error(f"Error initializing camera: {e}")
-
-        while self.is_running:
-            frame_to_send = None
-            
-            # Auto-Reconnect Logic
-            if HAS_AI_LIBS:
-                if self.cap is None or not self.cap.isOpened():
-                    try:
-                        self.cap = cv2.VideoCapture(source)
-                        if not self.cap.isOpened():
-                             time.sleep(2.0)
-                             continue
-                    except:
-                        time.sleep(2.0)
-                        continue
-
-                ret, frame = self.cap.read()
-                if ret:
-                    if frame1 is None:
-                        frame1 = frame
-                        
-                    # Real-time Movement Analysis
-                    try:
-                        diff = cv2.absdiff(frame1, frame)
-                        gray = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
-                        blur = cv2.GaussianBlur(gray, (5,5), 0)
-                        _, thresh = cv2.threshold(blur, 20, 255, cv2.THRESH_BINARY)
-                        dilated = cv2.dilate(thresh, None, iterations=3)
-                        motion_score = np.sum(dilated) / (frame.shape[0] * frame.shape[1] * 255)
-                        
-                        target_score = min(1.0, motion_score * 20)
-                        self.escalation_score = self.escalation_score * 0.7 + target_score * 0.3
-                    except Exception as e:
-                       self.escalation_score = 0.0
-                    
-                    frame1 = frame 
-                    frame_to_send = frame
-
-                    # Temporal Confirmation Logic
-                    # Required: Sustained > 0.5 for more than 2.0 seconds
-                    if self.escalation_score > 0.5:
-                        if self.escalation_start_time is None:
-                            self.escalation_start_time = time.time()
-                            logger.info("Escalation detected. Monitoring for persistence...")
-                        
-                        duration = time.time() - self.escalation_start_time
-                        
-                        # Trigger incident only if sustained and cooldown passed
-                        if duration >= 2.0 and (time.time() - last_incident_time > 10):
-                            meta = {
-                                "type": "Rapid Escalation", 
-                                "sev": "High", 
-                                "desc": f"Sustained motion anomaly (duration: {round(duration, 1)}s) detected in secure zone."
-                            }
-                            loop.run_until_complete(self._handle_incident(meta))
-                            last_incident_time = time.time()
-                            self.escalation_start_time = None # Reset after trigger
-                    else:
-                        if self.escalation_start_time is not None:
-                            logger.info("Escalation subsided. Resetting confirmation timer.")
-                        self.escalation_start_time = None
+                metrics.ERRORS.labels("camera_status").inc()
+                logger.error(f"Saving status of camera {self.camera_id} failed: {e}")
+        if self.broadcast_callback:
+            self._dispatch(self.broadcast_callback({
+                "msg_type": "camera_status",
+                "camera_id": self.camera_id,
+                "owner_id": self.owner_id,
+                "status": status,
+                "previous": previous,
+            }))
+
+    def _connect_loop(self, source, epoch):
+        """Connection manager: opens the source off the read path, with backoff, and watches for stalls."""
+        if not HAS_AI_LIBS:
+            while self.is_running and epoch == self._epoch:
+                self._idle(1.0, epoch)
+            return
+
+        attempt = 0
+        opened_once = False
+        while self.is_running and epoch == self._epoch:
+            if self.status != "live":
+                if opened_once:
+                    self.reconnects += 1
+                    if self._reconnect_counter is not None:
+                        self._reconnect_counter.inc()
+                opened_once = True
+                # Blocks at most the open timeout; viewers keep getting placeholders meanwhile
+                cap = connection.open_capture(source, config.CAMERA_OPEN_TIMEOUT, config.CAMERA_READ_TIMEOUT)
+                if not (self.is_running and epoch == self._epoch):
+                    if cap is not None:
+                        cap.release()
+                    break
+                if cap is not None:
+                    self._start_reader(cap, source)
+                    self._set_status("live")
+                    continue
+                attempt += 1
+                self._set_status("offline" if attempt >= config.CAMERA_OFFLINE_AFTER else "connecting")
+                self._idle(connection.backoff_delay(attempt - 1, config.CAMERA_BACKOFF_BASE, config.CAMERA_BACKOFF_MAX), epoch)
+                continue
+
+            # Live: a failed read (or end of a file) or a read that hangs past the timeout means a stall
+            self._read_failed.wait(0.25)
+            if not (self.is_running and epoch == self._epoch):
+                break
+            now = time.monotonic()
+            lived = now - self._live_since
+            if lived > config.CAMERA_READ_TIMEOUT:
+                attempt = 0 # Stable again
+            if self._read_failed.is_set() or now - max(self.last_frame_time or 0.0, self._live_since) > config.CAMERA_READ_TIMEOUT:
+                self._retire_reader()
+                self._set_status("stalled")
+                if lived < config.CAMERA_READ_TIMEOUT:
+                    # Opens but fails right away: back off like a failed open instead of spinning
+                    attempt += 1
+                    self._idle(connection.backoff_delay(attempt - 1, config.CAMERA_BACKOFF_BASE, config.CAMERA_BACKOFF_MAX), epoch)
                 else:
-                    if self.cap:
-                        self.cap.release()
-                    self.cap = None
-                    time.sleep(0.5)
+                    self._publish_placeholder(connection.placeholder_jpeg("stalled"))
+
+        self._retire_reader()
+
+    def _idle(self, seconds, epoch):
+        """Waits out a backoff delay while sending viewers the placeholder at a low rate."""
+        interval = 1.0 / config.CAMERA_PLACEHOLDER_FPS
+        deadline = time.monotonic() + seconds
+        while self.is_running and epoch == self._epoch:
+            self._publish_placeholder(connection.placeholder_jpeg(self.status) if HAS_AI_LIBS else b"")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(interval, remaining))
+
+    def _start_reader(self, cap, source):
+        self._generation += 1
+        self._read_failed.clear()
+        self._live_since = time.monotonic()
+        self._reader = threading.Thread(target=self._read_loop, args=(cap, source, self._generation),
+                                        name=f"capture-{self.camera_id}", daemon=True)
+        self._reader.start()
+
+    def _retire_reader(self):
+        """Abandons the current capture; its reader releases it once a pending read returns."""
+        self._generation += 1
+        self.latest.clear()
+        if self.motion is not None:
+            self.motion.reset()
+
+    def _read_loop(self, cap, source, generation):
+        """Grabber stage: reads as fast as the source delivers, keeping only the newest frame."""
+        frame_interval = connection.source_frame_interval(cap, source)
+        next_read = time.monotonic()
+        try:
+            while self.is_running and generation == self._generation:
+                start = time.perf_counter()
+                ret, frame = cap.read()
+                if generation != self._generation:
+                    break # Superseded while the read was blocked
+                if not ret and frame_interval:
+                    # End of a recorded file: loop it rather than treating it as a stall
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    ret, frame = cap.read()
+                if not ret:
+                    self._read_failed.set()
+                    break
+                self.stages["capture"].record(time.perf_counter() - start)
+                self.last_frame_time = time.monotonic()
+                # Live viewers see every captured frame; it is only encoded if someone is watching
+                self.frames.publish(frame)
+                if self.latest.put(frame, self.clock()):
+                    self.stages["schedule"].drop()
+                if frame_interval:
+                    next_read += frame_interval
+                    delay = next_read - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_read = time.monotonic()
+        except Exception as e:
+            metrics.ERRORS.labels("capture").inc()
+            logger.error(f"Capture failed for {self.camera_id}: {e}")
+            self._read_failed.set()
+        finally:
+            cap.release()
+
+    def _schedule_loop(self, epoch):
+        """Scheduler stage: feeds analysis at `target_fps`, skipping frames under load."""
+        interval = 1.0 / self.target_fps
+        next_tick = time.monotonic()
+        while self.is_running and epoch == self._epoch:
+            frame, timestamp = self.latest.take(timeout=1.0)
+            if frame is None:
+                next_tick = time.monotonic()
+                continue
+            start = time.perf_counter()
+            self._submit(frame, timestamp)
+            self.stages["schedule"].record(time.perf_counter() - start)
+
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
             else:
-                time.sleep(0.5)
-
-            # Send frame to queue
-            if not self.frame_queue.full():
-                if frame_to_send is not None and HAS_AI_LIBS:
-                    _, buffer = cv2.imencode('.jpg', frame_to_send)
-                    self.frame_queue.put(buffer.tobytes())
-                elif placeholder_bytes:
-                    self.frame_queue.put(placeholder_bytes)
-            
-            # Broadcast Real-time Stats
-            if self.realtime_callback:
-                 try:
-                     loop.run_until_complete(self.realtime_callback({
-                         "type": "stats",
-                         "score": round(self.escalation_score, 2),
-                         "cam": self.camera_id,
-                         "confirmed": self.escalation_start_time is not None and (time.time() - self.escalation_start_time >= 2.0)
-                     }))
-                 except:
-                     pass
-
-            time.sleep(0.05)
-
-    async def _handle_incident(self, incident_meta):
+                next_tick = time.monotonic() # Behind schedule: skip ahead rather than burst
+
+    def _publish_placeholder(self, placeholder_bytes):
+        if placeholder_bytes:
+            self.frames.publish_jpeg(placeholder_bytes)
+        self._send_stats()
+
+    def _analyze_frame(self, frame, timestamp=None):
+        """Analysis stage: motion scoring and temporal confirmation for a single frame."""
+        timestamp = timestamp or self.clock()
+        rules = self.rules # One rule set per frame, even if it is replaced meanwhile
+        # Evidence buffer for incident snapshots/clips (sampled at the clip frame rate)
+        if self.recorder is not None:
+            self.recorder.offer(frame, timestamp)
+
+        # Real-time Movement Analysis
+        motion_score = 0.0
+        try:
+            motion_score = self.motion.score(frame)
+            if self.heatmap is not None and self.motion.roi is not None:
+                self.heatmap.update(self.motion.mask, self.motion.roi, self.motion.size, timestamp)
+
+            # Each zone is scaled by its own threshold; the most active one drives escalation
+            target_score = self.motion.activity()
+            self.escalation_score = self.escalation_score * rules.keep + target_score * rules.gain
+        except Exception as e:
+           metrics.ERRORS.labels("motion").inc()
+           logger.debug(f"Motion analysis failed for {self.camera_id}: {e}")
+           self.escalation_score = 0.0
+
+        # Object detection, gated by motion so idle cameras cost nothing. While people are
+        # tracked, keep sampling slowly so stationary (loitering) tracks don't age out.
+        if self.detector is not None and not self._detect_pending:
+            if motion_score >= config.DETECTION_MOTION_GATE or (
+                    self.behavior.tracker.track_count and timestamp - self._last_detection >= config.DETECTION_KEEPALIVE):
+                self._detect_pending = self.detector.submit(self.camera_id, frame, timestamp, self._on_detections)
+                if self._detect_pending:
+                    self._last_detection = timestamp
+
+        # Temporal Confirmation Logic
+        # Each escalation rule needs the score above its threshold for `confirm` seconds, then cools down
+        escalation = rules.escalation
+        was_armed = escalation.armed
+        fired = escalation.evaluate(self.escalation_score, self.clock())
+        if escalation.armed and not was_armed:
+            logger.info("Escalation detected. Monitoring for persistence...")
+        elif was_armed and not escalation.armed:
+            logger.info("Escalation subsided. Resetting confirmation timer.")
+        if fired:
+            zone = self.motion.hottest_zone() if self.motion is not None and self.motion.zones else "secure zone"
+            for index, duration in fired:
+                meta = {
+                    "type": escalation.types[index],
+                    "sev": escalation.severity(index, self.escalation_score),
+                    "desc": f"Sustained motion anomaly (duration: {round(duration, 1)}s) detected in {zone}."
+                }
+                self._handle_incident(meta)
+
+        self._send_stats()
+
+    def _on_detections(self, detections, timestamp):
+        """Runs on the detection scheduler thread once this camera's frame has been inferred."""
+        self._detect_pending = False
+        for incident in self.behavior.analyze(detections, timestamp):
+            self._handle_incident({"type": incident["type"], "sev": incident["severity"], "desc": incident["description"]})
+
+    def _send_stats(self):
+        # Real-time Stats: the callback only records the value; it is broadcast at a fixed rate
+        if self.realtime_callback:
+             try:
+                 stats = {
+                     "type": "stats",
+                     "score": round(self.escalation_score, 2),
+                     "cam": self.camera_id,
+                     "owner_id": self.owner_id,
+                     "status": self.status,
+                     "confirmed": self.rules.escalation.confirmed(self.clock())
+                 }
+                 if self.motion is not None and self.motion.zones:
+                     stats["zones"] = self.motion.zone_scores()
+                 self.realtime_callback(stats)
+             except Exception as e:
+                 metrics.ERRORS.labels("stats").inc()
+                 logger.debug(f"Stats update failed for {self.camera_id}: {e}")
+
+    def _handle_incident(self, incident_meta):
         ai_desc = incident_meta['desc']
         full_meta = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.utcfromtimestamp(self.clock()).isoformat(),
             "camera_id": self.camera_id,
             "type": incident_meta['type'],
             "severity": incident_meta['sev'],
@@ -169,16 +424,28 @@ class AIProcessor:
             "escalation_score": round(self.escalation_score, 2),
             "ai_summary": f"Temporal sentinel analysis: {incident_meta['type']} confirmed after sustained anomaly detection."
         }
-        if self.save_incident_callback: self.save_incident_callback(full_meta)
-        if self.broadcast_callback: await self.broadcast_callback(full_meta)
-
-    def get_frame(self):
-        try:
-            return self.frame_queue.get(timeout=0.01)
-        except:
-            return None
+        handle = None
+        # Persistence only enqueues; the broadcast runs on the server loop
+        if self.save_incident_callback: handle = self.save_incident_callback(full_meta)
+        if handle is not None and self.recorder is not None and self.update_incident_callback:
+            # Snapshot and pre/post-roll clip are written in the background, then linked to the row
+            self.recorder.capture(self.clock(), lambda **paths: self.update_incident_callback(handle, **paths))
+        if self.broadcast_callback: self._dispatch(self.broadcast_callback(full_meta))
+        return handle
 
-    def stop(self):
+    def _join(self, timeout=5.0):
         self.is_running = False
-        if self.cap:
-            self.cap.release()
+        self._epoch += 1
+        self._generation += 1
+        self._read_failed.set() # Wakes the connection thread's stall watch
+        for thread in self.threads + [self._reader]:
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(timeout)
+        self._read_failed.clear()
+        self.status = "connecting"
+
+    def stop(self, timeout=5.0):
+        self._join(timeout)
+        if self.frames is not None:
+            self.frames.close()
+        metrics.registry.clear(camera=self.camera_id)
@@ -0,0 +1,223 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from backend import config
+
+logger = logging.getLogger(__name__)
+
+
+class FrameRing:
+    """Recent JPEG frames for one camera, bounded by age and by total bytes."""
+
+    def __init__(self, max_seconds, max_bytes):
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.frames = deque() # (timestamp, jpeg bytes)
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def append(self, timestamp, jpeg):
+        with self._lock:
+            self.frames.append((timestamp, jpeg))
+            self.bytes += len(jpeg)
+            while self.frames and (self.bytes > self.max_bytes or timestamp - self.frames[0][0] > self.max_seconds):
+                _, old = self.frames.popleft()
+                self.bytes -= len(old)
+
+    def latest(self):
+        with self._lock:
+            return self.frames[-1] if self.frames else None
+
+    def window(self, start, end):
+        with self._lock:
+            return [(ts, jpeg) for ts, jpeg in self.frames if start <= ts <= end]
+
+
+class ClipStore:
+    """Writes incident evidence to disk off the capture path and enforces retention.
+
+    Writes keep a running total of the store's size, so they only scan the
+    directory when the total goes over the byte budget or `sweep_interval`
+    has passed since the last scan (which also expires old clips and picks
+    up what other processes wrote to the same directory).
+    """
+
+    def __init__(self, directory=None, max_bytes=None, max_age_days=None, workers=2, sweep_interval=None):
+        self.directory = directory or config.CLIP_DIR
+        self.max_bytes = max_bytes or config.CLIP_STORE_MAX_MB * 1024 * 1024
+        self.max_age = (max_age_days or config.CLIP_RETENTION_DAYS) * 86400
+        self.sweep_interval = config.CLIP_RETENTION_SWEEP_INTERVAL if sweep_interval is None else sweep_interval
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="clip-writer")
+        self._retention_lock = threading.Lock()
+        self._size_lock = threading.Lock()
+        self._total = None # Bytes on disk as of the last scan plus writes since; None until the first scan
+        self._swept = 0.0 # time.monotonic() of the last scan
+
+    def path_for(self, camera_id, timestamp, suffix):
+        day = time.strftime("%Y%m%d", time.gmtime(timestamp))
+        name = time.strftime("%H%M%S", time.gmtime(timestamp)) + f"_{int(timestamp * 1000) % 1000:03d}{suffix}"
+        folder = os.path.join(self.directory, str(camera_id), day)
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, name)
+
+    def write_snapshot(self, camera_id, timestamp, jpeg):
+        path = self.path_for(camera_id, timestamp, ".jpg")
+        with open(path, "wb") as f:
+            f.write(jpeg)
+        self._added(path)
+        self.enforce_retention()
+        return path
+
+    def write_clip(self, camera_id, timestamp, frames, fps):
+        """Writes JPEG frames as an MJPEG AVI, which OpenCV can always produce."""
+        if not frames:
+            return None
+        path = self.path_for(camera_id, timestamp, ".avi")
+        writer = None
+        try:
+            for _, jpeg in frames:
+                image = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if image is None:
+                    continue
+                if writer is None:
+                    size = (image.shape[1], image.shape[0])
+                    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+                elif (image.shape[1], image.shape[0]) != size:
+                    image = cv2.resize(image, size)
+                writer.write(image)
+        finally:
+            if writer is not None:
+                writer.release()
+                self._added(path)
+        self.enforce_retention()
+        return path if writer is not None else None
+
+    def _added(self, path, sign=1):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        with self._size_lock:
+            if self._total is not None:
+                self._total += sign * size
+
+    def discard(self, *paths):
+        """Deletes evidence that no incident row will point to."""
+        for path in paths:
+            if path:
+                self._added(path, -1)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def enforce_retention(self, force=False):
+        """Deletes clips past the retention age, then the oldest until under the byte budget.
+
+        Without `force` this returns at once while the running total is
+        within budget and the last scan is recent enough.
+        """
+        if (not force and self._total is not None and self._total <= self.max_bytes
+                and time.monotonic() - self._swept < self.sweep_interval):
+            return
+        if not self._retention_lock.acquire(blocking=False):
+            return # Another writer is already sweeping
+        try:
+            files = []
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, path))
+            files.sort()
+            now = time.time()
+            total = sum(size for _, size, _ in files)
+            for mtime, size, path in files:
+                if now - mtime <= self.max_age and total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            with self._size_lock:
+                self._total = total
+            self._swept = time.monotonic()
+        finally:
+            self._retention_lock.release()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class IncidentRecorder:
+    """Keeps a camera's recent frames and saves snapshot + pre/post-roll clip on incidents."""
+
+    def __init__(self, camera_id, store, fps=None, quality=None, pre_roll=None, post_roll=None, max_bytes=None):
+        self.camera_id = camera_id
+        self.store = store
+        self.fps = fps or config.CLIP_FPS
+        self.quality = quality or config.CLIP_QUALITY
+        self.pre_roll = config.CLIP_PRE_ROLL if pre_roll is None else pre_roll
+        self.post_roll = config.CLIP_POST_ROLL if post_roll is None else post_roll
+        self.ring = FrameRing(
+            max_seconds=self.pre_roll + self.post_roll + 2.0,
+            max_bytes=max_bytes or config.CLIP_BUFFER_MB * 1024 * 1024,
+        )
+        self._next_sample = 0.0
+
+    def offer(self, frame, timestamp):
+        """Samples the frame into the ring buffer at the clip frame rate."""
+        if timestamp < self._next_sample:
+            return
+        self._next_sample = timestamp + 1.0 / self.fps
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if ok:
+            self.ring.append(timestamp, buffer.tobytes())
+
+    def capture(self, timestamp, on_saved):
+        """Schedules the snapshot now and the clip once the post-roll has been buffered.
+
+        `on_saved(**paths)` is called from a writer thread with `snapshot_path`
+        and later `clip_path`. Never blocks the caller.
+        """
+        latest = self.ring.latest()
+        if latest is not None:
+            self.store.executor.submit(self._save_snapshot, latest[1], timestamp, on_saved)
+        timer = threading.Timer(self.post_roll, self._submit_clip, args=(timestamp, on_saved))
+        timer.daemon = True
+        timer.start()
+
+    def _submit_clip(self, timestamp, on_saved):
+        try:
+            self.store.executor.submit(self._save_clip, timestamp, on_saved)
+        except RuntimeError:
+            logger.warning(f"Clip store shut down; dropping clip for {self.camera_id}.")
+
+    def _save_snapshot(self, jpeg, timestamp, on_saved):
+        try:
+            on_saved(snapshot_path=self.store.write_snapshot(self.camera_id, timestamp, jpeg))
+        except Exception as e:
+            logger.error(f"Failed to save snapshot for {self.camera_id}: {e}")
+
+    def _save_clip(self, timestamp, on_saved):
+        try:
+            frames = self.ring.window(timestamp - self.pre_roll, timestamp + self.post_roll)
+            path = self.store.write_clip(self.camera_id, timestamp, frames, self.fps)
+            if path:
+                on_saved(clip_path=path)
+        except Exception as e:
+            logger.error(f"Failed to save clip for {self.camera_id}: {e}")
+
+
+clip_store = ClipStore()
@@ -0,0 +1,285 @@
+"""Per-camera detection rules: thresholds, windows, schedules and severity mapping.
+
+`Camera.rules` holds JSON like
+
+    {"smoothing": 0.7, "movement_threshold": 50, "utc_offset": 0, "rules": [
+        {"name": "night", "trigger": "escalation", "threshold": 0.4, "confirm": 1.0, "cooldown": 30,
+         "severity": [[0.8, "Critical"], [0, "High"]],
+         "schedule": [{"days": ["mon", "tue", "wed", "thu", "fri"], "start": "22:00", "end": "06:00"}]},
+        {"name": "loiter", "trigger": "loitering", "confirm": 30, "severity": "Medium"}]}
+
+An escalation rule fires when the smoothed motion score stays above
+`threshold` for `confirm` seconds, at most once per `cooldown`; a loitering
+rule fires once per stationary episode of a tracked person lasting
+`confirm` seconds. `severity` is a fixed level or [minimum, level] pairs
+over the rule's measure (escalation score, or dwell seconds). Rules with a
+`schedule` only fire inside one of its weekly windows (local time =
+UTC + `utc_offset` hours; windows may wrap past midnight). Without stored
+rules a camera behaves as before: DEFAULT_RULES.
+
+`compile_rules` turns the JSON into a RuleSet of flat, sorted lists that the
+pipeline evaluates per frame without touching the JSON again.
+"""
+import json
+import logging
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+TRIGGERS = ("escalation", "loitering")
+SEVERITIES = ("Low", "Medium", "High", "Critical")
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+DEFAULT_RULES = {
+    "smoothing": 0.7, # Weight of the previous score in the escalation average
+    "movement_threshold": 50.0, # Pixels a person may drift and still count as stationary
+    "utc_offset": 0.0,
+    "rules": [
+        {"name": "escalation", "trigger": "escalation", "type": "Rapid Escalation", "threshold": 0.5,
+         "confirm": 2.0, "cooldown": 10.0, "severity": [[0.0, "High"]], "schedule": []},
+        {"name": "loitering", "trigger": "loitering", "type": "Loitering", "threshold": 0.0,
+         "confirm": 10.0, "cooldown": 0.0, "severity": [[0.0, "Medium"]], "schedule": []},
+    ],
+}
+_DEFAULT_TYPES = {"escalation": "Rapid Escalation", "loitering": "Loitering"}
+
+
+def _minutes(text):
+    hours, minutes = (int(part) for part in str(text).split(":"))
+    if not (0 <= hours <= 24 and 0 <= minutes < 60) or hours * 60 + minutes > 1440:
+        raise ValueError(f"Bad time of day: {text}")
+    return hours * 60 + minutes
+
+
+def parse_window(window):
+    """Normalises one schedule window; raises ValueError if it is malformed."""
+    days = window.get("days") or list(DAYS)
+    if isinstance(days, str):
+        days = [days]
+    days = [str(day).strip().lower()[:3] for day in days]
+    unknown = [day for day in days if day not in DAYS]
+    if unknown:
+        raise ValueError(f"Unknown days: {', '.join(unknown)}")
+    start, end = window.get("start") or "00:00", window.get("end") or "00:00"
+    _minutes(start), _minutes(end)
+    return {"days": [day for day in DAYS if day in days], "start": start, "end": end}
+
+
+def parse_rule(rule, index=0):
+    """Normalises one rule dict; raises ValueError if it is malformed."""
+    trigger = rule.get("trigger") or "escalation"
+    if trigger not in TRIGGERS:
+        raise ValueError(f"Unknown trigger: {trigger}")
+    default = DEFAULT_RULES["rules"][TRIGGERS.index(trigger)]
+    threshold = float(rule.get("threshold", default["threshold"]))
+    confirm = float(rule.get("confirm", default["confirm"]))
+    cooldown = float(rule.get("cooldown", default["cooldown"]))
+    if threshold < 0 or confirm < 0 or cooldown < 0:
+        raise ValueError("threshold, confirm and cooldown must not be negative")
+    severity = rule.get("severity") or default["severity"]
+    if isinstance(severity, str):
+        severity = [[0.0, severity]]
+    severity = sorted(([float(low), str(level)] for low, level in severity), reverse=True)
+    bad = [level for _, level in severity if level not in SEVERITIES]
+    if bad:
+        raise ValueError(f"Unknown severity: {', '.join(bad)}")
+    return {
+        "name": rule.get("name") or f"{trigger}-{index + 1}",
+        "trigger": trigger,
+        "type": rule.get("type") or _DEFAULT_TYPES[trigger],
+        "threshold": threshold,
+        "confirm": confirm,
+        "cooldown": cooldown,
+        "severity": severity,
+        "schedule": [parse_window(window) for window in rule.get("schedule") or []],
+    }
+
+
+def parse_rules(raw):
+    """Normalises a whole rules document; raises ValueError on the first problem."""
+    smoothing = float(raw.get("smoothing", DEFAULT_RULES["smoothing"]))
+    if not 0 <= smoothing < 1:
+        raise ValueError("smoothing must be in [0, 1)")
+    movement = float(raw.get("movement_threshold", DEFAULT_RULES["movement_threshold"]))
+    if movement <= 0:
+        raise ValueError("movement_threshold must be positive")
+    rules = raw.get("rules")
+    return {
+        "smoothing": smoothing,
+        "movement_threshold": movement,
+        "utc_offset": float(raw.get("utc_offset") or 0.0),
+        "rules": DEFAULT_RULES["rules"] if rules is None else [parse_rule(r, i) for i, r in enumerate(rules)],
+    }
+
+
+def load_rules(raw):
+    """Parses `Camera.rules` (JSON text or a dict); returns DEFAULT_RULES if there are none.
+
+    Malformed rules are skipped with a warning rather than failing the camera.
+    """
+    if not raw:
+        return DEFAULT_RULES
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            logger.warning("Ignoring malformed camera rules.")
+            return DEFAULT_RULES
+    try:
+        parsed = parse_rules({**raw, "rules": None})
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"Ignoring malformed camera rules: {e}")
+        return DEFAULT_RULES
+    if raw.get("rules") is not None:
+        parsed["rules"] = []
+        for i, rule in enumerate(raw["rules"]):
+            try:
+                parsed["rules"].append(parse_rule(rule, i))
+            except (ValueError, TypeError, AttributeError) as e:
+                logger.warning(f"Skipping camera rule {i + 1}: {e}")
+    return parsed
+
+
+class Schedule:
+    """Which of a list of rules may fire now; recomputed once per minute of (simulated) time."""
+
+    __slots__ = ("offset", "windows", "always", "_minute", "_active")
+
+    def __init__(self, rules, utc_offset=0.0):
+        self.offset = utc_offset * 3600.0
+        # Per rule: ((day bitmask, start minute, end minute), ...); empty = always active
+        self.windows = tuple(
+            tuple((sum(1 << DAYS.index(day) for day in w["days"]), _minutes(w["start"]), _minutes(w["end"]))
+                  for w in rule["schedule"])
+            for rule in rules)
+        self.always = not any(self.windows)
+        self._minute = None
+        self._active = [True] * len(rules)
+
+    def active(self, timestamp):
+        """List of flags parallel to the rules; the same list object until the minute changes."""
+        if self.always:
+            return self._active
+        minute = int(timestamp // 60)
+        if minute != self._minute:
+            self._minute = minute
+            local = timestamp + self.offset
+            day = (int(local // 86400) + 3) % 7 # 1970-01-01 was a Thursday
+            bit, previous = 1 << day, 1 << ((day + 6) % 7)
+            of_day = int(local % 86400 // 60)
+            self._active = [not windows or any(
+                (days & bit and start <= of_day < end) if start < end else
+                (days & bit and of_day >= start) or (days & previous and of_day < end)
+                for days, start, end in windows) for windows in self.windows]
+        return self._active
+
+
+def _severity(levels, value):
+    for low, level in levels:
+        if value >= low:
+            return level
+    return levels[-1][1]
+
+
+class EscalationRules:
+    """Escalation rules sorted by threshold, as parallel lists.
+
+    A frame bisects the thresholds to find the rules the score is above (a
+    prefix of the list) and only walks those; below every threshold it is a
+    single bisect. Each rule keeps its own confirmation start and cooldown.
+    """
+
+    __slots__ = ("names", "thresholds", "confirm", "cooldown", "types", "severities", "schedule", "started",
+                 "last", "armed")
+
+    def __init__(self, rules, utc_offset=0.0, now=0.0, previous=None):
+        rules = sorted(rules, key=lambda r: r["threshold"])
+        self.names = [r["name"] for r in rules]
+        self.thresholds = [r["threshold"] for r in rules]
+        self.confirm = [r["confirm"] for r in rules]
+        self.cooldown = [r["cooldown"] for r in rules]
+        self.types = [r["type"] for r in rules]
+        self.severities = [tuple((low, level) for low, level in r["severity"]) for r in rules]
+        self.schedule = Schedule(rules, utc_offset)
+        self.started = [None] * len(rules)
+        # Rules kept across a reload keep their cooldown; new ones start cooling down now, like a new pipeline
+        carried = dict(zip(previous.names, previous.last)) if previous is not None else {}
+        self.last = [carried.get(name, now) for name in self.names]
+        self.armed = 0 # Rules [0, armed) were above their threshold on the last frame
+
+    def evaluate(self, score, timestamp):
+        """Advances the confirmation timers; returns [(rule index, sustained seconds)] that fire, or None."""
+        k = bisect_left(self.thresholds, score) # Thresholds strictly below the score
+        started = self.started
+        for i in range(k, self.armed):
+            started[i] = None # Subsided
+        self.armed = k
+        fired = None
+        if k:
+            active = self.schedule.active(timestamp)
+            confirm, cooldown, last = self.confirm, self.cooldown, self.last
+            for i in range(k):
+                start = started[i]
+                if start is None:
+                    start = started[i] = timestamp
+                duration = timestamp - start
+                if duration >= confirm[i] and timestamp - last[i] > cooldown[i] and active[i]:
+                    last[i] = timestamp
+                    started[i] = None # Re-arms on the next frame if the score stays up
+                    if fired is None:
+                        fired = []
+                    fired.append((i, duration))
+        return fired
+
+    def severity(self, index, score):
+        return _severity(self.severities[index], score)
+
+    def confirmed(self, timestamp):
+        """Whether any rule has been above its threshold for its confirmation time."""
+        started, confirm = self.started, self.confirm
+        return any(started[i] is not None and timestamp - started[i] >= confirm[i] for i in range(self.armed))
+
+    def reset(self):
+        self.started = [None] * len(self.names)
+        self.armed = 0
+
+
+class LoiteringRules:
+    """Loitering rules sorted by dwell time; a track's `flagged` level counts the rules already reported."""
+
+    __slots__ = ("names", "seconds", "types", "severities", "schedule")
+
+    def __init__(self, rules, utc_offset=0.0):
+        rules = sorted(rules, key=lambda r: r["confirm"])
+        self.names = [r["name"] for r in rules]
+        self.seconds = [r["confirm"] for r in rules]
+        self.types = [r["type"] for r in rules]
+        self.severities = [tuple((low, level) for low, level in r["severity"]) for r in rules]
+        self.schedule = Schedule(rules, utc_offset)
+
+    def severity(self, index, dwell):
+        return _severity(self.severities[index], dwell)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class RuleSet:
+    """A camera's compiled rules. Swapped as a whole on reload, so a frame never sees half of an update."""
+
+    __slots__ = ("source", "keep", "gain", "movement_threshold", "escalation", "loitering")
+
+    def __init__(self, rules, now=0.0, previous=None):
+        self.source = rules
+        self.keep = rules["smoothing"]
+        self.gain = 1.0 - rules["smoothing"]
+        self.movement_threshold = rules["movement_threshold"]
+        by_trigger = {trigger: [r for r in rules["rules"] if r["trigger"] == trigger] for trigger in TRIGGERS}
+        self.escalation = EscalationRules(by_trigger["escalation"], rules["utc_offset"], now,
+                                          previous.escalation if previous is not None else None)
+        self.loitering = LoiteringRules(by_trigger["loitering"], rules["utc_offset"])
+
+
+def compile_rules(rules=None, now=0.0, previous=None):
+    """RuleSet for a rules document (DEFAULT_RULES if None); `previous` carries cooldowns over a reload."""
+    return RuleSet(rules or DEFAULT_RULES, now, previous)
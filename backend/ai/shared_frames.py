@@ -0,0 +1,254 @@
+"""Shared-memory hand-off of frames and status from a camera worker process to the API process.
+
+One `multiprocessing.shared_memory` block per camera holds a small header,
+two JSON blobs (the latest realtime stats and a health snapshot) and a ring
+of frame slots. The worker writes; the API process only reads, mapping
+frames as NumPy views of the block instead of unpickling copies.
+
+Every slot and blob carries a sequence number that the writer clears before
+rewriting it, so a reader can tell after the fact whether what it used was
+overwritten mid-read (`SharedFrameRing.valid`) and drop it.
+"""
+import json
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+# Header words (uint64)
+_LATEST = 0   # Sequence number of the newest complete frame
+_VIEWERS = 1  # Set by the reader: 1 while someone is watching live video
+# Header timestamps (float64, wall clock so both processes agree)
+_HEARTBEAT = 0
+_LAST_FRAME = 1
+
+_HEADER_BYTES = 128
+_SLOT_HEADER_BYTES = 64
+_BLOB_HEADER_BYTES = 16
+BLOB_BYTES = 64 * 1024
+BLOBS = ("stats", "health")
+
+RAW, JPEG = 0, 1
+
+
+class SharedFrameRing:
+    """Fixed-size ring of frame slots plus status blobs in one shared memory block.
+
+    Created by the API process (which owns and unlinks it) and attached by
+    the worker by name. Frames larger than a slot are downscaled to fit.
+    """
+
+    def __init__(self, shm, slots, slot_bytes, owner):
+        self.shm = shm
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = owner
+        buf = shm.buf
+        self._words = np.ndarray((8,), np.uint64, buf, 0)
+        self._times = np.ndarray((8,), np.float64, buf, 64)
+        self._blobs = {}
+        offset = _HEADER_BYTES
+        for name in BLOBS:
+            self._blobs[name] = (np.ndarray((2,), np.uint64, buf, offset), offset + _BLOB_HEADER_BYTES)
+            offset += _BLOB_HEADER_BYTES + BLOB_BYTES
+        self._slot_meta = []
+        self._slot_data = []
+        stride = _SLOT_HEADER_BYTES + slot_bytes
+        for i in range(slots):
+            start = offset + i * stride
+            # seq, kind, height, width, channels, nbytes
+            self._slot_meta.append(np.ndarray((6,), np.uint64, buf, start))
+            self._slot_data.append(start + _SLOT_HEADER_BYTES)
+        self._seq = int(self._words[_LATEST])
+        self._blob_seq = {name: 0 for name in BLOBS}
+        self._blob_lock = threading.Lock() # Stats come from both the analysis and the connection thread
+
+    @classmethod
+    def create(cls, slots, slot_bytes):
+        size = _HEADER_BYTES + len(BLOBS) * (_BLOB_HEADER_BYTES + BLOB_BYTES) + slots * (_SLOT_HEADER_BYTES + slot_bytes)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        shm.buf[:_HEADER_BYTES] = bytes(_HEADER_BYTES)
+        ring = cls(shm, slots, slot_bytes, owner=True)
+        ring.reset()
+        return ring
+
+    @classmethod
+    def attach(cls, name, slots, slot_bytes):
+        return cls(shared_memory.SharedMemory(name=name), slots, slot_bytes, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def reset(self):
+        """Forgets every frame and blob, e.g. before a restarted worker takes over."""
+        self._words[:] = 0
+        self._times[:] = 0.0
+        for meta in self._slot_meta:
+            meta[0] = 0
+        for words, _ in self._blobs.values():
+            words[:] = 0
+        self._seq = 0
+
+    def close(self):
+        # Views into the buffer must go before the mapping can be closed
+        self._words = self._times = None
+        self._blobs, self._slot_meta = {}, []
+        try:
+            self.shm.close()
+        except BufferError:
+            pass # A viewer still holds a frame view; the mapping goes away with it
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    # Writer side (worker process)
+
+    def write_frame(self, frame):
+        if frame.nbytes > self.slot_bytes:
+            scale = (self.slot_bytes / frame.nbytes) ** 0.5
+            size = (max(1, int(frame.shape[1] * scale)), max(1, int(frame.shape[0] * scale)))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        target = self._begin()
+        np.copyto(np.ndarray(frame.shape, np.uint8, self.shm.buf, target), frame, casting="no")
+        self._commit(RAW, height, width, channels, frame.nbytes)
+
+    def write_jpeg(self, data):
+        if len(data) > self.slot_bytes:
+            return
+        target = self._begin()
+        self.shm.buf[target:target + len(data)] = data
+        self._commit(JPEG, 0, 0, 0, len(data))
+
+    def _begin(self):
+        self._seq += 1
+        meta = self._slot_meta[self._seq % self.slots]
+        meta[0] = 0 # Invalidate before overwriting
+        return self._slot_data[self._seq % self.slots]
+
+    def _commit(self, kind, height, width, channels, nbytes):
+        meta = self._slot_meta[self._seq % self.slots]
+        meta[1:] = (kind, height, width, channels, nbytes)
+        meta[0] = self._seq
+        self._words[_LATEST] = self._seq
+        self._times[_LAST_FRAME] = time.time()
+
+    def touch_frame(self):
+        """Records that a frame arrived without copying it (nobody is watching)."""
+        self._times[_LAST_FRAME] = time.time()
+
+    def beat(self):
+        self._times[_HEARTBEAT] = time.time()
+
+    def write_blob(self, name, value):
+        words, start = self._blobs[name]
+        data = json.dumps(value).encode()
+        if len(data) > BLOB_BYTES:
+            return False
+        with self._blob_lock:
+            seq = self._blob_seq[name] + 1
+            words[0] = 0
+            self.shm.buf[start:start + len(data)] = data
+            words[1] = len(data)
+            words[0] = seq
+            self._blob_seq[name] = seq
+        return True
+
+    @property
+    def viewers(self):
+        return bool(self._words[_VIEWERS])
+
+    # Reader side (API process)
+
+    @property
+    def latest_seq(self):
+        return int(self._words[_LATEST])
+
+    def read_latest(self):
+        """(seq, kind, data) of the newest frame without copying: a BGR view or a JPEG memoryview.
+
+        Returns (seq, None, None) if there is no frame yet or it is being rewritten.
+        """
+        seq = int(self._words[_LATEST])
+        if not seq:
+            return 0, None, None
+        meta = self._slot_meta[seq % self.slots]
+        kind, height, width, channels, nbytes = (int(v) for v in meta[1:])
+        if int(meta[0]) != seq:
+            return seq, None, None
+        start = self._slot_data[seq % self.slots]
+        if kind == JPEG:
+            return seq, JPEG, self.shm.buf[start:start + nbytes]
+        shape = (height, width, channels) if channels > 1 else (height, width)
+        return seq, RAW, np.ndarray(shape, np.uint8, self.shm.buf, start)
+
+    def valid(self, seq):
+        """Whether frame `seq` is still intact, i.e. its slot has not been reused since it was read."""
+        if not self._slot_meta:
+            return False # Closed
+        return int(self._slot_meta[seq % self.slots][0]) == seq
+
+    def read_blob(self, name):
+        """(seq, value) of a blob, or (seq, None) if it is empty or was being rewritten."""
+        words, start = self._blobs[name]
+        seq = int(words[0])
+        if not seq:
+            return 0, None
+        data = bytes(self.shm.buf[start:start + int(words[1])])
+        if int(words[0]) != seq:
+            return seq, None
+        try:
+            return seq, json.loads(data)
+        except ValueError:
+            return seq, None
+
+    def blob_seq(self, name):
+        return int(self._blobs[name][0][0])
+
+    def set_viewers(self, watching):
+        self._words[_VIEWERS] = 1 if watching else 0
+
+    @property
+    def heartbeat(self):
+        return float(self._times[_HEARTBEAT])
+
+    @property
+    def last_frame(self):
+        return float(self._times[_LAST_FRAME])
+
+
+class RingPublisher:
+    """Worker-side stand-in for FrameBroadcaster that publishes into a SharedFrameRing.
+
+    Raw frames are only copied into shared memory while the API process
+    reports a viewer, plus one per `idle_interval` so a new viewer starts
+    from a recent picture.
+    """
+
+    closed = False
+    subscribers = 0
+
+    def __init__(self, ring, idle_interval=1.0):
+        self.ring = ring
+        self.idle_interval = idle_interval
+        self._copied_at = 0.0
+
+    def publish(self, frame):
+        now = time.monotonic()
+        if self.ring.viewers or now - self._copied_at >= self.idle_interval:
+            self.ring.write_frame(frame)
+            self._copied_at = now
+        else:
+            self.ring.touch_frame()
+
+    def publish_jpeg(self, data):
+        self.ring.write_jpeg(data)
+
+    def close(self):
+        pass
@@ -0,0 +1,151 @@
+import numpy as np
+
+
+def pairwise_iou(a, b):
+    """Element-wise IoU between two (K, 4) arrays of x1, y1, x2, y2 boxes."""
+    w = np.clip(np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0]), 0, None)
+    h = np.clip(np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1]), 0, None)
+    inter = w * h
+    union = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1]) + (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1]) - inter
+    return inter / np.maximum(union, 1e-9)
+
+
+class IoUTracker:
+    """Multi-object tracker over a fixed-size table of NumPy arrays.
+
+    Detections are matched to live tracks by a cost that combines IoU with
+    centroid distance, so fast movers whose boxes no longer overlap still
+    match. The N x M grid is only gated with cheap comparisons; exact costs
+    are computed for the candidate pairs and resolved by a greedy
+    lowest-cost assignment. Tracks not seen for
+    `max_age` seconds are retired and their slot is reused. Each track keeps
+    a ring of its last `history` centroids plus a "stationary anchor" that
+    is moved whenever the track leaves `movement_threshold` pixels around it,
+    which makes dwell time an O(1) update per frame.
+    """
+
+    def __init__(self, max_tracks=1024, history=64, iou_threshold=0.2, max_distance=80.0,
+                 max_age=1.5, movement_threshold=50.0):
+        self.max_tracks = max_tracks
+        self.history = history
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.max_age = max_age
+        self.movement_threshold = movement_threshold
+
+        self.active = np.zeros(max_tracks, dtype=bool)
+        self.ids = np.zeros(max_tracks, dtype=np.int64)
+        self.boxes = np.zeros((max_tracks, 4), dtype=np.float32)
+        self.first_seen = np.zeros(max_tracks, dtype=np.float64)
+        self.last_seen = np.zeros(max_tracks, dtype=np.float64)
+        self.anchor_xy = np.zeros((max_tracks, 2), dtype=np.float32)
+        self.anchor_t = np.zeros(max_tracks, dtype=np.float64)
+        self.flagged = np.zeros(max_tracks, dtype=np.uint16) # Set by callers (rules reported), cleared when the anchor moves
+        self.hist_xy = np.zeros((max_tracks, history, 2), dtype=np.float32)
+        self.hist_t = np.zeros((max_tracks, history), dtype=np.float64)
+        self.hist_pos = np.zeros(max_tracks, dtype=np.int32)
+        self.hist_len = np.zeros(max_tracks, dtype=np.int32)
+        self.next_id = 1
+        self.overflow = 0 # Detections dropped because the table was full
+
+    def _assign(self, det_boxes, det_xy, slots):
+        """Greedy lowest-cost matching. Returns (detection index, slot) pairs."""
+        track_boxes = self.boxes[slots]
+        track_xy = (track_boxes[:, :2] + track_boxes[:, 2:]) * 0.5
+
+        # Gate candidate pairs on the full N x M grid with cheap comparisons only:
+        # boxes that overlap at all, or centroids within max_distance
+        dx = det_xy[:, None, 0] - track_xy[None, :, 0]
+        dy = det_xy[:, None, 1] - track_xy[None, :, 1]
+        dist2 = dx * dx + dy * dy
+        overlap = ((det_boxes[:, None, 0] < track_boxes[None, :, 2]) & (det_boxes[:, None, 2] > track_boxes[None, :, 0]) &
+                   (det_boxes[:, None, 1] < track_boxes[None, :, 3]) & (det_boxes[:, None, 3] > track_boxes[None, :, 1]))
+        rows, cols = np.nonzero(overlap | (dist2 <= self.max_distance ** 2))
+        if rows.size == 0:
+            return []
+
+        # Exact cost only for the (sparse) candidates
+        iou = pairwise_iou(det_boxes[rows], track_boxes[cols])
+        dist = np.sqrt(dist2[rows, cols])
+        keep = (iou >= self.iou_threshold) | (dist <= self.max_distance)
+        rows, cols, iou, dist = rows[keep], cols[keep], iou[keep], dist[keep]
+        cost = (1.0 - iou) + dist / self.max_distance
+        order = np.argsort(cost, kind="stable")
+
+        used_rows, used_cols, pairs = set(), set(), []
+        for r, c in zip(rows[order].tolist(), cols[order].tolist()):
+            if r in used_rows or c in used_cols:
+                continue
+            used_rows.add(r)
+            used_cols.add(c)
+            pairs.append((r, slots[c]))
+        return pairs
+
+    def update(self, det_boxes, timestamp):
+        """Matches (N, 4) boxes to tracks. Returns the track slot per detection (-1 if dropped)."""
+        det_boxes = np.asarray(det_boxes, dtype=np.float32).reshape(-1, 4)
+        det_xy = (det_boxes[:, :2] + det_boxes[:, 2:]) * 0.5
+
+        # Retire tracks that have not been seen recently
+        expired = self.active & (timestamp - self.last_seen > self.max_age)
+        self.active[expired] = False
+
+        result = np.full(len(det_boxes), -1, dtype=np.int64)
+        live = np.flatnonzero(self.active)
+        if len(det_boxes) and live.size:
+            pairs = self._assign(det_boxes, det_xy, live)
+            if pairs:
+                matched = np.array(pairs, dtype=np.int64)
+                result[matched[:, 0]] = matched[:, 1]
+
+        # Unmatched detections start new tracks in free slots
+        unmatched = np.flatnonzero(result < 0)
+        if unmatched.size:
+            free = np.flatnonzero(~self.active)[:unmatched.size]
+            self.overflow += unmatched.size - free.size
+            new_dets = unmatched[:free.size]
+            result[new_dets] = free
+            self.active[free] = True
+            self.ids[free] = np.arange(self.next_id, self.next_id + free.size)
+            self.next_id += free.size
+            self.first_seen[free] = timestamp
+            self.anchor_xy[free] = det_xy[new_dets]
+            self.anchor_t[free] = timestamp
+            self.flagged[free] = 0
+            self.hist_pos[free] = 0
+            self.hist_len[free] = 0
+
+        seen = result >= 0
+        slots, xy = result[seen], det_xy[seen]
+        if slots.size:
+            self.boxes[slots] = det_boxes[seen]
+            self.last_seen[slots] = timestamp
+
+            # Fixed-size centroid history
+            pos = self.hist_pos[slots]
+            self.hist_xy[slots, pos] = xy
+            self.hist_t[slots, pos] = timestamp
+            self.hist_pos[slots] = (pos + 1) % self.history
+            self.hist_len[slots] = np.minimum(self.hist_len[slots] + 1, self.history)
+
+            # Incremental dwell: re-anchor tracks that moved away from their anchor
+            moved = np.sqrt(((xy - self.anchor_xy[slots]) ** 2).sum(axis=1)) > self.movement_threshold
+            moved_slots = slots[moved]
+            self.anchor_xy[moved_slots] = xy[moved]
+            self.anchor_t[moved_slots] = timestamp
+            self.flagged[moved_slots] = 0
+        return result
+
+    def dwell(self, slots, timestamp):
+        """Seconds each track has stayed within `movement_threshold` of its anchor."""
+        return timestamp - self.anchor_t[slots]
+
+    def track_history(self, slot):
+        """Chronological (timestamps, centroids) for one track."""
+        n, pos = int(self.hist_len[slot]), int(self.hist_pos[slot])
+        order = (np.arange(pos - n, pos) % self.history)
+        return self.hist_t[slot, order], self.hist_xy[slot, order]
+
+    @property
+    def track_count(self):
+        return int(self.active.sum())
@@ -0,0 +1,394 @@
+"""Camera pipelines in their own processes (SENTINEL_CAMERA_MODE=process).
+
+Each camera runs an ordinary AIProcessor in a child process, so OpenCV glue
+code and analysis no longer compete with request handling for the API
+process's GIL. Frames, realtime stats and health go through a
+SharedFrameRing; the few discrete events (incidents, evidence paths,
+status changes, alerts) go through a multiprocessing queue and are handled
+in the API process with the same callbacks a threaded pipeline would call.
+The motion heatmap is mirrored the same way every few seconds.
+
+The API process never blocks on a worker: it only polls shared memory and
+drains the event queue. A worker that exits or stops heart-beating is
+killed and relaunched by the camera pool's supervisor.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from backend import config
+from backend.ai.pipeline import StageStats
+from backend.ai.shared_frames import JPEG, RAW, RingPublisher, SharedFrameRing
+from backend.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Fork is unsafe with the server's threads (and OpenCV's); children import the backend afresh
+_mp = multiprocessing.get_context("spawn")
+
+
+def run_worker(camera_id, source, owner_id, zones, ring_name, slots, slot_bytes, events, control, heatmap_state=None,
+               rules=None, target_fps=None):
+    """Entry point of a camera worker process."""
+    from backend.ai.processor import AIProcessor, HAS_AI_LIBS
+    from backend.ai.recorder import clip_store
+
+    parent = os.getppid()
+    ring = SharedFrameRing.attach(ring_name, slots, slot_bytes)
+    tokens = iter(range(1, 1 << 62))
+
+    def save_incident(meta):
+        token = next(tokens)
+        events.put(("incident", token, meta))
+        return token # Stands in for the IncidentHandle, which lives in the API process
+
+    def update_incident(token, **fields):
+        events.put(("update", token, fields))
+
+    async def broadcast(message):
+        events.put(("broadcast", message))
+
+    detection = _start_detection() if HAS_AI_LIBS else None
+    processor = AIProcessor(
+        broadcast_callback=broadcast,
+        save_incident_callback=save_incident,
+        realtime_callback=lambda stats: ring.write_blob("stats", stats),
+        update_incident_callback=update_incident,
+        status_callback=lambda _, status: events.put(("status", status)),
+        detector=detection,
+        zones=zones,
+        rules=rules,
+        target_fps=target_fps,
+    )
+    if HAS_AI_LIBS:
+        processor.frames = RingPublisher(ring)
+        if heatmap_state is not None:
+            processor.heatmap.load_state(heatmap_state) # Carry the history over a restart
+    processor.start_feed(source=source, camera_id=camera_id, owner_id=owner_id)
+
+    heatmap_version, heatmap_sent = None, 0.0
+    try:
+        while os.getppid() == parent: # Orphaned workers exit on their own
+            ring.beat()
+            ring.write_blob("health", {**processor.health(), "pipeline": processor.pipeline_stats()})
+            if processor.heatmap is not None and time.monotonic() - heatmap_sent >= config.HEATMAP_PUBLISH_INTERVAL:
+                # Snapshot history only travels when a snapshot was added
+                state = processor.heatmap.state(full=processor.heatmap.version != heatmap_version)
+                if state is not None:
+                    events.put(("heatmap", state))
+                    heatmap_version = state["version"]
+                heatmap_sent = time.monotonic()
+            try:
+                command, arg = control.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if command == "stop":
+                break
+            if command == "zones":
+                processor.set_zones(arg)
+            elif command == "rules":
+                processor.set_rules(arg)
+            elif command == "context":
+                processor.camera_id, processor.owner_id = arg
+    finally:
+        processor.stop()
+        if detection is not None:
+            detection.stop()
+        clip_store.shutdown()
+        events.close()
+        ring.close()
+
+
+def _start_detection():
+    from backend.ai.detector import DetectionScheduler, create_detector
+    detector = create_detector()
+    if detector is None:
+        return None
+    # One model per worker process; inference is no longer batched across cameras
+    scheduler = DetectionScheduler(detector)
+    scheduler.start()
+    return scheduler
+
+
+class CameraWorker:
+    """API-process side of a camera worker; stands in for AIProcessor in the camera pool.
+
+    Exposes what the API uses (`frames`, `heatmap`, `health`,
+    `pipeline_stats`, `set_zones`, `set_rules`, `is_alive`, `restart`, `stop`). Live frames are published
+    into a local FrameBroadcaster as views of shared memory, so they are only
+    copied if a viewer needs them encoded.
+    """
+
+    def __init__(self, broadcast_callback=None, save_incident_callback=None, realtime_callback=None,
+                 update_incident_callback=None, status_callback=None, loop=None, zones=None,
+                 rules=None, target_fps=None, slots=None, slot_bytes=None, poll_interval=None, heartbeat_timeout=None):
+        from backend.ai.frame_buffer import FrameBroadcaster
+        from backend.ai.heatmap import MotionHeatmap
+        self.broadcast_callback = broadcast_callback
+        self.save_incident_callback = save_incident_callback
+        self.realtime_callback = realtime_callback
+        self.update_incident_callback = update_incident_callback
+        self.status_callback = status_callback
+        self.loop = loop
+        self.zones = zones
+        self.rules = rules
+        self.target_fps = target_fps # None = the worker's TARGET_ANALYSIS_FPS
+        self.slots = slots or config.SHM_SLOTS
+        self.slot_bytes = slot_bytes or int(config.SHM_SLOT_MB * 1024 * 1024)
+        self.poll_interval = poll_interval or config.WORKER_POLL_INTERVAL
+        self.heartbeat_timeout = heartbeat_timeout or config.WORKER_HEARTBEAT_TIMEOUT
+        self.is_running = False
+        self._camera_id = "WEB-01"
+        self._owner_id = "admin"
+        self.source = None
+        self.status = "connecting"
+        self.frames = FrameBroadcaster(stats=StageStats("encode"))
+        self.heatmap = MotionHeatmap() # Mirror of the worker's, updated from its events
+        self.ring = None
+        self.process = None
+        self.restarts = 0
+        self._events = None
+        self._control = None
+        self._started_at = 0.0
+        self._monitor = None
+        self._stop_event = threading.Event()
+        self._handles = OrderedDict() # worker token -> IncidentHandle, for evidence updates
+        self._merged = OrderedDict() # worker tokens of events the correlator merged; their evidence is deleted
+        self._health = {}
+        self._watched_until = 0.0
+        self._restart_counter = None
+
+    @property
+    def camera_id(self):
+        return self._camera_id
+
+    @camera_id.setter
+    def camera_id(self, value):
+        self._camera_id = value
+        self._send("context", (self._camera_id, self._owner_id))
+
+    @property
+    def owner_id(self):
+        return self._owner_id
+
+    @owner_id.setter
+    def owner_id(self, value):
+        self._owner_id = value
+        self._send("context", (self._camera_id, self._owner_id))
+
+    def start_feed(self, source=0, camera_id="DEMO-USER-CAM", owner_id="admin"):
+        self._camera_id, self._owner_id, self.source = camera_id, owner_id, source
+        if self.is_running:
+            return
+        self.is_running = True
+        if self.ring is None:
+            self.ring = SharedFrameRing.create(self.slots, self.slot_bytes)
+        self._bind_metrics()
+        self._launch()
+        self._stop_event.clear()
+        self._monitor = threading.Thread(target=self._monitor_loop, name=f"worker-monitor-{camera_id}", daemon=True)
+        self._monitor.start()
+
+    def _launch(self):
+        self.ring.reset()
+        self._events = _mp.Queue()
+        self._control = _mp.Queue()
+        self._started_at = time.time()
+        self.process = _mp.Process(
+            target=run_worker, name=f"camera-{self._camera_id}", daemon=True,
+            args=(self._camera_id, self.source, self._owner_id, self.zones, self.ring.name,
+                  self.slots, self.slot_bytes, self._events, self._control, self.heatmap.state(), self.rules, self.target_fps),
+        )
+        self.process.start()
+        logger.info(f"Camera worker {self._camera_id} started (pid {self.process.pid}).")
+
+    def _terminate(self, timeout):
+        process, self.process = self.process, None
+        if process is None:
+            return
+        if process.is_alive():
+            self._send("stop", None)
+            process.join(timeout)
+        if process.is_alive():
+            process.terminate()
+            process.join(1.0)
+        if process.is_alive():
+            process.kill()
+            process.join(1.0)
+        for q in (self._events, self._control):
+            if q is not None:
+                q.cancel_join_thread() # Never block on a queue a dead worker left half-read
+                q.close()
+        self._events = self._control = None
+
+    def _send(self, command, arg):
+        control = self._control
+        if control is not None:
+            try:
+                control.put_nowait((command, arg))
+            except (ValueError, OSError):
+                pass # Queue already closed
+
+    def is_alive(self):
+        """Running and heart-beating; a hung worker counts as dead so the supervisor replaces it."""
+        if not self.is_running or self.process is None or not self.process.is_alive():
+            return False
+        last_beat = max(self.ring.heartbeat, self._started_at)
+        return time.time() - last_beat < self.heartbeat_timeout
+
+    def restart(self):
+        """Kills and relaunches the worker; viewers stay attached to `frames`."""
+        exitcode = self.process.exitcode if self.process is not None else None
+        logger.warning(f"Restarting camera worker {self._camera_id} (exit code {exitcode}).")
+        self._terminate(timeout=1.0)
+        self.status = "connecting"
+        self.restarts += 1
+        if self._restart_counter is not None:
+            self._restart_counter.inc()
+        if self.is_running:
+            self._launch()
+
+    def stop(self, timeout=5.0):
+        self.is_running = False
+        self._stop_event.set()
+        if self._monitor is not None and self._monitor is not threading.current_thread():
+            self._monitor.join(timeout)
+        self._terminate(timeout)
+        self.frames.close()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        metrics.registry.clear(camera=self._camera_id)
+
+    def set_zones(self, zones):
+        self.zones = zones # Also used when the worker is relaunched
+        self._send("zones", zones)
+
+    def set_rules(self, rules):
+        self.rules = rules # Also used when the worker is relaunched
+        self._send("rules", rules)
+
+    def last_frame_age(self):
+        ring = self.ring
+        if ring is None or not ring.last_frame:
+            return None
+        return max(0.0, time.time() - ring.last_frame)
+
+    def health(self):
+        age = self.last_frame_age()
+        return {
+            "status": self.status,
+            "alive": self.is_alive(),
+            "last_frame_age": round(age, 2) if age is not None else None,
+            "capture_fps": self._health.get("capture_fps", 0.0),
+            "analysis_fps": self._health.get("analysis_fps", 0.0),
+            "reconnects": self._health.get("reconnects", 0),
+            "pid": self.process.pid if self.process is not None else None,
+            "restarts": self.restarts,
+        }
+
+    def pipeline_stats(self):
+        stats = dict(self._health.get("pipeline") or {"camera_id": self._camera_id, "stages": {}})
+        # Encoding happens here, in the API process
+        stats["stages"] = {**stats.get("stages", {}), "encode": self.frames.stats.snapshot()}
+        stats["viewers"] = self.frames.subscribers
+        return stats
+
+    def _bind_metrics(self):
+        self._restart_counter = metrics.WORKER_RESTARTS.labels(self._camera_id)
+        metrics.LAST_FRAME_AGE.labels(self._camera_id).set_function(self.last_frame_age)
+        metrics.CAPTURE_FPS.labels(self._camera_id).set_function(lambda: self._health.get("capture_fps", 0.0))
+        metrics.CAMERA_LIVE.labels(self._camera_id).set_function(lambda: self.status == "live")
+
+    def _dispatch(self, coro):
+        if self.loop is not None and self.loop.is_running():
+            return asyncio.run_coroutine_threadsafe(coro, self.loop)
+        asyncio.run(coro)
+
+    def _monitor_loop(self):
+        """Forwards frames, stats and events from shared memory/the event queue; never waits on the worker."""
+        frame_seq = stats_seq = health_seq = 0
+        ring = self.ring
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            if self.frames.subscribers:
+                self._watched_until = now + 2.0 # Viewers come and go between frames; don't flap
+            watching = now < self._watched_until
+            ring.set_viewers(watching)
+
+            seq = ring.latest_seq
+            if seq != frame_seq:
+                frame_seq, kind, data = ring.read_latest()
+                if kind == RAW:
+                    self.frames.publish(data, valid=lambda s=frame_seq: ring.valid(s))
+                elif kind == JPEG:
+                    self.frames.publish_jpeg(bytes(data))
+
+            if ring.blob_seq("stats") != stats_seq:
+                stats_seq, stats = ring.read_blob("stats")
+                if stats is not None and self.realtime_callback:
+                    self._call(self.realtime_callback, stats)
+            if ring.blob_seq("health") != health_seq:
+                health_seq, health = ring.read_blob("health")
+                if health is not None:
+                    self._health = health
+
+            self._drain_events()
+            # Poll quickly only while someone watches the live view
+            self._stop_event.wait(self.poll_interval if watching else 1.0 / config.STATS_RATE_HZ)
+
+    def _drain_events(self):
+        events = self._events
+        if events is None:
+            return
+        for _ in range(100):
+            try:
+                event = events.get_nowait()
+            except (queue.Empty, ValueError, OSError):
+                return
+            try:
+                self._handle_event(event)
+            except Exception as e:
+                metrics.ERRORS.labels("camera_worker").inc()
+                logger.error(f"Camera worker event {event[0]} failed for {self._camera_id}: {e}")
+
+    def _handle_event(self, event):
+        kind = event[0]
+        if kind == "incident":
+            _, token, meta = event
+            handle = self.save_incident_callback(meta) if self.save_incident_callback else None
+            # None: the correlator merged the event into an open incident, but the worker has already
+            # started recording evidence for it
+            tokens = self._handles if handle is not None else self._merged
+            tokens[token] = handle
+            while len(tokens) > 256:
+                tokens.popitem(last=False)
+        elif kind == "update":
+            _, token, fields = event
+            handle = self._handles.get(token)
+            if handle is not None and self.update_incident_callback:
+                self.update_incident_callback(handle, **fields)
+            elif token in self._merged:
+                from backend.ai.recorder import clip_store
+                clip_store.discard(fields.get("snapshot_path"), fields.get("clip_path"))
+        elif kind == "broadcast":
+            if self.broadcast_callback:
+                self._dispatch(self.broadcast_callback(event[1]))
+        elif kind == "heatmap":
+            self.heatmap.load_state(event[1])
+        elif kind == "status":
+            self.status = event[1]
+            if self.status_callback:
+                self.status_callback(self._camera_id, self.status)
+
+    def _call(self, callback, arg):
+        try:
+            callback(arg)
+        except Exception as e:
+            metrics.ERRORS.labels("camera_worker").inc()
+            logger.debug(f"Camera worker callback failed for {self._camera_id}: {e}")
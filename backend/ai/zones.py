@@ -0,0 +1,35 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fraction of a zone's pixels that must change for it to count as fully active
+DEFAULT_ZONE_THRESHOLD = 0.05
+
+
+def load_zones(raw):
+    """Parses `Camera.zones` (JSON text or a list) into zone dicts; bad entries are skipped.
+
+    Each zone is {"name", "points": [[x, y], ...], "threshold", "exclude"} with
+    points normalised to 0-1 so the same polygons work at any resolution.
+    """
+    if not raw:
+        return []
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            logger.warning("Ignoring malformed camera zones.")
+            return []
+    zones = []
+    for i, zone in enumerate(raw):
+        points = zone.get("points") or []
+        if len(points) < 3:
+            continue
+        zones.append({
+            "name": zone.get("name") or f"zone-{i + 1}",
+            "points": [[float(x), float(y)] for x, y in points],
+            "threshold": float(zone.get("threshold") or DEFAULT_ZONE_THRESHOLD),
+            "exclude": bool(zone.get("exclude", False)),
+        })
+    return zones
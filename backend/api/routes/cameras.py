@@ -1,6 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple, Union
+import io
+import json
 from backend.models.database import Camera, SessionLocal
+from backend.ai.camera_pool import camera_pool
+from backend.ai.rules import DEFAULT_RULES, load_rules, parse_rules
+from backend.ai.zones import DEFAULT_ZONE_THRESHOLD, load_zones
+from backend.services.correlation import incident_correlator
 
 router = APIRouter(prefix="/cameras", tags=["cameras"])
 
@@ -18,11 +28,14 @@ async def get_cameras(x_user_id: str = Header("admin"), db: Session = Depends(ge
     return db.query(Camera).filter(Camera.owner_id == x_user_id).all()
 
 @router.post("/")
-async def add_camera(name: str, location: str, source: str, x_user_id: str = Header("admin"), db: Session = Depends(get_db)):
-    new_cam = Camera(name=name, location=location, source_url=source, owner_id=x_user_id)
+async def add_camera(name: str, location: str, source: str, analysis_fps: Optional[float] = Query(None, gt=0, le=60),
+                     x_user_id: str = Header("admin"), db: Session = Depends(get_db)):
+    new_cam = Camera(name=name, location=location, source_url=source, owner_id=x_user_id, analysis_fps=analysis_fps)
     db.add(new_cam)
     db.commit()
     db.refresh(new_cam)
+    incident_correlator.set_group(new_cam.id, new_cam.location)
+    await run_in_threadpool(camera_pool.attach_camera, new_cam) # Hot-attach without a restart
     return new_cam
 
 @router.delete("/{camera_id}")
@@ -37,4 +50,153 @@ async def delete_camera(camera_id: int, x_user_id: str = Header("admin"), db: Se
     
     db.delete(cam)
     db.commit()
+    await run_in_threadpool(camera_pool.detach, str(camera_id))
+    incident_correlator.set_group(camera_id, None)
     return {"status": "success", "message": f"Camera {camera_id} deleted"}
+
+class Zone(BaseModel):
+    name: str = ""
+    points: List[List[float]] # [[x, y], ...] normalised to 0-1
+    threshold: float = DEFAULT_ZONE_THRESHOLD
+    exclude: bool = False
+
+@router.put("/{camera_id}/zones")
+async def update_zones(camera_id: int, zones: List[Zone], x_user_id: str = Header("admin"), db: Session = Depends(get_db)):
+    cam = db.query(Camera).filter(Camera.id == camera_id).first()
+    if not cam:
+        raise HTTPException(status_code=404, detail="Camera node not found")
+    if x_user_id != "admin" and cam.owner_id != x_user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to edit this node")
+    for zone in zones:
+        if len(zone.points) < 3 or any(len(p) != 2 or not (0 <= p[0] <= 1 and 0 <= p[1] <= 1) for p in zone.points):
+            raise HTTPException(status_code=400, detail="Zones need at least 3 points with coordinates in 0-1")
+        if zone.threshold <= 0:
+            raise HTTPException(status_code=400, detail="Zone threshold must be positive")
+
+    parsed = load_zones([zone.dict() for zone in zones])
+    cam.zones = json.dumps(parsed) if parsed else None
+    db.commit()
+    # The running pipeline drops its cached masks and re-rasterizes on the next frame
+    camera_pool.set_zones(str(camera_id), parsed)
+    return {"status": "success", "camera_id": camera_id, "zones": parsed}
+
+class ScheduleWindow(BaseModel):
+    days: List[str] = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+    start: str = "00:00" # HH:MM, local time; a window ending before it starts wraps past midnight
+    end: str = "00:00"
+
+class Rule(BaseModel):
+    name: str = ""
+    trigger: str = Field("escalation", pattern="^(escalation|loitering)$")
+    type: Optional[str] = None
+    threshold: Optional[float] = None # Escalation score the smoothed motion must exceed
+    confirm: Optional[float] = None # Seconds the condition must hold (escalation) or a person must stay (loitering)
+    cooldown: Optional[float] = None # Seconds between incidents of an escalation rule
+    severity: Union[str, List[Tuple[float, str]], None] = None # Level, or [minimum, level] pairs
+    schedule: List[ScheduleWindow] = []
+
+class Rules(BaseModel):
+    smoothing: float = DEFAULT_RULES["smoothing"]
+    movement_threshold: float = DEFAULT_RULES["movement_threshold"]
+    utc_offset: float = 0.0
+    rules: List[Rule]
+
+def get_owned_camera(db: Session, camera_id: int, x_user_id: str):
+    cam = db.query(Camera).filter(Camera.id == camera_id).first()
+    if not cam:
+        raise HTTPException(status_code=404, detail="Camera node not found")
+    if x_user_id != "admin" and cam.owner_id != x_user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to edit this node")
+    return cam
+
+@router.get("/{camera_id}/rules")
+async def get_rules(camera_id: int, x_user_id: str = Header("admin"), db: Session = Depends(get_db)):
+    cam = get_owned_camera(db, camera_id, x_user_id)
+    return {"camera_id": camera_id, "custom": cam.rules is not None, **load_rules(cam.rules)}
+
+@router.put("/{camera_id}/rules")
+async def update_rules(camera_id: int, rules: Rules, x_user_id: str = Header("admin"), db: Session = Depends(get_db)):
+    cam = get_owned_camera(db, camera_id, x_user_id)
+    # Unset fields take their trigger's defaults
+    try:
+        parsed = parse_rules(rules.dict(exclude_none=True))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cam.rules = json.dumps(parsed)
+    db.commit()
+    # The running pipeline recompiles them and applies them from its next frame
+    camera_pool.set_rules(str(camera_id), parsed)
+    return {"status": "success", "camera_id": camera_id, **parsed}
+
+@router.delete("/{camera_id}/rules")
+async def reset_rules(camera_id: int, x_user_id: str = Header("admin"), db: Session = Depends(get_db)):
+    cam = get_owned_camera(db, camera_id, x_user_id)
+    cam.rules = None
+    db.commit()
+    camera_pool.set_rules(str(camera_id), DEFAULT_RULES)
+    return {"status": "success", "camera_id": camera_id, **DEFAULT_RULES}
+
+def get_heatmap_engine(db: Session, camera_id: int, x_user_id: str):
+    cam = db.query(Camera).filter(Camera.id == camera_id).first()
+    if not cam:
+        raise HTTPException(status_code=404, detail="Camera node not found")
+    if x_user_id != "admin" and cam.owner_id != x_user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to view this node")
+    engine = camera_pool.get(str(camera_id))
+    if engine is None or getattr(engine, "heatmap", None) is None:
+        raise HTTPException(status_code=404, detail="Camera is not running")
+    return engine
+
+def iso_utc(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None).isoformat() if seconds is not None else None
+
+@router.get("/{camera_id}/heatmap")
+async def get_heatmap(
+    camera_id: int,
+    window: str = Query("live", pattern="^(live|hour|day)$"),
+    at: Optional[datetime] = None,
+    format: str = Query("png", pattern="^(png|json|npy)$"),
+    width: Optional[int] = Query(None, ge=8, le=4096),
+    scale: Optional[float] = Query(None, gt=0, le=1),
+    x_user_id: str = Header("admin"),
+    db: Session = Depends(get_db),
+):
+    """Where motion happened: the decaying live map, the current hour/day, or the hourly/daily snapshot starting `at`.
+
+    Values are the fraction of analysed frames in which each cell saw motion.
+    `png` is a transparent colour overlay for the camera image (hottest cell
+    = `scale`, default the map's maximum); `json`/`npy` return the raw grid.
+    """
+    heatmap = get_heatmap_engine(db, camera_id, x_user_id).heatmap
+    if at is not None and window == "live":
+        raise HTTPException(status_code=400, detail="`at` selects an hourly or daily snapshot")
+    if at is not None:
+        at = (at if at.tzinfo else at.replace(tzinfo=timezone.utc)).timestamp()
+    start, grid = heatmap.grid(window, at)
+    if grid is None:
+        raise HTTPException(status_code=404, detail="No heatmap for this window yet")
+
+    headers = {"X-Heatmap-Start": iso_utc(start) or "", "X-Heatmap-Max": f"{float(grid.max()):.6f}"}
+    if format == "json":
+        return {
+            "camera_id": camera_id,
+            "window": window,
+            "start": iso_utc(start),
+            "updated": iso_utc(heatmap.updated),
+            "shape": list(grid.shape),
+            "values": grid.round(4).tolist(),
+        }
+    if format == "npy":
+        import numpy as np # Only present with the vision stack, which is also what produces heatmaps
+        buffer = io.BytesIO()
+        np.save(buffer, grid)
+        return Response(buffer.getvalue(), media_type="application/octet-stream", headers=headers)
+    from backend.ai.heatmap import render_png
+    png = await run_in_threadpool(render_png, grid, width or heatmap.size[0], scale)
+    return Response(png, media_type="image/png", headers=headers)
+
+@router.get("/{camera_id}/heatmap/snapshots")
+async def list_heatmap_snapshots(camera_id: int, x_user_id: str = Header("admin"), db: Session = Depends(get_db)):
+    """Start times of the hourly and daily heatmap snapshots kept for this camera (pass one as `at`)."""
+    heatmap = get_heatmap_engine(db, camera_id, x_user_id).heatmap
+    return {window: [iso_utc(start) for start in starts] for window, starts in heatmap.snapshots().items()}
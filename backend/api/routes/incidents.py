@@ -1,9 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional
+import base64
+import os
+import re
 from backend.models.database import Incident, SessionLocal
+from backend.services.export import FORMATS, export_incidents
+from backend.services.retention import incident_archive, naive_utc
+from backend.services.rollups import BUCKETS, query_stats, resolve_window, stats_cache
+from backend import config
 
 router = APIRouter(prefix="/incidents", tags=["incidents"])
 
+INCIDENT_FIELDS = [column.name for column in Incident.__table__.columns]
+
 def get_db():
     db = SessionLocal()
     try:
@@ -11,11 +25,137 @@ def get_db():
     finally:
         db.close()
 
+def encode_cursor(timestamp: datetime, incident_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{incident_id}".encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        timestamp, incident_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(incident_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def parse_fields(fields: Optional[str]):
+    """Sparse field selection; id and timestamp are always returned (the cursor needs them)."""
+    if not fields:
+        return INCIDENT_FIELDS
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in INCIDENT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ["id", "timestamp"] + [f for f in requested if f not in ("id", "timestamp")]
+
+def build_incident_query(db: Session, owner_id: str = "admin", camera_id=None, severity=None, incident_type=None,
+                         since=None, until=None, cursor=None, fields=INCIDENT_FIELDS):
+    """Newest-first incident query, paginated by a (timestamp, id) keyset."""
+    query = db.query(*[getattr(Incident, f) for f in fields])
+    if owner_id != "admin":
+        query = query.filter(Incident.owner_id == owner_id)
+    if camera_id is not None:
+        query = query.filter(Incident.camera_id == camera_id)
+    if severity is not None:
+        query = query.filter(Incident.severity == severity)
+    if incident_type is not None:
+        query = query.filter(Incident.type == incident_type)
+    if since is not None:
+        query = query.filter(Incident.timestamp >= since)
+    if until is not None:
+        query = query.filter(Incident.timestamp < until)
+    if cursor is not None:
+        query = query.filter(tuple_(Incident.timestamp, Incident.id) < cursor)
+    return query.order_by(Incident.timestamp.desc(), Incident.id.desc())
+
 @router.get("/")
-async def get_incidents(x_user_id: str = Header("admin"), db: Session = Depends(get_db)):
-    if x_user_id == "admin":
-        return db.query(Incident).order_by(Incident.timestamp.desc()).all()
-    return db.query(Incident).filter(Incident.owner_id == x_user_id).order_by(Incident.timestamp.desc()).all()
+async def get_incidents(
+    response: Response,
+    x_user_id: str = Header("admin"),
+    camera_id: Optional[str] = None,
+    severity: Optional[str] = None,
+    incident_type: Optional[str] = Query(None, alias="type"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Lists incidents newest first. Pass the `X-Next-Cursor` response header back as `cursor` for the next page.
+
+    A `since` older than the retention cutoff also pages through archived incidents.
+    """
+    since, until = naive_utc(since), naive_utc(until) # Stored timestamps are naive UTC
+    selected = parse_fields(fields)
+    position = decode_cursor(cursor) if cursor else None
+    rows = build_incident_query(
+        db, x_user_id, camera_id, severity, incident_type, since, until, position, selected
+    ).limit(limit + 1).all()
+    rows = [row._asdict() for row in rows]
+
+    # Archived incidents are all older than the live ones, so they only matter once the live page runs short
+    # (or reaches rows older than the cutoff that arrived after the last retention pass)
+    if incident_archive.covers(since) and (len(rows) <= limit or rows[-1]["timestamp"] < incident_archive.archived_before):
+        archived = await run_in_threadpool(
+            incident_archive.scan, x_user_id, camera_id, severity, incident_type, since, until, position, limit + 1, selected
+        )
+        rows = sorted(rows + archived, key=lambda row: (row["timestamp"], row["id"]), reverse=True)
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["timestamp"], rows[-1]["id"])
+    return rows
+
+# Declared before /{incident_id} so "stats" and "export" are not parsed as ids
+@router.get("/stats")
+async def get_incident_stats(
+    response: Response,
+    x_user_id: str = Header("admin"),
+    bucket: str = Query("hour", pattern="^(minute|hour|day)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    camera_id: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Incident counts per minute/hour/day bucket by camera, severity and type (hour/day from the rollup table)."""
+    since, until = resolve_window(bucket, since, until)
+    if until <= since:
+        raise HTTPException(status_code=400, detail="`until` must be after `since`")
+    if (until - since) / BUCKETS[bucket] > config.STATS_MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Too many {bucket} buckets; use a larger bucket or a shorter range")
+
+    key = (x_user_id, bucket, since, until, camera_id)
+    cached = stats_cache.get(key)
+    if cached is not None:
+        response.headers["X-Cache"] = "hit"
+        return cached
+    generation = stats_cache.generation
+    result = await run_in_threadpool(query_stats, db, x_user_id, bucket, since, until, camera_id)
+    stats_cache.put(key, result, generation)
+    response.headers["X-Cache"] = "miss"
+    return result
+
+@router.get("/export")
+async def export_incident_history(
+    x_user_id: str = Header("admin"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    camera_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fields: Optional[str] = None,
+):
+    """Streams every matching incident, oldest first, as NDJSON or CSV (archived ones included)."""
+    selected = parse_fields(fields)
+
+    def stream():
+        # Own session: the response body is still being produced after the endpoint returns
+        db = SessionLocal()
+        try:
+            yield from export_incidents(db, format, selected, owner_id=x_user_id, camera_id=camera_id, since=since, until=until)
+        finally:
+            db.close()
+
+    filename = f"incidents-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(stream(), media_type=FORMATS[format],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
 
 @router.get("/{incident_id}")
 async def get_incident(incident_id: int, db: Session = Depends(get_db)):
@@ -24,6 +164,63 @@ async def get_incident(incident_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Incident not found")
     return incident
 
+def get_evidence_path(db: Session, incident_id: int, column: str, owner_id: str = "admin"):
+    query = db.query(Incident).filter(Incident.id == incident_id)
+    if owner_id != "admin":
+        query = query.filter(Incident.owner_id == owner_id)
+    incident = query.first()
+    if not incident:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    path = getattr(incident, column)
+    if not path or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="No recording available for this incident")
+    return path
+
+def range_file_response(request: Request, path: str, media_type: str, chunk_size: int = 64 * 1024):
+    """Serves a file with single-range `Range: bytes=` support so players can seek."""
+    file_size = os.path.getsize(path)
+    start, end = 0, file_size - 1
+    status_code = 200
+    range_header = request.headers.get("range")
+    if range_header:
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", range_header.strip())
+        if not match or match.groups() == ("", ""):
+            raise HTTPException(status_code=416, detail="Invalid range", headers={"Content-Range": f"bytes */{file_size}"})
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), file_size - 1) if last else file_size - 1
+        else: # Suffix range: the last N bytes
+            start = max(0, file_size - int(last))
+        if start > end or start >= file_size:
+            raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{file_size}"})
+        status_code = 206
+
+    def iter_file():
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start + 1)}
+    if status_code == 206:
+        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+    return StreamingResponse(iter_file(), status_code=status_code, media_type=media_type, headers=headers)
+
+@router.get("/{incident_id}/snapshot")
+async def get_incident_snapshot(incident_id: int, x_user_id: str = Header("admin"), db: Session = Depends(get_db)):
+    return FileResponse(get_evidence_path(db, incident_id, "snapshot_path", x_user_id), media_type="image/jpeg")
+
+@router.get("/{incident_id}/clip")
+async def get_incident_clip(incident_id: int, request: Request, x_user_id: str = Header("admin"),
+                            db: Session = Depends(get_db)):
+    return range_file_response(request, get_evidence_path(db, incident_id, "clip_path", x_user_id), "video/x-msvideo")
+
 from pydantic import BaseModel
 from typing import Optional
 
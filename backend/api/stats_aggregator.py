@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import threading
+import time
+
+from backend import config
+from backend.services import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class StatsAggregator:
+    """Coalesces per-camera escalation stats into one WebSocket message per owner per tick.
+
+    Pipelines call `update` from their own threads; it only stores the latest
+    value. A task on the server event loop publishes everything that changed
+    at `rate_hz`, so the cost is O(ticks x clients) regardless of frame rate.
+    Clients with topic subscriptions get one message per owner, so an
+    `owner:`/`camera:` subscription never carries another owner's cameras;
+    unfiltered clients (which see every owner's alerts anyway) get all
+    cameras in a single message.
+    """
+
+    def __init__(self, manager, rate_hz=None, stale_after=5.0):
+        self.manager = manager
+        self.interval = 1.0 / (rate_hz or config.STATS_RATE_HZ)
+        self.stale_after = stale_after
+        self._latest = {} # camera_id -> (monotonic time, stats)
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._task = None
+
+    def update(self, stats: dict):
+        """Thread-safe and non-blocking; the newest value per camera wins."""
+        with self._lock:
+            self._latest[stats["cam"]] = (time.monotonic(), stats)
+            self._dirty = True
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self):
+        """Builds [(message, for subscribed clients)], or None if nothing changed since the last tick."""
+        now = time.monotonic()
+        with self._lock:
+            if not self._dirty:
+                return None
+            self._dirty = False
+            for camera_id in [c for c, (ts, _) in self._latest.items() if now - ts > self.stale_after]:
+                del self._latest[camera_id]
+            cameras = [stats for _, stats in self._latest.values()]
+        if not cameras:
+            return None
+        by_owner = {}
+        for stats in cameras:
+            by_owner.setdefault(stats.get("owner_id"), []).append(stats)
+        return [(self._message(cameras), False)] + [(self._message(owned), True) for owned in by_owner.values()]
+
+    @staticmethod
+    def _message(cameras):
+        # Top-level fields mirror the most escalated camera for single-feed dashboards
+        headline = max(cameras, key=lambda s: s["score"])
+        return {**headline, "type": "stats", "cameras": cameras}
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                for message, subscribed in self.snapshot() or ():
+                    await self.manager.broadcast(message, subscribed=subscribed)
+            except Exception as e: # Nobody awaits this task until shutdown; one bad payload must not end it
+                metrics.ERRORS.labels("stats").inc()
+                logger.error(f"Publishing live stats failed: {e}")
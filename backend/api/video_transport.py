@@ -0,0 +1,235 @@
+"""Live video over a WebSocket with client-acknowledged flow control.
+
+Each binary message is one frame: a JPEG, or an H.264 access unit (Annex B)
+when `codec=h264` is requested and PyAV is installed. The client answers
+every frame with an "ack" text message. At most `window` frames are
+unacknowledged; once the window is full nothing is queued, and the next
+frame sent is the newest one, so a slow client gets fewer frames rather
+than a growing backlog. JSON text messages of type "video_params" announce
+the codec and the current quality/scale/FPS, which adapt to the delivery
+rate measured from the acknowledgements.
+"""
+import asyncio
+import importlib.util
+import json
+import logging
+import time
+from collections import deque
+from fractions import Fraction
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from backend import config
+from backend.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# (JPEG quality, scale) from best to cheapest
+LADDER = [(85, 1.0), (75, 1.0), (65, 0.75), (55, 0.75), (50, 0.5), (40, 0.5), (35, 0.33)]
+
+
+def h264_available():
+    return importlib.util.find_spec("av") is not None
+
+
+class AdaptiveController:
+    """Chooses the ladder rung and frame rate from acknowledged deliveries.
+
+    Every ack is a sample of (bytes, send -> ack seconds). When the client
+    acknowledges frames more slowly than the target frame rate the rung goes
+    down; when there is clear headroom in both ack rate and measured
+    throughput for a while it goes back up. Changes are rate-limited so one
+    slow frame does not cause oscillation.
+    """
+
+    def __init__(self, target_fps, window=1, max_quality=None, hold=1.0, probe_after=3.0):
+        self.target_fps = target_fps
+        self.window = window
+        self.ladder = [(q, s) for q, s in LADDER if max_quality is None or q <= max_quality] or [LADDER[-1]]
+        self.rung = 0
+        self.hold = hold
+        self.probe_after = probe_after
+        self.rtt = None        # EWMA seconds from send to ack
+        self.throughput = None # EWMA bytes per second
+        self.frame_bytes = None
+        self._changed_at = time.monotonic()
+        self._headroom_since = None
+
+    @property
+    def quality(self):
+        return self.ladder[self.rung][0]
+
+    @property
+    def scale(self):
+        return self.ladder[self.rung][1]
+
+    @property
+    def fps(self):
+        """Frame rate to aim for: the target, or what the client can currently acknowledge."""
+        if self.rtt is None:
+            return self.target_fps
+        return max(0.5, min(self.target_fps, self.window / self.rtt))
+
+    def on_ack(self, size, seconds, now=None):
+        now = now or time.monotonic()
+        seconds = max(seconds, 1e-4)
+        ewma = lambda old, new: new if old is None else old * 0.8 + new * 0.2
+        self.rtt = ewma(self.rtt, seconds)
+        self.throughput = ewma(self.throughput, size / seconds)
+        self.frame_bytes = ewma(self.frame_bytes, size)
+        if now - self._changed_at < self.hold:
+            return False
+
+        ack_rate = self.window / self.rtt
+        if ack_rate < self.target_fps * 0.8 and self.rung < len(self.ladder) - 1:
+            return self._move(1, now)
+        if ack_rate > self.target_fps * 1.5 and self.rung > 0 and \
+                self.throughput > self.frame_bytes * 1.6 * self.target_fps:
+            self._headroom_since = self._headroom_since or now
+            if now - self._headroom_since >= self.probe_after:
+                return self._move(-1, now)
+        else:
+            self._headroom_since = None
+        return False
+
+    def _move(self, step, now):
+        self.rung += step
+        self._changed_at = now
+        self._headroom_since = None
+        # The old EWMAs describe the previous rung
+        self.rtt = self.frame_bytes = None
+        return True
+
+    def params(self):
+        return {"quality": self.quality, "scale": self.scale, "fps": round(self.fps, 2)}
+
+
+class H264Encoder:
+    """Per-viewer libx264 encoder through PyAV; output is Annex B, one access unit per frame."""
+
+    def __init__(self, width, height, fps, bitrate):
+        import av # Optional dependency, only loaded for H.264 viewers
+        self._av = av
+        self.codec = av.CodecContext.create("libx264", "w")
+        self.codec.width = width - width % 2
+        self.codec.height = height - height % 2
+        self.codec.pix_fmt = "yuv420p"
+        self.codec.time_base = Fraction(1, 1000)
+        self.codec.bit_rate = int(bitrate)
+        self.codec.options = {"preset": "ultrafast", "tune": "zerolatency", "g": str(max(1, int(fps * 2)))}
+        self.bitrate = bitrate
+        self.started = time.monotonic()
+
+    def encode(self, frame):
+        if frame.shape[1] != self.codec.width or frame.shape[0] != self.codec.height:
+            frame = frame[:self.codec.height, :self.codec.width]
+        video_frame = self._av.VideoFrame.from_ndarray(frame, format="bgr24")
+        video_frame.pts = int((time.monotonic() - self.started) * 1000) # Frames are sent irregularly
+        return b"".join(bytes(packet) for packet in self.codec.encode(video_frame))
+
+
+async def _receive_acks(websocket: WebSocket, inflight: deque, credit: asyncio.Semaphore, controller: AdaptiveController):
+    while True:
+        text = await websocket.receive_text()
+        if text != "ack":
+            try:
+                if json.loads(text).get("type") != "ack":
+                    continue
+            except (ValueError, AttributeError):
+                continue
+        if inflight:
+            sent_at, size = inflight.popleft()
+            controller.on_ack(size, time.monotonic() - sent_at)
+            credit.release()
+
+
+async def stream_video(websocket: WebSocket, get_engine, executor=None, fps=None, quality=None,
+                       window=None, codec="jpeg", ack_timeout=None):
+    """Sends live frames of `get_engine()` to one client until it disconnects or the camera goes away."""
+    loop = asyncio.get_running_loop()
+    window = window or config.VIDEO_WS_WINDOW
+    ack_timeout = ack_timeout or config.VIDEO_WS_ACK_TIMEOUT
+    controller = AdaptiveController(fps or config.VIDEO_WS_FPS, window, max_quality=quality)
+    if codec == "h264" and not h264_available():
+        codec = "jpeg" # PyAV not installed: fall back, the params message tells the client
+    inflight = deque()
+    credit = asyncio.Semaphore(window)
+    receiver = asyncio.create_task(_receive_acks(websocket, inflight, credit, controller))
+    encoder = None
+    announced = None
+    last_seq = 0
+    last_sent = 0.0
+    bytes_sent = metrics.VIDEO_BYTES.labels(f"ws_{codec}")
+
+    try:
+        while True:
+            if not await _unless_gone(credit.acquire(), receiver, ack_timeout):
+                if not receiver.done():
+                    logger.info("Video client stopped acknowledging frames; closing.")
+                break
+            engine = get_engine()
+            if engine is None or engine.frames is None or engine.frames.closed:
+                break
+            if not await _unless_gone(engine.frames.wait_newer(last_seq), receiver):
+                break
+            delay = 1.0 / controller.fps - (time.monotonic() - last_sent)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if receiver.done():
+                break
+
+            if codec == "h264":
+                seq, frame = engine.frames.latest()
+                data = None
+                if frame is not None:
+                    if encoder is None or _needs_new_encoder(encoder, frame, controller):
+                        encoder = H264Encoder(frame.shape[1], frame.shape[0], controller.target_fps, _h264_bitrate(controller))
+                    data = await loop.run_in_executor(executor, encoder.encode, frame)
+            else:
+                seq, data = await loop.run_in_executor(executor, engine.frames.encode, controller.quality, controller.scale)
+            last_seq = seq
+            if not data:
+                credit.release()
+                continue
+
+            params = {"type": "video_params", "codec": codec, **controller.params()}
+            if params != announced:
+                await websocket.send_text(json.dumps(params))
+                announced = params
+            inflight.append((time.monotonic(), len(data)))
+            await websocket.send_bytes(data)
+            bytes_sent.inc(len(data))
+            last_sent = time.monotonic()
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        receiver.cancel()
+        try:
+            await receiver
+        except (asyncio.CancelledError, WebSocketDisconnect, RuntimeError):
+            pass
+
+
+async def _unless_gone(awaitable, receiver, timeout=None):
+    """Awaits `awaitable` unless the client disconnects (receiver ends) or `timeout` passes first."""
+    task = asyncio.ensure_future(awaitable)
+    done, _ = await asyncio.wait({task, receiver}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    if task not in done:
+        task.cancel()
+        return False
+    return not receiver.done()
+
+
+def _h264_bitrate(controller):
+    # Use ~70% of the measured throughput, starting from a conservative 1.5 Mbit/s
+    if controller.throughput is None:
+        return 1_500_000
+    return max(150_000, min(8_000_000, controller.throughput * 8 * 0.7))
+
+
+def _needs_new_encoder(encoder, frame, controller):
+    """Re-create (forcing a keyframe) when the resolution changes or the bitrate is far off."""
+    if (frame.shape[1] - frame.shape[1] % 2, frame.shape[0] - frame.shape[0] % 2) != (encoder.codec.width, encoder.codec.height):
+        return True
+    target = _h264_bitrate(controller)
+    return abs(target - encoder.bitrate) / encoder.bitrate > 0.5 and time.monotonic() - encoder.started > 2.0
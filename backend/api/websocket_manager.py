@@ -1,29 +1,180 @@
 from fastapi import WebSocket
-from typing import List
+from typing import Dict, Iterable, Optional, Set
+from collections import deque
+import asyncio
 import json
+import logging
+import time
+
+from backend import config
+from backend.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Message types that may be dropped (oldest first) when a client falls behind.
+# Everything else, e.g. incident alerts, is delivered as long as the client is connected.
+DROPPABLE_TYPES = {"stats"}
+
+
+def message_topics(message: dict) -> Set[str]:
+    """Topics a message is published under: its type, camera(s) and owner(s)."""
+    topics = set()
+    kind = message.get("msg_type") or message.get("type")
+    if kind:
+        topics.add(f"type:{kind}")
+    for item in [message] + list(message.get("cameras", ())):
+        camera = item.get("camera_id") or item.get("cam")
+        if camera is not None:
+            topics.add(f"camera:{camera}")
+        owner = item.get("owner_id")
+        if owner is not None:
+            topics.add(f"owner:{owner}")
+    return topics
+
+
+class ClientConnection:
+    """One WebSocket client: its subscriptions, outgoing queues and writer task."""
+
+    def __init__(self, websocket: WebSocket, topics: Optional[Iterable[str]] = None,
+                 max_queue=None, max_pending_alerts=None):
+        self.websocket = websocket
+        self.topics = set(topics or ()) # Empty means "everything"
+        self.max_queue = max_queue or config.WS_QUEUE_SIZE
+        self.max_pending_alerts = max_pending_alerts or config.WS_MAX_PENDING_ALERTS
+        self.droppable = deque()
+        self.reliable = deque()
+        self.wakeup = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.task = None
+
+    @property
+    def depth(self):
+        return len(self.droppable) + len(self.reliable)
+
+    def wants(self, topics: Set[str], subscribed: Optional[bool] = None):
+        """`subscribed` limits delivery to clients with (True) or without (False) topic subscriptions."""
+        if subscribed is not None and subscribed != bool(self.topics):
+            return False
+        return not self.topics or not self.topics.isdisjoint(topics)
+
+    def enqueue(self, text: str, droppable: bool):
+        """Queues a message. Returns False if the client is hopelessly behind."""
+        if droppable:
+            if len(self.droppable) >= self.max_queue:
+                self.droppable.popleft()
+                self.dropped += 1
+            self.droppable.append(text)
+        else:
+            if len(self.reliable) >= self.max_pending_alerts:
+                return False
+            self.reliable.append(text)
+        self.wakeup.set()
+        return True
+
+    async def run(self, send_timeout):
+        """Writer loop: alerts first, then the freshest droppable messages."""
+        while True:
+            if not self.reliable and not self.droppable:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            text = self.reliable.popleft() if self.reliable else self.droppable.popleft()
+            start = time.perf_counter()
+            await asyncio.wait_for(self.websocket.send_text(text), send_timeout)
+            metrics.WS_SEND_SECONDS.observe(time.perf_counter() - start)
+            self.sent += 1
+
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(self, send_timeout=None):
+        self.connections: Dict[WebSocket, ClientConnection] = {}
+        self.send_timeout = send_timeout or config.WS_SEND_TIMEOUT
+        self.dropped_clients = 0
+
+    @property
+    def active_connections(self):
+        return list(self.connections)
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, topics: Optional[Iterable[str]] = None):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = ClientConnection(websocket, topics)
+        client.task = asyncio.create_task(self._writer(client))
+        self.connections[websocket] = client
+        return client
+
+    async def _writer(self, client: ClientConnection):
+        try:
+            await client.run(self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Stalled or dead socket; a timed-out send may have left a partial frame
+            logger.info(f"Dropping WebSocket client: {e!r}")
+            self._evict(client.websocket)
+
+    def _evict(self, websocket: WebSocket):
+        self.disconnect(websocket)
+        self.dropped_clients += 1
+        asyncio.ensure_future(self._close(websocket))
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await websocket.close()
+        except Exception as e:
+            logger.debug(f"Closing evicted WebSocket failed: {e!r}") # Usually already gone
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: dict):
-        # Filter out dead connections
-        to_remove = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(json.dumps(message))
-            except:
-                to_remove.append(connection)
-        
-        for dead in to_remove:
-            self.disconnect(dead)
+        client = self.connections.pop(websocket, None)
+        if client is not None and client.task is not None and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+    def subscribe(self, websocket: WebSocket, topics: Iterable[str]):
+        client = self.connections.get(websocket)
+        if client is not None:
+            client.topics.update(topics)
+
+    def unsubscribe(self, websocket: WebSocket, topics: Iterable[str]):
+        client = self.connections.get(websocket)
+        if client is not None:
+            client.topics.difference_update(topics)
+
+    async def handle_command(self, websocket: WebSocket, text: str):
+        """Applies a client command such as {"action": "subscribe", "topics": ["camera:3"]}."""
+        try:
+            command = json.loads(text)
+        except ValueError:
+            return
+        if not isinstance(command, dict):
+            return
+        topics = command.get("topics") or []
+        if command.get("action") == "subscribe":
+            self.subscribe(websocket, topics)
+        elif command.get("action") == "unsubscribe":
+            self.unsubscribe(websocket, topics)
+
+    async def broadcast(self, message: dict, topics: Optional[Set[str]] = None, droppable: Optional[bool] = None,
+                        subscribed: Optional[bool] = None):
+        # Serialize once; each client's writer task does the actual (slow) sending
+        text = json.dumps(message)
+        topics = topics if topics is not None else message_topics(message)
+        if droppable is None:
+            droppable = (message.get("msg_type") or message.get("type")) in DROPPABLE_TYPES
+
+        for websocket, client in list(self.connections.items()):
+            if client.wants(topics, subscribed) and not client.enqueue(text, droppable):
+                logger.info("Dropping WebSocket client with too many undelivered alerts.")
+                self._evict(websocket)
+
+    def stats(self):
+        clients = list(self.connections.values())
+        return {
+            "connections": len(clients),
+            "queued": sum(c.depth for c in clients),
+            "max_queue_depth": max((c.depth for c in clients), default=0),
+            "sent": sum(c.sent for c in clients),
+            "dropped_messages": sum(c.dropped for c in clients),
+            "dropped_clients": self.dropped_clients,
+        }
 
 manager = ConnectionManager()
@@ -0,0 +1,120 @@
+"""Runtime settings for the surveillance backend.
+
+Every value can be overridden through an environment variable (or the
+project's ``.env`` file) so deployments can be tuned without code changes.
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _int(name, default):
+    return int(os.getenv(name, default))
+
+
+def _float(name, default):
+    return float(os.getenv(name, default))
+
+
+# Camera pool
+MAX_WORKERS = _int("SENTINEL_MAX_WORKERS", os.cpu_count() or 4)
+SUPERVISE_INTERVAL = _float("SENTINEL_SUPERVISE_INTERVAL", 5.0)
+DEFAULT_SOURCE = os.getenv("SENTINEL_DEFAULT_SOURCE", "0")
+CAMERA_OPEN_TIMEOUT = _float("SENTINEL_CAMERA_OPEN_TIMEOUT", 10.0)
+CAMERA_READ_TIMEOUT = _float("SENTINEL_CAMERA_READ_TIMEOUT", 5.0) # No frame for this long marks a camera stalled
+CAMERA_BACKOFF_BASE = _float("SENTINEL_CAMERA_BACKOFF_BASE", 1.0)
+CAMERA_BACKOFF_MAX = _float("SENTINEL_CAMERA_BACKOFF_MAX", 30.0)
+CAMERA_OFFLINE_AFTER = _int("SENTINEL_CAMERA_OFFLINE_AFTER", 5) # Failed opens in a row before a camera is offline
+CAMERA_PLACEHOLDER_FPS = _float("SENTINEL_CAMERA_PLACEHOLDER_FPS", 1.0)
+HEALTH_MAX_FRAME_AGE = _float("SENTINEL_HEALTH_MAX_FRAME_AGE", 5.0) # Older frames mark a camera as stalled
+CAMERA_MODE = os.getenv("SENTINEL_CAMERA_MODE", "thread") # thread | process (one worker process per camera)
+SHM_SLOTS = _int("SENTINEL_SHM_SLOTS", 4) # Frame slots per camera in shared memory
+SHM_SLOT_MB = _float("SENTINEL_SHM_SLOT_MB", 6.0) # Larger frames are downscaled for live view; 1080p BGR is 5.9 MB
+WORKER_POLL_INTERVAL = _float("SENTINEL_WORKER_POLL_INTERVAL", 0.02) # While someone watches the live view
+WORKER_HEARTBEAT_TIMEOUT = _float("SENTINEL_WORKER_HEARTBEAT_TIMEOUT", 15.0) # Silent workers are restarted
+
+# Motion analysis
+ANALYSIS_WIDTH = _int("SENTINEL_ANALYSIS_WIDTH", 320)
+MOTION_LEARNING_RATE = _float("SENTINEL_MOTION_LEARNING_RATE", 0.05)
+MOTION_DIFF_THRESHOLD = _int("SENTINEL_MOTION_DIFF_THRESHOLD", 20)
+
+# Live view
+JPEG_QUALITY = _int("SENTINEL_JPEG_QUALITY", 80)
+VIDEO_WS_FPS = _float("SENTINEL_VIDEO_WS_FPS", 15.0)
+VIDEO_WS_WINDOW = _int("SENTINEL_VIDEO_WS_WINDOW", 2) # Unacknowledged frames per WebSocket viewer
+VIDEO_WS_ACK_TIMEOUT = _float("SENTINEL_VIDEO_WS_ACK_TIMEOUT", 10.0)
+
+# Pipeline scheduling
+TARGET_ANALYSIS_FPS = _float("SENTINEL_TARGET_ANALYSIS_FPS", 15.0)
+
+# Real-time channel
+STATS_RATE_HZ = _float("SENTINEL_STATS_RATE_HZ", 5.0)
+WS_SEND_TIMEOUT = _float("SENTINEL_WS_SEND_TIMEOUT", 1.0)
+WS_QUEUE_SIZE = _int("SENTINEL_WS_QUEUE_SIZE", 8)
+WS_MAX_PENDING_ALERTS = _int("SENTINEL_WS_MAX_PENDING_ALERTS", 1000)
+
+# Database
+DB_POOL_SIZE = _int("SENTINEL_DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = _int("SENTINEL_DB_MAX_OVERFLOW", 20)
+DB_BUSY_TIMEOUT_MS = _int("SENTINEL_DB_BUSY_TIMEOUT_MS", 5000)
+WRITER_QUEUE_SIZE = _int("SENTINEL_WRITER_QUEUE_SIZE", 10000)
+WRITER_BATCH_SIZE = _int("SENTINEL_WRITER_BATCH_SIZE", 200)
+WRITER_FLUSH_INTERVAL = _float("SENTINEL_WRITER_FLUSH_INTERVAL", 0.5)
+
+# Incident analytics (/incidents/stats)
+STATS_CACHE_TTL = _float("SENTINEL_STATS_CACHE_TTL", 10.0) # Seconds; new incidents invalidate earlier
+STATS_MAX_BUCKETS = _int("SENTINEL_STATS_MAX_BUCKETS", 1500) # Per request, e.g. 25 hours of minutes
+
+# Incident correlation: repeated events of one (camera group, type) merge into one incident
+CORRELATION_WINDOW = _float("SENTINEL_CORRELATION_WINDOW", 60.0) # Max seconds between events of one incident
+CORRELATION_MAX_DURATION = _float("SENTINEL_CORRELATION_MAX_DURATION", 1800.0) # Longer events start a new incident
+CORRELATION_FLUSH_INTERVAL = _float("SENTINEL_CORRELATION_FLUSH_INTERVAL", 30.0) # Seconds between write-backs
+CORRELATE_BY_LOCATION = _int("SENTINEL_CORRELATE_BY_LOCATION", 1) # Cameras sharing a location form one group
+
+# Incident retention (monthly gzip NDJSON archives, still listed by /incidents/?since=...)
+INCIDENT_RETENTION_DAYS = _int("SENTINEL_INCIDENT_RETENTION_DAYS", 90) # 0 = keep everything in the database
+ARCHIVE_DIR = os.getenv("SENTINEL_ARCHIVE_DIR", "./data/archive")
+RETENTION_BATCH_SIZE = _int("SENTINEL_RETENTION_BATCH_SIZE", 1000) # Rows per archive-and-delete transaction
+RETENTION_INTERVAL = _float("SENTINEL_RETENTION_INTERVAL", 6 * 3600) # Seconds between passes
+RETENTION_VACUUM_PAGES = _int("SENTINEL_RETENTION_VACUUM_PAGES", 2000) # Pages freed per incremental vacuum step
+EXPORT_CHUNK_SIZE = _int("SENTINEL_EXPORT_CHUNK_SIZE", 2000) # Rows fetched and encoded at a time by /incidents/export
+
+# Incident evidence (snapshots and pre/post-roll clips)
+CLIP_DIR = os.getenv("SENTINEL_CLIP_DIR", "./data/clips")
+CLIP_FPS = _float("SENTINEL_CLIP_FPS", 5.0)
+CLIP_QUALITY = _int("SENTINEL_CLIP_QUALITY", 70)
+CLIP_PRE_ROLL = _float("SENTINEL_CLIP_PRE_ROLL", 5.0)
+CLIP_POST_ROLL = _float("SENTINEL_CLIP_POST_ROLL", 5.0)
+CLIP_BUFFER_MB = _float("SENTINEL_CLIP_BUFFER_MB", 32)
+CLIP_STORE_MAX_MB = _float("SENTINEL_CLIP_STORE_MAX_MB", 2048)
+CLIP_RETENTION_DAYS = _float("SENTINEL_CLIP_RETENTION_DAYS", 14)
+CLIP_RETENTION_SWEEP_INTERVAL = _float("SENTINEL_CLIP_RETENTION_SWEEP_INTERVAL", 300) # Seconds between full clip store scans
+
+# Object detection
+DETECTOR = os.getenv("SENTINEL_DETECTOR", "auto") # auto | ultralytics | stub | none
+DETECTOR_MODEL = os.getenv("SENTINEL_DETECTOR_MODEL", "yolov8n.pt") # .pt or exported .onnx
+DETECTOR_IMGSZ = _int("SENTINEL_DETECTOR_IMGSZ", 640)
+DETECTOR_CONFIDENCE = _float("SENTINEL_DETECTOR_CONFIDENCE", 0.4)
+DETECTOR_MAX_BATCH = _int("SENTINEL_DETECTOR_MAX_BATCH", 8)
+DETECTOR_MAX_WAIT = _float("SENTINEL_DETECTOR_MAX_WAIT", 0.03)
+DETECTION_MOTION_GATE = _float("SENTINEL_DETECTION_MOTION_GATE", 0.005) # Fraction of changed pixels
+DETECTION_KEEPALIVE = _float("SENTINEL_DETECTION_KEEPALIVE", 1.0) # Seconds between detections while tracks are live
+
+# Motion heatmaps (/cameras/{id}/heatmap)
+HEATMAP_WIDTH = _int("SENTINEL_HEATMAP_WIDTH", 64) # Grid columns; rows follow the aspect ratio
+HEATMAP_HALF_LIFE = _float("SENTINEL_HEATMAP_HALF_LIFE", 600.0) # Seconds for the live map to forget half its activity
+HEATMAP_HOURS = _int("SENTINEL_HEATMAP_HOURS", 48) # Hourly snapshots kept per camera
+HEATMAP_DAYS = _int("SENTINEL_HEATMAP_DAYS", 14) # Daily snapshots kept per camera
+HEATMAP_PUBLISH_INTERVAL = _float("SENTINEL_HEATMAP_PUBLISH_INTERVAL", 5.0) # Worker -> API process (process mode)
+
+# Incident summaries
+SUMMARIZER = os.getenv("SENTINEL_SUMMARIZER", "auto") # auto | gemini | fake | none
+SUMMARY_WORKERS = _int("SENTINEL_SUMMARY_WORKERS", 2)
+SUMMARY_TIMEOUT = _float("SENTINEL_SUMMARY_TIMEOUT", 20.0)
+SUMMARY_RATE_PER_MIN = _float("SENTINEL_SUMMARY_RATE_PER_MIN", 30)
+SUMMARY_CACHE_SIZE = _int("SENTINEL_SUMMARY_CACHE_SIZE", 256)
+SUMMARY_QUEUE_SIZE = _int("SENTINEL_SUMMARY_QUEUE_SIZE", 100)
+
+# Startup
+WARMUP = _int("SENTINEL_WARMUP", 1) # 0 = load the detector model and summary client on first use only
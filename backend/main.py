@@ -1,40 +1,60 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 import json
 import asyncio
 
-from backend.models.database import init_db, SessionLocal, Incident
+from backend.models.database import init_db, SessionLocal, Camera
 from backend.api.routes import incidents, cameras
-from backend.ai.processor import AIProcessor
+from backend.ai.camera_pool import LOCAL_CAMERA_ID, camera_pool
+from backend.ai.recorder import clip_store
+from backend.services.correlation import incident_correlator
+from backend.services.persistence import incident_writer
+from backend.services.retention import incident_archiver
+from backend.services.rollups import stats_cache
+from backend.services.readiness import DISABLED, readiness
+from backend.services import metrics
+from backend import config
+from backend.services.summarizer import IncidentSummarizer, create_summary_backend
 from backend.api.websocket_manager import manager
+from backend.api.stats_aggregator import StatsAggregator
+from backend.api.video_transport import stream_video
 
 app = FastAPI(title="Sentinel AI - Enterprise Surveillance API")
 
 def save_incident_to_db(incident_data: dict):
+    # Repeats of an ongoing event are merged into its open incident instead of inserting a row
+    return incident_correlator.submit(incident_data)
+
+def persist_incident(incident_data: dict):
+    # Non-blocking: the background writer batches inserts into transactions
+    handle = incident_writer.submit(dict(
+        timestamp=datetime.fromisoformat(incident_data['timestamp']),
+        camera_id=incident_data['camera_id'],
+        type=incident_data['type'],
+        severity=incident_data['severity'],
+        description=incident_data['description'],
+        ai_summary=incident_data['ai_summary'],
+        confidence=incident_data.get('escalation_score', 0.0),
+        owner_id=incident_data.get('owner_id', 'admin'),
+        peak=incident_data.get('escalation_score', 0.0),
+    ))
+    # The canned summary is replaced once the background summarizer has a report
+    incident_summarizer.submit(handle, incident_data)
+    return handle
+
+def save_camera_status(camera_id: str, status: str):
+    # Called from a camera's connection thread; only registered cameras have a row
+    if not str(camera_id).isdigit():
+        return
     db = SessionLocal()
     try:
-        incident = Incident(
-            timestamp=datetime.fromisoformat(incident_data['timestamp']),
-            camera_id=incident_data['camera_id'],
-            type=incident_data['type'],
-            severity=incident_data['severity'],
-            description=incident_data['description'],
-            ai_summary=incident_data['ai_summary'],
-            confidence=incident_data.get('escalation_score', 0.0),
-            owner_id=incident_data.get('owner_id', 'admin')
-        )
-        db.add(incident)
+        db.query(Camera).filter(Camera.id == int(camera_id)).update({"status": status})
         db.commit()
-    except Exception as e:
-        print(f"Error saving incident: {e}")
     finally:
         db.close()
 
-# Initialize DB
-init_db()
-
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -42,71 +62,196 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 async def broadcast_alert(alert_data: dict):
-    await manager.broadcast(alert_data)
+    if incident_correlator.should_broadcast(alert_data):
+        await manager.broadcast(alert_data)
+
+from fastapi import HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
-# AI Engine
-ai_engine = None
+# Real-time Stats Broadcaster: one coalesced message per tick for all cameras
+stats_aggregator = StatsAggregator(manager)
+# Background incident reports (Gemini, or the offline fake backend)
+incident_summarizer = IncidentSummarizer(create_summary_backend(), writer=incident_writer, manager=manager)
+# Between the pipelines and the writer: folds repeated events into evolving incidents
+incident_correlator.configure(persist_incident, update=incident_writer.update, broadcast_callback=manager.broadcast)
+# New incidents drop cached /incidents/stats responses of their owner
+incident_writer.commit_listeners.append(stats_cache.on_incidents_committed)
 
-from fastapi.responses import StreamingResponse
+# Queue depths are read at scrape time, so they cost nothing between scrapes
+metrics.QUEUE_DEPTH.labels("incident_writer").set_function(incident_writer.queue.qsize)
+metrics.QUEUE_DEPTH.labels("websocket_outgoing").set_function(lambda: manager.stats()["queued"])
+metrics.QUEUE_DEPTH.labels("summarizer").set_function(lambda: incident_summarizer.stats()["queue_depth"])
+metrics.QUEUE_DEPTH.labels("detection").set_function(
+    lambda: camera_pool.detection.queue.qsize() if camera_pool.detection is not None else 0)
 
-# Real-time Stats Broadcaster
-async def broadcast_stats(data: dict):
-    await manager.broadcast(data)
+def load_cameras():
+    db = SessionLocal()
+    try:
+        registered = db.query(Camera).all()
+    finally:
+        db.close()
+    for cam in registered:
+        incident_correlator.set_group(cam.id, cam.location)
+    return registered
+
+async def warm_up():
+    """Brings subsystems up after the server is already answering `/health/live`."""
+    loop = asyncio.get_running_loop()
+    if not await readiness.run("database", init_db):
+        return
+    incident_archiver.start() # First pass runs now, then every RETENTION_INTERVAL
+    registered = await loop.run_in_executor(None, load_cameras)
+    if not await readiness.run("cameras", camera_pool.start, registered, loop):
+        return
+    print(f"IntentSentinel Vision System initialized with {len(camera_pool.pipelines)} camera pipeline(s).")
+
+    # Optional heavy backends: first use would otherwise pay for the import/model load
+    if not config.WARMUP:
+        return
+    if camera_pool.detection is not None:
+        await readiness.run("detector", camera_pool.detection.detector.warm_up)
+    else:
+        readiness.set("detector", DISABLED)
+    if incident_summarizer.backend is not None:
+        await readiness.run("summarizer", incident_summarizer.backend.warm_up)
+    else:
+        readiness.set("summarizer", DISABLED)
+
+readiness.register("database")
+readiness.register("cameras")
+readiness.register("detector", required=False)
+readiness.register("summarizer", required=False)
 
 @app.on_event("startup")
 async def startup_event():
-    import traceback
-    try:
-        global ai_engine
-        ai_engine = AIProcessor(
-            broadcast_callback=broadcast_alert,
-            save_incident_callback=save_incident_to_db,
-            realtime_callback=broadcast_stats
-        )
-        ai_engine.start_feed(source=0) # Webcam capture
-        print("IntentSentinel Vision System initialized on local capture.")
-    except Exception as e:
-        print(f"FAILED TO START AI ENGINE: {e}")
-        traceback.print_exc()
+    incident_writer.start()
+    incident_summarizer.start()
+    incident_correlator.start(loop=asyncio.get_running_loop())
+    camera_pool.configure(
+        broadcast_callback=broadcast_alert,
+        save_incident_callback=save_incident_to_db,
+        realtime_callback=stats_aggregator.update,
+        update_incident_callback=incident_writer.update,
+        status_callback=save_camera_status
+    )
+    stats_aggregator.start()
+    # Not awaited: startup completes (and /health/live answers) while this runs
+    app.state.warm_up = asyncio.create_task(warm_up())
 
-@app.get("/video_feed")
-async def video_feed():
+@app.on_event("shutdown")
+async def shutdown_event():
+    if getattr(app.state, "warm_up", None) is not None:
+        app.state.warm_up.cancel()
+    await stats_aggregator.stop()
+    await incident_summarizer.stop()
+    incident_archiver.stop()
+    camera_pool.shutdown()
+    incident_correlator.stop() # Queues the final totals of open incidents before the writer flushes
+    clip_store.shutdown()
+    incident_writer.stop() # Flushes queued incidents
+
+def mjpeg_stream(get_engine, quality=None, fps=None, follow=False):
+    """Streams the newest frame of a pipeline to one viewer as multipart MJPEG.
+
+    With `follow`, the stream re-resolves the pipeline when it is replaced
+    (legacy `/video_feed`); otherwise it ends when the camera is detached.
+    """
     async def gen():
+        sent = metrics.VIDEO_BYTES.labels("mjpeg")
         while True:
-            if ai_engine:
-                frame = ai_engine.get_frame()
-                if frame:
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-                else:
-                    await asyncio.sleep(0.1)
-            else:
-                await asyncio.sleep(0.1)
+            ai_engine = get_engine()
+            if ai_engine is None or ai_engine.frames is None:
+                if not follow:
+                    return
+                await asyncio.sleep(0.5)
+                continue
+            async for frame in ai_engine.frames.frames(quality=quality, max_fps=fps, executor=camera_pool.executor):
+                sent.inc(len(frame))
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+            if not follow:
+                return
     return StreamingResponse(gen(), media_type="multipart/x-mixed-replace; boundary=frame")
 
+@app.get("/video_feed")
+async def video_feed(quality: Optional[int] = Query(None, ge=1, le=100), fps: Optional[float] = Query(None, gt=0)):
+    return mjpeg_stream(camera_pool.default, quality, fps, follow=True)
+
+@app.get("/video_feed/{camera_id}")
+async def camera_video_feed(camera_id: str, quality: Optional[int] = Query(None, ge=1, le=100), fps: Optional[float] = Query(None, gt=0)):
+    if camera_pool.get(camera_id) is None:
+        raise HTTPException(status_code=404, detail="Camera pipeline not running")
+    return mjpeg_stream(lambda: camera_pool.get(camera_id), quality, fps)
+
+@app.websocket("/ws/video/{camera_id}")
+async def websocket_video(websocket: WebSocket, camera_id: str, fps: Optional[float] = None,
+                          quality: Optional[int] = None, codec: str = "jpeg", window: Optional[int] = None):
+    """Binary frames with per-frame acks; quality, size and FPS adapt to the client (see video_transport)."""
+    get_engine = camera_pool.default if camera_id == "default" else (lambda: camera_pool.get(camera_id))
+    if get_engine() is None:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+    await stream_video(websocket, get_engine, camera_pool.executor, fps=fps, quality=quality,
+                       window=window, codec=codec)
+    try:
+        await websocket.close()
+    except RuntimeError:
+        pass # Already closed by the client
+
 # Routes
 app.include_router(incidents.router)
 app.include_router(cameras.router)
 
 @app.post("/api/ai/context")
 async def update_ai_context(data: dict):
-    if ai_engine:
-        owner_id = data.get("owner_id", "admin")
-        camera_id = data.get("camera_id", "WEB-01")
-        ai_engine.owner_id = owner_id
-        ai_engine.camera_id = camera_id
-        return {"status": "success", "owner_id": owner_id, "camera_id": camera_id}
-    return {"status": "error", "message": "AI Engine not initialized"}
+    # Pipelines are keyed, labelled and attributed by camera id, so this only looks one up; it never renames it
+    owner_id = data.get("owner_id", "admin")
+    camera_id = str(data.get("camera_id", LOCAL_CAMERA_ID))
+    ai_engine = camera_pool.get(camera_id)
+    if ai_engine is None or (owner_id != "admin" and ai_engine.owner_id != owner_id):
+        return {"status": "error", "message": f"No pipeline for camera {camera_id}"}
+    return {"status": "success", "owner_id": ai_engine.owner_id, "camera_id": ai_engine.camera_id}
+
+@app.get("/api/ai/pipeline")
+async def pipeline_stats():
+    """Per-camera stage timings (capture, schedule, analysis, encode) and drop counters."""
+    return camera_pool.stats()
+
+@app.get("/api/ai/detector")
+async def detector_stats():
+    """Detector backend, queue depth and inference latency per batch size."""
+    if camera_pool.detection is None:
+        return {"backend": None}
+    return camera_pool.detection.stats()
+
+@app.get("/api/ai/summarizer")
+async def summarizer_stats():
+    """Summary backend, queue depth, cache hits and call/timeout/failure counters."""
+    return incident_summarizer.stats()
+
+@app.get("/api/db/stats")
+async def db_stats():
+    """Incident writer queue depth, commit latency, retry/failure counters, correlation and retention progress."""
+    return {**incident_writer.stats(), "stats_cache": stats_cache.stats(), "correlation": incident_correlator.stats(),
+            "retention": incident_archiver.stats()}
+
+@app.get("/api/ws/stats")
+async def websocket_stats():
+    """Connection count, outgoing queue depth and drop counters for `/ws/alerts`."""
+    return manager.stats()
 
 @app.websocket("/ws/alerts")
-async def websocket_alerts(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_alerts(websocket: WebSocket, topics: Optional[str] = None):
+    # Optional initial subscription, e.g. ?topics=camera:3,type:stats (default: everything)
+    await manager.connect(websocket, topics.split(",") if topics else None)
     try:
         while True:
-            await websocket.receive_text()
+            await manager.handle_command(websocket, await websocket.receive_text())
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
@@ -118,15 +263,53 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
+            "liveness": "/health/live",
+            "readiness": "/health/ready",
+            "metrics": "/metrics",
             "video_feed": "/video_feed",
+            "camera_feed": "/video_feed/{camera_id}",
+            "camera_feed_ws": "/ws/video/{camera_id}",
             "incidents": "/api/incidents",
             "cameras": "/api/cameras"
         }
     }
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus text exposition of pipeline, WebSocket and database metrics."""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health():
-    return {"status": "operational", "v": "1.0.0"}
+    cameras = camera_pool.health()
+    stalled = [
+        camera_id for camera_id, c in cameras.items()
+        if not c["alive"] or c["last_frame_age"] is None or c["last_frame_age"] > config.HEALTH_MAX_FRAME_AGE
+    ]
+    return {
+        "status": "degraded" if stalled or not cameras else "operational",
+        "v": "1.0.0",
+        "cameras": cameras,
+        "stalled": stalled,
+        "incident_queue": incident_writer.queue.qsize(),
+        "subsystems": readiness.snapshot(),
+    }
+
+@app.get("/health/live")
+async def health_live():
+    """Liveness: the process is up and its event loop is serving requests."""
+    return {"status": "alive", "uptime": round(readiness.uptime(), 3)}
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness: 200 once the database and camera pipelines are up, 503 until then.
+    `subsystems` also shows optional backends that are still warming up."""
+    ready = readiness.ready
+    return JSONResponse(status_code=200 if ready else 503, content={
+        "status": "ready" if ready else "starting",
+        "uptime": round(readiness.uptime(), 3),
+        "subsystems": readiness.snapshot(),
+    })
 
 if __name__ == "__main__":
     import uvicorn
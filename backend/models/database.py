@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -20,6 +20,39 @@ class Incident(Base):
     confidence = Column(Float, default=0.0)
     owner_id = Column(String, default="admin")
     snapshot_path = Column(String, nullable=True)
+    clip_path = Column(String, nullable=True)
+    # Correlated events folded into this incident (see services/correlation.py)
+    duration = Column(Float, default=0.0) # Seconds from the first to the last event
+    event_count = Column(Integer, default=1)
+    peak = Column(Float, nullable=True) # Highest escalation score seen
+
+    # Keyset pagination walks (timestamp, id) descending, optionally scoped to an owner/camera
+    __table_args__ = (
+        Index("ix_incidents_timestamp_id", "timestamp", "id"),
+        Index("ix_incidents_owner_timestamp_id", "owner_id", "timestamp", "id"),
+        Index("ix_incidents_camera_timestamp_id", "camera_id", "timestamp", "id"),
+        Index("ix_incidents_owner_camera_timestamp_id", "owner_id", "camera_id", "timestamp", "id"),
+    )
+
+class IncidentRollup(Base):
+    """Incident counts per time bucket, kept up to date by the incident writer in the insert transaction."""
+    __tablename__ = "incident_rollups"
+
+    id = Column(Integer, primary_key=True)
+    bucket = Column(String, nullable=False) # minute | hour | day
+    bucket_start = Column(DateTime, nullable=False)
+    owner_id = Column(String, nullable=False)
+    camera_id = Column(String, nullable=False)
+    severity = Column(String, nullable=False)
+    type = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Doubles as the upsert target and the index for range scans of one bucket size
+        UniqueConstraint("bucket", "bucket_start", "owner_id", "camera_id", "severity", "type",
+                         name="uq_incident_rollups_key"),
+        Index("ix_incident_rollups_owner", "bucket", "owner_id", "bucket_start"),
+    )
 
 class Camera(Base):
     __tablename__ = "cameras"
@@ -30,11 +63,37 @@ class Camera(Base):
     source_url = Column(String)
     owner_id = Column(String, default="admin")
     status = Column(String, default="active")
+    zones = Column(Text, nullable=True) # JSON list of polygon zones/exclusions, normalised coordinates
+    rules = Column(Text, nullable=True) # JSON detection rules (see backend.ai.rules); NULL = defaults
+    analysis_fps = Column(Float, nullable=True) # Frames analysed per second; NULL = SENTINEL_TARGET_ANALYSIS_FPS
 
 # Database setup (corrected create_engine)
-from sqlalchemy import create_engine
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+from sqlalchemy import create_engine, event
+from backend import config
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": config.DB_BUSY_TIMEOUT_MS / 1000.0},
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets the API read while the incident writer commits; NORMAL sync is durable in WAL mode
+    cursor = dbapi_connection.cursor()
+    # Takes effect on new databases only; existing ones need a one-off VACUUM (see services/retention.py)
+    cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={config.DB_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-20000") # ~20 MB page cache
+    cursor.close()
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    # create_all skips indexes on tables that already exist; add any that are missing
+    for index in Incident.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
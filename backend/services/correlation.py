@@ -0,0 +1,232 @@
+"""Incident correlation: folds repeated detections of one ongoing event into a single incident.
+
+A sustained event makes a camera re-raise the same incident type every
+time its cooldown lapses, and cameras that overlap (same location) raise
+it again. The correlator sits between the pipelines and persistence: the
+first event for an (owner, camera group, type) opens an incident that is saved and
+broadcast as before; later events within `window` seconds of the previous
+one are merged into it, growing its `duration`, `event_count` and `peak`
+score, which are written back through the incident writer (at most every
+`flush_interval` seconds and when the incident closes) instead of
+inserting new rows. Merged events are not broadcast as new alerts; an
+`incident_progress` message goes out with each write-back instead.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from backend import config
+from backend.services import metrics
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_RANK = {"Low": 0, "Medium": 1, "High": 2, "Critical": 3}
+
+
+class OpenIncident:
+    """An incident that may still absorb events."""
+
+    __slots__ = ("key", "handle", "meta", "rank", "first", "last", "seen_at", "count", "peak", "cameras",
+                 "flushed_at", "dirty")
+
+    def __init__(self, key, handle, meta, timestamp, now):
+        self.key = key
+        self.handle = handle
+        self.meta = meta
+        self.rank = SEVERITY_RANK.get(meta.get("severity"), 0)
+        self.first = self.last = timestamp
+        self.seen_at = now # Wall clock, for eviction when events stop arriving
+        self.count = 1
+        self.peak = float(meta.get("escalation_score") or 0.0)
+        self.cameras = {str(meta.get("camera_id"))}
+        self.flushed_at = now
+        self.dirty = False
+
+    @property
+    def duration(self):
+        return (self.last - self.first).total_seconds()
+
+
+def _alert_key(meta):
+    return (str(meta.get("camera_id")), meta.get("type"), meta.get("timestamp"))
+
+
+class IncidentCorrelator:
+    """In-memory index of open incidents keyed by (owner, camera group, type), evicted by time.
+
+    `submit` stands in for the pipelines' save-incident callback: it returns
+    the new incident's handle, or None when the event was merged (so no
+    evidence clip is recorded for it). `should_broadcast` tells the alert
+    broadcaster which of the pipelines' alert messages were merged events.
+    """
+
+    def __init__(self, persist=None, update=None, broadcast_callback=None, loop=None, window=None, max_duration=None,
+                 flush_interval=None, by_location=None, clock=None):
+        self.persist = persist # meta -> handle: inserts (and summarises) a new incident
+        self.update = update # (handle, **fields): queues an update of a saved incident
+        self.broadcast_callback = broadcast_callback # async, e.g. manager.broadcast
+        self.loop = loop
+        self.window = window or config.CORRELATION_WINDOW
+        self.max_duration = max_duration or config.CORRELATION_MAX_DURATION
+        self.flush_interval = flush_interval or config.CORRELATION_FLUSH_INTERVAL
+        self.by_location = config.CORRELATE_BY_LOCATION if by_location is None else by_location
+        self.clock = clock or time.time
+        self.groups = {} # camera_id -> group name (its location)
+        self.open = {} # (owner, group, type) -> OpenIncident
+        self._merged_alerts = OrderedDict() # Alert keys of merged events, until their broadcast is dropped
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.counters = {"events": 0, "opened": 0, "merged": 0, "closed": 0, "updates": 0, "progress_messages": 0}
+
+    def configure(self, persist, update=None, broadcast_callback=None):
+        self.persist, self.update, self.broadcast_callback = persist, update, broadcast_callback
+
+    def set_group(self, camera_id, location):
+        """Puts a camera in its location's group; cameras without a location correlate alone."""
+        with self._lock:
+            if location and self.by_location:
+                self.groups[str(camera_id)] = f"location:{location.strip().lower()}"
+            else:
+                self.groups.pop(str(camera_id), None)
+
+    def group_of(self, camera_id):
+        camera_id = str(camera_id)
+        return self.groups.get(camera_id, f"camera:{camera_id}")
+
+    def submit(self, meta: dict):
+        """Opens or extends the incident for `meta`; returns the handle of a newly saved incident, else None."""
+        now = self.clock()
+        timestamp = datetime.fromisoformat(meta["timestamp"])
+        # Location names are per owner: two tenants' "Entrance" cameras never share an incident
+        key = (meta.get("owner_id"), self.group_of(meta.get("camera_id")), meta.get("type"))
+        with self._lock:
+            self.counters["events"] += 1
+            current = self.open.get(key)
+            if current is not None and self._can_merge(current, meta, timestamp):
+                self._merge(current, meta, timestamp, now)
+                self._merged_alerts[_alert_key(meta)] = None
+                while len(self._merged_alerts) > 1024:
+                    self._merged_alerts.popitem(last=False)
+                if now - current.flushed_at >= self.flush_interval:
+                    self._flush(current, now)
+                metrics.CORRELATION_EVENTS.labels("merged").inc()
+                return None
+            if current is not None:
+                self._close(current, now)
+            # Persisting only enqueues, so holding the lock keeps two cameras of a group from both opening one
+            handle = self.persist(meta)
+            self.open[key] = OpenIncident(key, handle, meta, timestamp, now)
+            self.counters["opened"] += 1
+        metrics.CORRELATION_EVENTS.labels("opened").inc()
+        return handle
+
+    def _can_merge(self, current, meta, timestamp):
+        if (timestamp - current.last).total_seconds() > self.window:
+            return False
+        if (timestamp - current.first).total_seconds() > self.max_duration:
+            return False # Long-running events are split so each row covers a bounded stretch
+        # An escalation is a new alert (and keeps the per-severity rollups exact)
+        return SEVERITY_RANK.get(meta.get("severity"), 0) <= current.rank
+
+    def _merge(self, current, meta, timestamp, now):
+        current.last = max(current.last, timestamp)
+        current.seen_at = now
+        current.count += 1
+        current.peak = max(current.peak, float(meta.get("escalation_score") or 0.0))
+        current.cameras.add(str(meta.get("camera_id")))
+        current.dirty = True
+        self.counters["merged"] += 1
+
+    def _close(self, incident, now):
+        """Removes `incident` from the index and writes its final state."""
+        self.open.pop(incident.key, None)
+        self.counters["closed"] += 1
+        if incident.dirty:
+            self._flush(incident, now)
+
+    def _flush(self, incident, now):
+        """Queues the write-back of a merged incident's totals and announces them; only enqueues."""
+        incident.flushed_at = now
+        incident.dirty = False
+        if incident.handle is not None and self.update is not None:
+            self.update(incident.handle, duration=round(incident.duration, 1), event_count=incident.count,
+                        peak=round(incident.peak, 3))
+            self.counters["updates"] += 1
+        if self.broadcast_callback is not None:
+            self.counters["progress_messages"] += 1
+            self._dispatch(self.broadcast_callback({
+                "msg_type": "incident_progress",
+                "id": getattr(incident.handle, "id", None), # Set once the insert has committed
+                "camera_id": incident.meta.get("camera_id"),
+                "owner_id": incident.meta.get("owner_id"),
+                "type": incident.meta.get("type"),
+                "severity": incident.meta.get("severity"),
+                "started": incident.meta.get("timestamp"),
+                "duration": round(incident.duration, 1),
+                "event_count": incident.count,
+                "peak": round(incident.peak, 3),
+                "cameras": sorted(incident.cameras),
+            }))
+
+    def _dispatch(self, coro):
+        if self.loop is not None and self.loop.is_running():
+            asyncio.run_coroutine_threadsafe(coro, self.loop)
+        else:
+            coro.close() # No server loop (e.g. a benchmark): nobody to send to
+
+    def should_broadcast(self, message: dict) -> bool:
+        """False for the alert message of an event that was merged into an open incident."""
+        if message.get("msg_type") or "timestamp" not in message:
+            return True
+        key = _alert_key(message)
+        with self._lock:
+            if key in self._merged_alerts:
+                del self._merged_alerts[key]
+                return False
+        return True
+
+    def sweep(self):
+        """Closes incidents that have seen no event for `window` seconds, writing their final state."""
+        now = self.clock()
+        with self._lock:
+            for incident in [i for i in self.open.values() if now - i.seen_at > self.window]:
+                self._close(incident, now)
+
+    def close_all(self):
+        with self._lock:
+            for incident in list(self.open.values()):
+                self._close(incident, self.clock())
+
+    def start(self, loop=None):
+        self.loop = loop or self.loop
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="incident-correlator", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stops the sweeper and writes the final state of every open incident."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout)
+            self._thread = None
+        self.close_all()
+
+    def _run(self):
+        while not self._stop.wait(min(5.0, self.window / 4)):
+            try:
+                self.sweep()
+            except Exception as e:
+                metrics.ERRORS.labels("correlation").inc()
+                logger.error(f"Incident correlation sweep failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {"open": len(self.open), "window": self.window, **self.counters}
+
+
+incident_correlator = IncidentCorrelator()
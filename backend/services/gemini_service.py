@@ -1,38 +1,66 @@
-import google.generativeai as genai
+import asyncio
+import logging
 import os
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class GeminiService:
-    def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            # Fallback or warning
-            print("Warning: GEMINI_API_KEY not found in environment.")
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+    """Gemini client, configured on first use so importing this module never blocks startup."""
 
-    async def generate_incident_report(self, metadata: dict):
-        """Generates a human-readable incident report from detection metadata."""
-        prompt = f"""
+    def __init__(self, model_name='gemini-1.5-flash'):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return bool(os.getenv("GEMINI_API_KEY"))
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai # Heavy import, deferred until the first report
+                api_key = os.getenv("GEMINI_API_KEY")
+                if not api_key:
+                    # Fallback or warning
+                    logger.warning("GEMINI_API_KEY not found in environment.")
+                genai.configure(api_key=api_key)
+                self._model = genai.GenerativeModel(self.model_name)
+            return self._model
+
+    @staticmethod
+    def build_prompt(metadata: dict):
+        return f"""
         Act as a professional security analyst. Analyze the following surveillance detection metadata and generate a concise, human-readable incident report.
         Metadata:
         - Timestamp: {metadata.get('timestamp')}
         - Camera ID: {metadata.get('camera_id')}
-        - Detections: {metadata.get('detections')}
-        - Detected Activity: {metadata.get('activity_type')}
-        
+        - Detections: {metadata.get('detections') or metadata.get('description')}
+        - Detected Activity: {metadata.get('activity_type') or metadata.get('type')}
+        - Severity: {metadata.get('severity')}
+
         The report should include:
         1. Summary of what happened.
         2. Severity Assessment (Low, Medium, High).
         3. Recommended immediate action for security personnel.
-        
+
         Format the output as a clean, structured report.
         """
+
+    def generate(self, metadata: dict):
+        """Blocking call; run it on a worker thread."""
+        response = self.model.generate_content(self.build_prompt(metadata))
+        return response.text
+
+    async def generate_incident_report(self, metadata: dict):
+        """Generates a human-readable incident report from detection metadata."""
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
+            return await asyncio.get_running_loop().run_in_executor(None, self.generate, metadata)
         except Exception as e:
             return f"Error generating report: {str(e)}"
 
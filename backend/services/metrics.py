@@ -0,0 +1,247 @@
+"""Lightweight in-process metrics with a Prometheus text exposition.
+
+Counters, gauges and fixed-bucket histograms, optionally labelled. Updating
+a labelled child is a couple of attribute operations and no lock: every
+child in this code base has a single writer (one camera's thread, the
+writer thread, the event loop), and readers only need a best-effort view.
+Look children up once with `labels(...)` and keep them on the hot path.
+"""
+import bisect
+import math
+import threading
+
+# Latency buckets in seconds, from sub-millisecond stages up to slow DB commits
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1.0):
+        self.value += amount
+
+
+class GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1.0):
+        self.value += amount
+
+    def dec(self, amount=1.0):
+        self.value -= amount
+
+    def set_function(self, function):
+        """Evaluates `function()` at scrape time instead of storing a value."""
+        self.function = function
+
+    def get(self):
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return math.nan
+        return self.value
+
+
+class HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    kind = None
+    child_class = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        return self.child_class()
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def remove(self, *values):
+        with self._lock:
+            self._children.pop(tuple(str(v) for v in values), None)
+
+    def clear(self, **match):
+        """Drops every child whose labels match, e.g. clear(camera="3") when a camera is detached."""
+        positions = [(self.labelnames.index(k), str(v)) for k, v in match.items()]
+        with self._lock:
+            for values in [v for v in self._children if all(v[i] == want for i, want in positions)]:
+                del self._children[values]
+
+    def samples(self):
+        with self._lock:
+            return list(self._children.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self.samples():
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+    child_class = CounterChild
+
+    def inc(self, amount=1.0):
+        self._default.inc(amount)
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+    child_class = GaugeChild
+
+    def set(self, value):
+        self._default.set(value)
+
+    def set_function(self, function):
+        self._default.set_function(function)
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.get())}"]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def _render_child(self, values, child):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), list(child.counts)):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def clear(self, **match):
+        """Drops matching children from every metric that has those labels."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            if all(k in metric.labelnames for k in match):
+                metric.clear(**match)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Pipeline
+STAGE_SECONDS = registry.histogram("sentinel_stage_seconds", "Time spent per pipeline stage", ("camera", "stage"))
+FRAMES_DROPPED = registry.counter("sentinel_frames_dropped_total", "Frames skipped per pipeline stage", ("camera", "stage"))
+CAPTURE_RECONNECTS = registry.counter("sentinel_capture_reconnects_total", "Attempts to reopen a camera source", ("camera",))
+LAST_FRAME_AGE = registry.gauge("sentinel_camera_last_frame_age_seconds", "Seconds since the last captured frame", ("camera",))
+CAMERA_LIVE = registry.gauge("sentinel_camera_live", "1 while the camera is delivering frames", ("camera",))
+CAPTURE_FPS = registry.gauge("sentinel_camera_capture_fps", "Smoothed capture frame rate", ("camera",))
+WORKER_RESTARTS = registry.counter("sentinel_camera_worker_restarts_total", "Camera worker processes relaunched", ("camera",))
+ERRORS = registry.counter("sentinel_errors_total", "Unexpected errors by component", ("component",))
+
+# Shared services
+QUEUE_DEPTH = registry.gauge("sentinel_queue_depth", "Items waiting in internal queues", ("queue",))
+WS_SEND_SECONDS = registry.histogram("sentinel_ws_send_seconds", "WebSocket send latency per message")
+VIDEO_BYTES = registry.counter("sentinel_video_bytes_total", "Live video bytes sent to viewers", ("transport",))
+DB_COMMIT_SECONDS = registry.histogram("sentinel_db_commit_seconds", "Incident writer transaction latency")
+CORRELATION_EVENTS = registry.counter("sentinel_incident_events_total", "Incident events by correlation outcome", ("outcome",))
+INCIDENTS_ARCHIVED = registry.counter("sentinel_incidents_archived_total", "Incidents moved from the database to archives")
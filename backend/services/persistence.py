@@ -0,0 +1,212 @@
+import logging
+import queue
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from backend import config
+from backend.services import metrics
+from backend.ai.pipeline import StageStats
+from backend.models.database import Incident, SessionLocal
+from backend.services.rollups import apply_rollups, rollup_counts
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class IncidentHandle:
+    """Reference to an incident that may not have been committed yet.
+
+    `id` is filled in once the row is committed; updates queued against the
+    handle are applied in order after the insert, so callers never need to
+    wait for it.
+    """
+
+    __slots__ = ("row", "id", "committed", "on_commit")
+
+    def __init__(self, row, on_commit=None):
+        self.row = row
+        self.id = None
+        self.committed = threading.Event()
+        self.on_commit = on_commit
+
+
+class IncidentWriter:
+    """Background writer that batches incident inserts/updates into transactions.
+
+    Capture threads only enqueue; a single thread drains the bounded queue,
+    commits up to `batch_size` operations or whatever arrived within
+    `flush_interval`, and retries transient SQLite errors (e.g. a locked
+    database) with backoff.
+    """
+
+    def __init__(self, session_factory=SessionLocal, max_queue=None, batch_size=None, flush_interval=None,
+                 max_retries=5, put_timeout=0.5):
+        self.session_factory = session_factory
+        self.queue = queue.Queue(maxsize=max_queue or config.WRITER_QUEUE_SIZE)
+        self.batch_size = batch_size or config.WRITER_BATCH_SIZE
+        self.flush_interval = flush_interval or config.WRITER_FLUSH_INTERVAL
+        self.max_retries = max_retries
+        self.put_timeout = put_timeout
+        self.commit_stats = StageStats("db_commit", histogram=metrics.DB_COMMIT_SECONDS.labels())
+        self.rows_written = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.commit_listeners = [] # Called with the committed handles after each batch
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="incident-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Flushes everything queued so far, then stops the writer thread."""
+        if self._thread is None:
+            return
+        self.queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _enqueue(self, op):
+        try:
+            self.queue.put(op, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            self.rejected += 1
+            logger.error("Incident writer queue is full; dropping write.")
+            return False
+
+    def submit(self, row: dict, on_commit=None) -> IncidentHandle:
+        """Queues an insert of `row` (Incident column values) and returns its handle."""
+        handle = IncidentHandle(row, on_commit)
+        self._enqueue(("insert", handle, None))
+        return handle
+
+    def update(self, handle: IncidentHandle, **fields):
+        """Queues an update of a previously submitted incident."""
+        self._enqueue(("update", handle, fields))
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue.qsize(),
+            "rows_written": self.rows_written,
+            "retries": self.retries,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "commit": self.commit_stats.snapshot(),
+        }
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                first = self.queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            batch = []
+            if first is _STOP:
+                stopping = True
+            else:
+                batch.append(first)
+            deadline = time.monotonic() + self.flush_interval
+            while not stopping and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    op = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if op is _STOP:
+                    stopping = True
+                else:
+                    batch.append(op)
+            if stopping:
+                # Drain whatever was queued before the stop request
+                while True:
+                    try:
+                        op = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if op is not _STOP:
+                        batch.append(op)
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._commit(batch)
+                return
+            except OperationalError as e:
+                if attempt == self.max_retries:
+                    break
+                self.retries += 1
+                delay = min(2.0, 0.05 * 2 ** attempt)
+                logger.warning(f"Transient DB error ({e}); retrying batch of {len(batch)} in {delay:.2f}s")
+                time.sleep(delay)
+            except Exception as e:
+                logger.error(f"Batch commit failed ({e}); writing {len(batch)} operations individually")
+                break
+
+        # Isolate the bad operation(s) so one row can't sink the whole batch
+        for op in batch:
+            try:
+                self._commit([op])
+            except Exception as e:
+                self.failures += 1
+                metrics.ERRORS.labels("incident_writer").inc()
+                logger.error(f"Error saving incident: {e}")
+
+    def _commit(self, batch):
+        start = time.perf_counter()
+        db = self.session_factory()
+        inserted = []
+        try:
+            pending_ids = {}
+            new_incidents = []
+            for kind, handle, fields in batch:
+                if kind == "insert":
+                    incident = Incident(**handle.row)
+                    db.add(incident)
+                    db.flush()
+                    pending_ids[handle] = incident.id
+                    inserted.append(handle)
+                    new_incidents.append(incident)
+                else:
+                    incident_id = handle.id or pending_ids.get(handle)
+                    if incident_id is None:
+                        logger.warning("Skipping update for an incident that was never saved.")
+                        continue
+                    db.query(Incident).filter(Incident.id == incident_id).update(fields)
+            # Same transaction as the inserts, so a retried or failed batch never double-counts
+            apply_rollups(db, rollup_counts(new_incidents))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        self.commit_stats.record(time.perf_counter() - start)
+        self.rows_written += len(inserted)
+        for handle in inserted:
+            handle.id = pending_ids[handle]
+            handle.committed.set()
+        for handle in inserted:
+            if handle.on_commit is not None:
+                self._notify(handle.on_commit, handle)
+        if inserted:
+            for listener in self.commit_listeners:
+                self._notify(listener, inserted)
+
+    def _notify(self, callback, arg):
+        try:
+            callback(arg)
+        except Exception as e:
+            logger.error(f"Incident commit callback failed: {e}")
+
+
+incident_writer = IncidentWriter()
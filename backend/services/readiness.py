@@ -0,0 +1,69 @@
+"""Liveness and readiness bookkeeping for startup.
+
+The server accepts requests as soon as the process is up (`/health/live`).
+Subsystems then warm up in the background and report their state here;
+`/health/ready` turns green once every required one is ready. Optional ones
+(the detector model, the summary client) can still be warming, or have
+failed, without holding readiness back.
+"""
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+DISABLED = "disabled"
+
+
+class Readiness:
+    def __init__(self):
+        self.started = time.monotonic()
+        self._subsystems = {} # name -> dict(state, required, seconds, detail)
+        self._lock = threading.Lock()
+
+    def register(self, name, required=True):
+        with self._lock:
+            self._subsystems[name] = {"state": PENDING, "required": required, "seconds": None, "detail": None}
+
+    def set(self, name, state, detail=None, seconds=None):
+        with self._lock:
+            entry = self._subsystems.setdefault(name, {"state": PENDING, "required": False, "seconds": None, "detail": None})
+            entry.update(state=state, detail=detail)
+            if seconds is not None:
+                entry["seconds"] = round(seconds, 3)
+
+    async def run(self, name, fn, *args):
+        """Runs blocking `fn(*args)` on a worker thread, recording how long `name` took to warm up.
+
+        Returns False if it raised. If `fn` returns False the subsystem is marked disabled.
+        """
+        self.set(name, WARMING)
+        start = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+        except Exception as e:
+            self.set(name, FAILED, detail=str(e), seconds=time.perf_counter() - start)
+            logger.error(f"Warm-up of {name} failed: {e}")
+            return False
+        self.set(name, READY if result is not False else DISABLED, seconds=time.perf_counter() - start)
+        return True
+
+    @property
+    def ready(self):
+        with self._lock:
+            return all(s["state"] == READY for s in self._subsystems.values() if s["required"])
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._subsystems.items()}
+
+    def uptime(self):
+        return time.monotonic() - self.started
+
+
+readiness = Readiness()
@@ -0,0 +1,395 @@
+"""Incident retention: monthly archives of old incidents and compaction of the SQLite store.
+
+Incidents older than `INCIDENT_RETENTION_DAYS` are copied into gzip NDJSON
+files under `ARCHIVE_DIR`, one per month (`incidents-YYYY-MM.ndjson.gz`).
+Each batch is appended as its own gzip member, so an archive is never
+rewritten, and only then deleted from the database in the same bounded
+batch, each in its own short transaction so the incident writer is never
+locked out for long. Freed pages go back to the filesystem through
+incremental vacuum, also in small steps.
+
+The cutoff is always midnight UTC, so archived and live incidents never
+share a day bucket and the rollups behind `/incidents/stats` (which keep
+counting archived incidents) stay exact. `IncidentArchive.scan` serves the
+part of a `GET /incidents/` time range that reaches past the cutoff.
+"""
+import gzip
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+from sqlalchemy import delete, select
+
+from backend import config
+from backend.models.database import Incident, SessionLocal, engine
+from backend.services import metrics
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = [column.name for column in Incident.__table__.columns]
+_INDEX_FILE = "index.json"
+
+
+def month_key(timestamp: datetime) -> str:
+    return timestamp.strftime("%Y-%m")
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock on `path` shared with other processes (the server and the maintenance scripts)."""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX) # Released when the file is closed
+            yield
+            return
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def naive_utc(timestamp):
+    """Stored timestamps are naive UTC; query parameters may carry a timezone."""
+    if timestamp is not None and timestamp.tzinfo is not None:
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+class IncidentArchive:
+    """The monthly archive files plus a small JSON index of what they cover.
+
+    Several processes may use one archive (the server's periodic pass and
+    maintenance_scripts/archive_incidents.py): every index change re-reads
+    index.json under a file lock before writing it back, and readers reload
+    it when the file changes.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or config.ARCHIVE_DIR
+        self._lock = threading.Lock()
+        self._index = None
+        self._stamp = None # (mtime_ns, size) of the index.json that _index was read from
+
+    def path(self, month):
+        return os.path.join(self.directory, f"incidents-{month}.ndjson.gz")
+
+    def index(self):
+        """{"archived_before": iso | None, "months": {month: {"rows", "first", "last"}}}."""
+        with self._lock:
+            return self._load()
+
+    def _load(self):
+        path = os.path.join(self.directory, _INDEX_FILE)
+        try:
+            st = os.stat(path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        if self._index is None or stamp != self._stamp:
+            try:
+                with open(path) as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {"archived_before": None, "months": {}}
+            self._stamp = stamp
+        return self._index
+
+    @contextmanager
+    def writing(self):
+        """Serialises archive writers across processes, e.g. for one select/append/delete batch."""
+        os.makedirs(self.directory, exist_ok=True)
+        with file_lock(os.path.join(self.directory, "archive.lock")):
+            yield
+
+    def _update_index(self, change):
+        """Applies `change(index)` to the on-disk index, never overwriting another process's changes."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, _INDEX_FILE)
+        with self._lock, file_lock(path + ".lock"):
+            self._stamp = None # Always re-read under the lock
+            index = self._load()
+            change(index)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(index, f, indent=1, sort_keys=True)
+            os.replace(tmp, path)
+            st = os.stat(path)
+            self._stamp = (st.st_mtime_ns, st.st_size)
+
+    @property
+    def archived_before(self):
+        """Everything older than this has been moved out of the database (None if nothing has)."""
+        value = self.index()["archived_before"]
+        return datetime.fromisoformat(value) if value else None
+
+    def append(self, rows):
+        """Appends serialised incident rows to their month files; durable once this returns."""
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(row["timestamp"][:7], []).append(row)
+        os.makedirs(self.directory, exist_ok=True)
+        for month, month_rows in by_month.items():
+            data = "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in month_rows).encode()
+            with open(self.path(month), "ab") as f:
+                f.write(gzip.compress(data, compresslevel=6))
+                f.flush()
+                os.fsync(f.fileno())
+
+        def add(index):
+            for month, month_rows in by_month.items():
+                entry = index["months"].setdefault(month, {"rows": 0, "first": None, "last": None})
+                entry["rows"] += len(month_rows)
+                first, last = month_rows[0]["timestamp"], month_rows[-1]["timestamp"]
+                entry["first"] = min(entry["first"] or first, first)
+                entry["last"] = max(entry["last"] or last, last)
+        self._update_index(add)
+
+    def mark_archived(self, before: datetime):
+        def advance(index):
+            current = index["archived_before"]
+            if current is None or datetime.fromisoformat(current) < before:
+                index["archived_before"] = before.isoformat()
+        self._update_index(advance)
+
+    def covers(self, since) -> bool:
+        """Whether a query starting at `since` reaches into archived time."""
+        before = self.archived_before
+        return before is not None and since is not None and naive_utc(since) < before
+
+    def _months(self, since, until):
+        """Archived months overlapping [since, until), newest first."""
+        months = self.index()["months"]
+        first = month_key(since) if since else ""
+        last = month_key(until - timedelta(microseconds=1)) if until else "9999-12"
+        return sorted((m for m in months if first <= m <= last), reverse=True)
+
+    def _read(self, month):
+        """Rows of one month file in ascending (timestamp, id) order, skipping duplicates from an interrupted run.
+
+        Writers append ascending batches one at a time, and a batch whose
+        delete never committed is re-appended by the next pass, so a
+        duplicate never sorts after the newest row already read: comparing
+        with that one key dedupes in constant memory.
+        """
+        newest = None
+        try:
+            f = gzip.open(self.path(month), "rt")
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                row = json.loads(line)
+                row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+                key = (row["timestamp"], row["id"])
+                if newest is not None and key <= newest:
+                    continue
+                newest = key
+                yield row
+
+    def scan(self, owner_id="admin", camera_id=None, severity=None, incident_type=None,
+             since=None, until=None, cursor=None, limit=100, fields=_COLUMNS):
+        """Archived incidents in the same newest-first (timestamp, id) order and filters as the live query.
+
+        Streams the month files a range touches and keeps only the newest
+        `limit` matches, so memory stays bounded however large a month is.
+        """
+        since, until = naive_utc(since), naive_utc(until)
+        if cursor is not None:
+            cursor = (naive_utc(cursor[0]), cursor[1])
+            until = min(until, cursor[0] + timedelta(microseconds=1)) if until else cursor[0] + timedelta(microseconds=1)
+
+        matches = _matcher(owner_id, camera_id, severity, incident_type, since, until, cursor)
+        found = []
+        for month in self._months(since, until):
+            # Months don't overlap, so a newer month's matches all sort before an older month's
+            rows = heapq.nlargest(limit - len(found), filter(matches, self._read(month)),
+                                  key=lambda row: (row["timestamp"], row["id"]))
+            found.extend({f: row.get(f) for f in fields} for row in rows)
+            if len(found) >= limit:
+                break
+        return found
+
+    def iter_rows(self, owner_id="admin", camera_id=None, since=None, until=None):
+        """Archived incidents oldest first, streamed month by month.
+
+        The archiver appends ascending (timestamp, id) batches and each pass
+        starts after the previous cutoff, so file order is already time order.
+        """
+        since, until = naive_utc(since), naive_utc(until)
+        matches = _matcher(owner_id, camera_id, None, None, since, until, None)
+        for month in reversed(self._months(since, until)):
+            yield from filter(matches, self._read(month))
+
+
+def _matcher(owner_id, camera_id, severity, incident_type, since, until, cursor):
+    """Predicate applying the `GET /incidents/` filters to an archived row."""
+    def matches(row):
+        return ((owner_id == "admin" or row["owner_id"] == owner_id)
+                and (camera_id is None or row["camera_id"] == camera_id)
+                and (severity is None or row["severity"] == severity)
+                and (incident_type is None or row["type"] == incident_type)
+                and (since is None or row["timestamp"] >= since)
+                and (until is None or row["timestamp"] < until)
+                and (cursor is None or (row["timestamp"], row["id"]) < cursor))
+    return matches
+
+
+class IncidentArchiver:
+    """Moves incidents past the retention age into the archive, then compacts the database.
+
+    `run_once` does a full pass; `start` repeats it every `interval` seconds
+    on a background thread.
+    """
+
+    def __init__(self, archive=None, session_factory=SessionLocal, bind=engine, retention_days=None, batch_size=None,
+                 interval=None, vacuum_pages=None, pause=0.05):
+        self.archive = archive or incident_archive
+        self.session_factory = session_factory
+        self.bind = bind
+        self.retention_days = config.INCIDENT_RETENTION_DAYS if retention_days is None else retention_days
+        self.batch_size = batch_size or config.RETENTION_BATCH_SIZE
+        self.interval = interval or config.RETENTION_INTERVAL
+        self.vacuum_pages = vacuum_pages or config.RETENTION_VACUUM_PAGES
+        self.pause = pause # Between batches, so queued incident commits get the write lock
+        self.archived = 0
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._running = threading.Lock()
+
+    def cutoff(self, now=None):
+        """Midnight UTC on the first day whose incidents are kept."""
+        now = now or datetime.utcnow()
+        return (now - timedelta(days=self.retention_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def run_once(self, now=None):
+        """Archives and deletes everything before the cutoff, then vacuums; returns a summary."""
+        if self.retention_days <= 0:
+            return None
+        with self._running:
+            start = time.perf_counter()
+            cutoff = self.cutoff(now)
+            moved = 0
+            while not self._stop.is_set():
+                count = self._archive_batch(cutoff)
+                moved += count
+                if count < self.batch_size:
+                    self.archive.mark_archived(cutoff)
+                    break
+                time.sleep(self.pause)
+            freed = self.vacuum() if moved else 0
+            self.archived += moved
+            self.last_run = {
+                "cutoff": cutoff.isoformat(),
+                "archived": moved,
+                "freed_pages": freed,
+                "seconds": round(time.perf_counter() - start, 3),
+            }
+            if moved:
+                logger.info(f"Archived {moved} incidents older than {cutoff:%Y-%m-%d}; freed {freed} pages.")
+            return self.last_run
+
+    def _archive_batch(self, cutoff):
+        table = Incident.__table__
+        db = self.session_factory()
+        try:
+            # One writer at a time across processes, or two passes would archive the same rows
+            with self.archive.writing():
+                rows = db.execute(select(table).where(Incident.timestamp < cutoff)
+                                  .order_by(Incident.timestamp, Incident.id).limit(self.batch_size)).all()
+                db.rollback() # End the read transaction before the (slow) file write
+                if not rows:
+                    return 0
+                self.archive.append([
+                    {c: (value.isoformat() if isinstance(value, datetime) else value) for c, value in row._mapping.items()}
+                    for row in rows
+                ])
+                # Only deleted once the archive is on disk; a crash in between leaves duplicates the reader skips
+                db.execute(delete(table).where(Incident.id.in_([row.id for row in rows])))
+                db.commit()
+            metrics.INCIDENTS_ARCHIVED.inc(len(rows))
+            return len(rows)
+        finally:
+            db.close()
+
+    def vacuum(self):
+        """Returns free pages to the filesystem in `vacuum_pages` steps; a no-op unless auto_vacuum is incremental."""
+        freed = 0
+        with self.bind.connect() as conn:
+            raw = conn.connection.dbapi_connection
+            if raw.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                logger.warning("auto_vacuum is not INCREMENTAL; run maintenance_scripts/archive_incidents.py "
+                               "--enable-incremental-vacuum once to reclaim space.")
+                return 0
+            while not self._stop.is_set():
+                before = raw.execute("PRAGMA freelist_count").fetchone()[0]
+                if not before:
+                    break
+                # execute() would only step the pragma once (one page); a script runs it to completion
+                raw.executescript(f"PRAGMA incremental_vacuum({int(self.vacuum_pages)})")
+                freed += before - raw.execute("PRAGMA freelist_count").fetchone()[0]
+                time.sleep(self.pause)
+        return freed
+
+    def start(self):
+        if self.retention_days <= 0:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="incident-archiver", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10.0):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                metrics.ERRORS.labels("retention").inc()
+                logger.error(f"Incident retention pass failed: {e}")
+            self._stop.wait(self.interval)
+
+    def stats(self):
+        before = self.archive.archived_before
+        return {
+            "retention_days": self.retention_days,
+            "archived_before": before.isoformat() if before else None,
+            "archived_total": self.archived,
+            "archive_months": len(self.archive.index()["months"]),
+            "last_run": self.last_run,
+        }
+
+
+def enable_incremental_vacuum(bind=engine):
+    """Switches an existing database to incremental auto-vacuum. Rewrites the whole file, so run it offline."""
+    with bind.connect() as conn:
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+            return False
+        conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.commit()
+        conn.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("VACUUM")
+    return True
+
+
+incident_archive = IncidentArchive()
+incident_archiver = IncidentArchiver()
@@ -0,0 +1,235 @@
+"""Incremental incident rollups and the cached `/incidents/stats` queries built on them.
+
+Every committed incident adds one to its hour and day bucket for its
+(owner, camera, severity, type), in the same transaction as the insert, so
+the counts never drift from the `incidents` table and hour/day stats never
+scan it. Minute stats are bounded by STATS_MAX_BUCKETS to a few hours, so
+they are grouped straight from the incidents in the window through the
+timestamp indexes instead (minute rollups would hold about as many rows as
+there are incidents). `rebuild_rollups` recomputes everything from scratch,
+e.g. after importing rows. Rollups outlive the incidents the retention pass
+moves to the archive, so hour and day stats still count archived
+incidents; minute stats only cover the database.
+"""
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from backend import config
+from backend.models.database import Incident, IncidentRollup
+
+BUCKETS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+# Bucket sizes kept in the rollup table; the others are aggregated from `incidents`
+ROLLUP_BUCKETS = ("hour", "day")
+# Window returned when the caller gives no `since`
+DEFAULT_SPANS = {"minute": timedelta(hours=1), "hour": timedelta(days=1), "day": timedelta(days=30)}
+# SQLite strftime() formats that truncate a timestamp to each bucket
+_SQL_FORMATS = {"minute": "%Y-%m-%d %H:%M:00", "hour": "%Y-%m-%d %H:00:00", "day": "%Y-%m-%d 00:00:00"}
+_KEY_COLUMNS = ("bucket", "bucket_start", "owner_id", "camera_id", "severity", "type")
+
+
+def bucket_start(timestamp: datetime, bucket: str) -> datetime:
+    if bucket == "minute":
+        return timestamp.replace(second=0, microsecond=0)
+    if bucket == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def rollup_counts(incidents):
+    """Counter of rollup keys for Incident rows (or objects with the same attributes)."""
+    counts = Counter()
+    for incident in incidents:
+        timestamp = incident.timestamp or datetime.utcnow()
+        camera_id = "" if incident.camera_id is None else str(incident.camera_id)
+        dims = (incident.owner_id or "admin", camera_id, incident.severity or "", incident.type or "")
+        for bucket in ROLLUP_BUCKETS:
+            counts[(bucket, bucket_start(timestamp, bucket)) + dims] += 1
+    return counts
+
+
+def apply_rollups(db, counts):
+    """Adds `counts` to the rollup table inside the caller's transaction."""
+    if not counts:
+        return
+    table = IncidentRollup.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(index_elements=list(_KEY_COLUMNS), set_={"count": table.c.count + stmt.excluded.count})
+    db.execute(stmt, [dict(zip(_KEY_COLUMNS, key), count=n) for key, n in counts.items()])
+
+
+def rebuild_rollups(db, since=None, chunk_size=5000):
+    """Replaces rollups with counts aggregated from the incidents table; returns the number of rollup rows.
+
+    With `since` (a day boundary, e.g. the retention cutoff) older buckets are
+    kept as they are: their incidents may only exist in the archive now.
+    """
+    table = IncidentRollup.__table__
+    written = 0
+    db.execute(delete(table).where(table.c.bucket_start >= since) if since else delete(table))
+    for bucket in ROLLUP_BUCKETS:
+        fmt = _SQL_FORMATS[bucket]
+        keys = [func.strftime(fmt, Incident.timestamp), func.coalesce(Incident.owner_id, "admin"),
+                func.coalesce(Incident.camera_id, ""), func.coalesce(Incident.severity, ""), func.coalesce(Incident.type, "")]
+        query = select(*keys, func.count()).where(Incident.timestamp.is_not(None)).group_by(*keys)
+        if since:
+            query = query.where(Incident.timestamp >= since)
+        result = db.execute(query)
+        while True:
+            rows = result.fetchmany(chunk_size)
+            if not rows:
+                break
+            db.execute(table.insert(), [{
+                "bucket": bucket,
+                "bucket_start": datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S"),
+                "owner_id": row[1], "camera_id": row[2], "severity": row[3], "type": row[4], "count": row[5],
+            } for row in rows])
+            written += len(rows)
+    db.commit()
+    return written
+
+
+def resolve_window(bucket, since=None, until=None, now=None):
+    """Bucket-aligned [since, until) so that repeated requests share cache entries."""
+    now = now or datetime.utcnow()
+    # Stored timestamps are naive UTC
+    since, until = (t.astimezone(timezone.utc).replace(tzinfo=None) if t and t.tzinfo else t for t in (since, until))
+    until = bucket_start(until, bucket) if until else bucket_start(now, bucket) + BUCKETS[bucket]
+    since = bucket_start(since, bucket) if since else until - DEFAULT_SPANS[bucket]
+    return since, until
+
+
+def _rollup_points(db, bucket, since, until, owner_id, camera_id):
+    """{bucket start: [count, by_camera, by_severity, by_type]} from the rollups.
+
+    Rollup rows are already one per (bucket, camera, severity, type), so each
+    breakdown is its own GROUP BY (bucket, dimension) in SQL.
+    """
+    rollup = IncidentRollup
+    where = [rollup.bucket == bucket, rollup.bucket_start >= since, rollup.bucket_start < until]
+    if owner_id != "admin":
+        where.append(rollup.owner_id == owner_id)
+    if camera_id is not None:
+        where.append(rollup.camera_id == camera_id)
+    points = {}
+    for index, column in enumerate((rollup.camera_id, rollup.severity, rollup.type), 1):
+        query = select(rollup.bucket_start, column, func.sum(rollup.count)).where(*where).group_by(rollup.bucket_start, column)
+        for point_start, value, count in db.execute(query):
+            point = points.get(point_start)
+            if point is None:
+                point = points[point_start] = [0, Counter(), Counter(), Counter()]
+            point[index][value] += count
+            if index == 2: # Every incident has exactly one severity; count it once
+                point[0] += count
+    return points
+
+
+def _incident_points(db, bucket, since, until, owner_id, camera_id):
+    """The same as `_rollup_points`, grouped from the incidents in the window (one pass over the index range)."""
+    start = func.strftime(_SQL_FORMATS[bucket], Incident.timestamp)
+    dimensions = (func.coalesce(Incident.camera_id, ""), func.coalesce(Incident.severity, ""),
+                  func.coalesce(Incident.type, ""))
+    query = select(start, *dimensions, func.count()).where(Incident.timestamp >= since, Incident.timestamp < until)
+    if owner_id != "admin":
+        query = query.where(Incident.owner_id == owner_id)
+    if camera_id is not None:
+        query = query.where(Incident.camera_id == camera_id)
+    points = {}
+    for point_start, camera, severity, kind, count in db.execute(query.group_by(start, *dimensions)):
+        point = points.get(point_start)
+        if point is None:
+            point = points[point_start] = [0, Counter(), Counter(), Counter()]
+        point[0] += count
+        point[1][camera] += count
+        point[2][severity] += count
+        point[3][kind] += count
+    return {datetime.strptime(point_start, "%Y-%m-%d %H:%M:%S"): point for point_start, point in points.items()}
+
+
+def query_stats(db, owner_id, bucket, since, until, camera_id=None):
+    """Counts per bucket and in total, broken down by camera, severity and type."""
+    points = (_rollup_points if bucket in ROLLUP_BUCKETS else _incident_points)(db, bucket, since, until, owner_id, camera_id)
+    by_camera, by_severity, by_type = Counter(), Counter(), Counter()
+    for _, cameras, severities, kinds in points.values():
+        by_camera.update(cameras)
+        by_severity.update(severities)
+        by_type.update(kinds)
+    return {
+        "bucket": bucket,
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "total": sum(by_severity.values()),
+        "by_camera": dict(by_camera),
+        "by_severity": dict(by_severity),
+        "by_type": dict(by_type),
+        # Only non-empty buckets are listed
+        "series": [{"start": start.isoformat(), "count": count, "by_camera": dict(cameras),
+                    "by_severity": dict(severities), "by_type": dict(kinds)}
+                   for start, (count, cameras, severities, kinds) in sorted(points.items())],
+    }
+
+
+class StatsCache:
+    """Per-owner TTL cache of stats responses.
+
+    Entries expire after `ttl` seconds and are dropped as soon as an incident
+    for that owner is committed. Admin responses cover every owner, so any
+    new incident drops them too. `on_incidents_committed` runs on the
+    incident writer thread, hence the lock.
+    """
+
+    def __init__(self, ttl=None, max_entries=1024):
+        self.ttl = ttl if ttl is not None else config.STATS_CACHE_TTL
+        self.max_entries = max_entries
+        self._entries = {} # (owner_id, ...) -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0 # Bumped by every invalidation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, key, value, generation=None):
+        """Stores `value` unless an invalidation happened since `generation` was read (the value may be stale)."""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if len(self._entries) >= self.max_entries:
+                now = time.monotonic()
+                self._entries = {k: e for k, e in self._entries.items() if e[0] > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, owner_ids):
+        owners = set(owner_ids) | {"admin"}
+        with self._lock:
+            self.generation += 1
+            for key in [k for k in self._entries if k[0] in owners]:
+                del self._entries[key]
+
+    def on_incidents_committed(self, handles):
+        """IncidentWriter commit listener."""
+        self.invalidate({handle.row.get("owner_id") or "admin" for handle in handles})
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+stats_cache = StatsCache()
@@ -0,0 +1,253 @@
+import asyncio
+import hashlib
+import importlib.util
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from backend import config
+from backend.ai.pipeline import StageStats
+
+logger = logging.getLogger(__name__)
+
+
+class SummaryBackend:
+    """Turns incident metadata into a report. `summarize` blocks and runs on a worker thread."""
+
+    name = "base"
+
+    def summarize(self, metadata: dict) -> str:
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Imports/configures the client ahead of the first incident; called in the background at startup."""
+
+
+class FakeSummaryBackend(SummaryBackend):
+    """Offline backend for tests and demos; `latency` simulates a remote call."""
+
+    name = "fake"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def summarize(self, metadata):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return (f"Summary: {metadata.get('type')} on camera {metadata.get('camera_id')}. "
+                f"{metadata.get('description')}\n"
+                f"Severity Assessment: {metadata.get('severity')}.\n"
+                f"Recommended action: review the attached snapshot and dispatch personnel if confirmed.")
+
+
+class GeminiSummaryBackend(SummaryBackend):
+    name = "gemini"
+
+    def __init__(self, service=None):
+        if service is None:
+            from backend.services.gemini_service import gemini_service as service
+        self.service = service
+
+    def summarize(self, metadata):
+        return self.service.generate(metadata)
+
+    def warm_up(self):
+        self.service.model
+
+
+def create_summary_backend(name=None):
+    """Builds the configured backend, or returns None to keep the built-in canned summaries."""
+    name = (name or config.SUMMARIZER).lower()
+    if name == "auto":
+        try:
+            has_client = importlib.util.find_spec("google.generativeai") is not None
+        except ModuleNotFoundError: # No `google` namespace package at all
+            has_client = False
+        name = "gemini" if has_client and os.getenv("GEMINI_API_KEY") else "none"
+    if name == "gemini":
+        return GeminiSummaryBackend()
+    if name == "fake":
+        return FakeSummaryBackend()
+    if name != "none":
+        logger.warning(f"Unknown summarizer backend '{name}'; incident summaries disabled.")
+    return None
+
+
+def summary_key(metadata: dict) -> str:
+    """Content key for the cache: incidents on a camera that differ only in numbers (durations, IDs) share it."""
+    description = re.sub(r"\d+(\.\d+)?", "#", metadata.get("description") or "")
+    text = "|".join([str(metadata.get("camera_id")), str(metadata.get("type")), str(metadata.get("severity")), description])
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class IncidentSummarizer:
+    """Summarizes incidents in the background and writes the report back to the row.
+
+    `submit` is thread-safe and never blocks the capture pipeline. Worker
+    tasks on the server loop take jobs from a bounded queue, reuse cached
+    reports for similar incidents, respect a calls-per-minute budget and run
+    the blocking backend call on a small thread pool with a timeout. Results
+    go through the incident writer and are announced as `incident_summary`.
+    """
+
+    def __init__(self, backend=None, writer=None, manager=None, workers=None, timeout=None,
+                 rate_per_min=None, cache_size=None, max_queue=None):
+        self.backend = backend
+        self.writer = writer
+        self.manager = manager
+        self.workers = workers or config.SUMMARY_WORKERS
+        self.timeout = timeout or config.SUMMARY_TIMEOUT
+        self.rate_per_min = rate_per_min or config.SUMMARY_RATE_PER_MIN
+        self.cache_size = cache_size or config.SUMMARY_CACHE_SIZE
+        self.max_queue = max_queue or config.SUMMARY_QUEUE_SIZE
+        self.cache = OrderedDict() # content key -> report
+        self._inflight = {} # content key -> Future, so concurrent duplicates share one call
+        self.latency = StageStats("summary")
+        self.counters = {"submitted": 0, "cache_hits": 0, "calls": 0, "timeouts": 0, "failures": 0, "rejected": 0}
+        self.loop = None
+        self.queue = None
+        self._tasks = []
+        self._executor = None
+        self._tokens = float(self.workers)
+        self._refilled = time.monotonic()
+
+    @property
+    def enabled(self):
+        return self.backend is not None and self.loop is not None
+
+    def start(self, loop=None):
+        if self.backend is None or self._tasks:
+            return
+        self.loop = loop or asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="summarizer")
+        self._tasks = [self.loop.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Incident summarizer started ({self.backend.name}, {self.workers} worker(s)).")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def submit(self, handle, metadata: dict):
+        """Queues a summary for a saved incident; safe to call from any thread."""
+        if not self.enabled or handle is None:
+            return False
+        self.counters["submitted"] += 1
+        self.loop.call_soon_threadsafe(self._enqueue, (handle, dict(metadata)))
+        return True
+
+    def _enqueue(self, job):
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.counters["rejected"] += 1
+            logger.warning("Summary queue is full; keeping the default summary.")
+
+    def stats(self):
+        return {
+            "backend": self.backend.name if self.backend else None,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "cache_entries": len(self.cache),
+            **self.counters,
+            "latency": self.latency.snapshot(),
+        }
+
+    async def _acquire(self):
+        """Token bucket: `rate_per_min` calls per minute, bursts of up to `workers`."""
+        rate = self.rate_per_min / 60.0
+        while True:
+            now = time.monotonic()
+            self._tokens = min(float(self.workers), self._tokens + (now - self._refilled) * rate)
+            self._refilled = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self._tokens) / rate)
+
+    async def summarize(self, metadata: dict):
+        """Cached report for `metadata`, or None if the backend failed or timed out."""
+        key = summary_key(metadata)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.counters["cache_hits"] += 1
+            return self.cache[key]
+        if key in self._inflight:
+            self.counters["cache_hits"] += 1
+            return await asyncio.shield(self._inflight[key])
+
+        future = self.loop.create_future()
+        self._inflight[key] = future
+        try:
+            report = await self._call(metadata)
+            future.set_result(report)
+        finally:
+            if not future.done():
+                future.set_result(None)
+            del self._inflight[key]
+        if report is not None:
+            self.cache[key] = report
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return report
+
+    async def _call(self, metadata):
+        await self._acquire()
+        self.counters["calls"] += 1
+        start = time.perf_counter()
+        try:
+            report = await asyncio.wait_for(
+                self.loop.run_in_executor(self._executor, self.backend.summarize, metadata), self.timeout)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            logger.warning(f"Incident summary timed out after {self.timeout}s.")
+            return None
+        except Exception as e:
+            self.counters["failures"] += 1
+            logger.error(f"Incident summary failed: {e}")
+            return None
+        self.latency.record(time.perf_counter() - start)
+        return report
+
+    async def _worker(self):
+        while True:
+            handle, metadata = await self.queue.get()
+            try:
+                report = await self.summarize(metadata)
+                if report is not None:
+                    await self._publish(handle, metadata, report)
+            except Exception as e:
+                logger.error(f"Incident summary job failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _publish(self, handle, metadata, report):
+        if self.writer is not None:
+            self.writer.update(handle, ai_summary=report)
+        if self.manager is None:
+            return
+        if not handle.committed.is_set():
+            # The row id is only known once the writer has committed the insert
+            committed = await self.loop.run_in_executor(None, handle.committed.wait, self.timeout)
+            if not committed:
+                return
+        await self.manager.broadcast({
+            "msg_type": "incident_summary",
+            "id": handle.id,
+            "camera_id": metadata.get("camera_id"),
+            "owner_id": metadata.get("owner_id"),
+            "ai_summary": report,
+        })
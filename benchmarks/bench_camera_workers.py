@@ -0,0 +1,158 @@
+"""Threaded vs. process-per-camera pipelines: API event-loop lag and frame hand-off cost.
+
+1. Runs N cameras on a synthetic recorded file in each SENTINEL_CAMERA_MODE
+   and measures how late the API process's event loop wakes up (what every
+   request and WebSocket send waits on) while a viewer encodes one stream.
+2. Compares moving one frame between processes through a multiprocessing
+   queue (pickling) with the shared-memory ring.
+
+Usage: python -m benchmarks.bench_camera_workers [--cameras 4] [--seconds 10] [--width 1280 --height 720]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from backend import config
+from backend.ai.camera_pool import CameraPool
+from backend.ai.replay import synthetic_frames
+from backend.ai.shared_frames import SharedFrameRing
+from backend.ai.worker import _mp
+
+
+def write_video(path, width, height, fps=15.0, seconds=20):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    for frame in synthetic_frames(width, height, count=int(fps * seconds), fps=fps, burst_every=10.0, burst_length=5.0):
+        writer.write(frame)
+    writer.release()
+
+
+async def loop_lag(seconds, interval=0.01):
+    lags = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        await asyncio.sleep(interval)
+        lags.append((time.monotonic() - start - interval) * 1000)
+    lags.sort()
+    return statistics.median(lags), lags[int(len(lags) * 0.99)], lags[-1]
+
+
+async def viewer(pool, camera_id, stop):
+    encoded = 0
+    while not stop.is_set():
+        engine = pool.get(camera_id)
+        if engine is not None:
+            _, data = await asyncio.get_running_loop().run_in_executor(pool.executor, engine.frames.encode, 80)
+            encoded += data is not None
+        await asyncio.sleep(1 / 15)
+    return encoded
+
+
+async def run_mode(mode, video, args):
+    config.CAMERA_MODE = mode
+    pool = CameraPool()
+    cameras = [SimpleNamespace(id=i + 1, source_url=video, owner_id="admin", zones=None) for i in range(args.cameras)]
+    pool.start(cameras, loop=asyncio.get_running_loop())
+    await asyncio.sleep(args.warmup)
+    stop = asyncio.Event()
+    watching = asyncio.create_task(viewer(pool, "1", stop))
+    p50, p99, worst = await loop_lag(args.seconds)
+    stop.set()
+    encoded = await watching
+    fps = [h["analysis_fps"] for h in pool.health().values()]
+    await asyncio.get_running_loop().run_in_executor(None, pool.shutdown)
+    print(f"  {mode:<8} loop lag p50 {p50:6.2f} ms  p99 {p99:6.2f} ms  max {worst:7.2f} ms   "
+          f"analysis {statistics.mean(fps):5.1f} fps/camera   viewer {encoded / args.seconds:4.1f} fps")
+
+
+def _queue_producer(q, shape, count):
+    frame = np.random.default_rng(0).integers(0, 255, shape, dtype=np.uint8)
+    for _ in range(count):
+        q.put(frame)
+    q.put(None)
+
+
+def _ring_producer(name, slots, slot_bytes, shape, count, done):
+    ring = SharedFrameRing.attach(name, slots, slot_bytes)
+    frame = np.random.default_rng(0).integers(0, 255, shape, dtype=np.uint8)
+    for _ in range(count):
+        ring.write_frame(frame)
+        time.sleep(0.001)
+    done.set()
+    ring.close()
+
+
+def handoff(args):
+    shape = (args.height, args.width, 3)
+    count = 300
+
+    q = _mp.Queue(maxsize=4)
+    producer = _mp.Process(target=_queue_producer, args=(q, shape, count))
+    producer.start()
+    q.get() # Exclude process start-up
+    cpu, wall = time.process_time(), time.perf_counter()
+    received = 1
+    while q.get() is not None:
+        received += 1
+    queue_cpu = (time.process_time() - cpu) / received * 1e6
+    queue_fps = received / (time.perf_counter() - wall)
+    producer.join()
+
+    slot_bytes = int(np.prod(shape))
+    ring = SharedFrameRing.create(4, slot_bytes)
+    done = _mp.Event()
+    producer = _mp.Process(target=_ring_producer, args=(ring.name, 4, slot_bytes, shape, count, done))
+    producer.start()
+    while not ring.latest_seq:
+        time.sleep(0.001)
+    cpu = time.process_time()
+    seen, last = 0, 0
+    while not done.is_set():
+        seq = ring.latest_seq
+        if seq != last:
+            last, _, view = ring.read_latest()
+            seen += view is not None
+        else:
+            time.sleep(0.0005)
+    ring_cpu = (time.process_time() - cpu) / max(1, seen) * 1e6
+    producer.join()
+    ring.close()
+
+    print(f"\nFrame hand-off to the API process ({args.width}x{args.height}, CPU in the receiving process):")
+    print(f"  multiprocessing.Queue  {queue_cpu:8.0f} us/frame  ({queue_fps:.0f} frames/s max)")
+    print(f"  shared-memory ring     {ring_cpu:8.0f} us/frame  (views, including polling)")
+
+
+async def main_async(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        video = os.path.join(tmp, "synthetic.avi")
+        write_video(video, args.width, args.height)
+        print(f"{args.cameras} camera(s), {args.width}x{args.height}, one live viewer, {args.seconds:.0f}s per mode:")
+        for mode in args.modes:
+            await run_mode(mode, video, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cameras", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds for workers to start and connect")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--modes", nargs="+", default=["thread", "process"])
+    args = parser.parse_args()
+    os.environ.setdefault("SENTINEL_DETECTOR", "none")
+    config.DETECTOR = os.environ["SENTINEL_DETECTOR"]
+    asyncio.run(main_async(args))
+    handoff(args)
+
+
+if __name__ == "__main__":
+    main()
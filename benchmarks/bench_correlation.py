@@ -0,0 +1,134 @@
+"""Incident correlation on replayed event streams: DB writes and broadcasts saved, and the cost per event.
+
+Each event is an incident dict as the pipelines save it. Without the
+correlator every event is one INSERT and one alert broadcast; with it, an
+event either opens an incident (INSERT + alert) or is merged into an open
+one, whose totals are written back (UPDATE + `incident_progress` message)
+at most every flush interval and when it closes.
+
+The default stream is synthetic: cameras spread over a few locations, with
+sustained events that re-fire every cooldown on every camera of the
+location, small timing offsets between cameras, and occasional severity
+escalations. `--events` replays a recorded stream instead (NDJSON, e.g. from
+maintenance_scripts/export_incidents.py), in timestamp order.
+
+Usage: python -m benchmarks.bench_correlation [--cameras 24 --locations 8] [--hours 24] [--events stream.ndjson]
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from backend import config
+from backend.ai.replay import SimulatedClock
+from backend.services.correlation import IncidentCorrelator
+
+
+def synthetic_events(cameras, locations, hours, cooldown=10.0, seed=7):
+    """(events, {camera_id: location}) for `hours` of sustained events across location groups."""
+    rng = random.Random(seed)
+    placement = {str(c): f"Zone {c % locations}" for c in range(1, cameras + 1)}
+    by_location = {}
+    for camera_id, location in placement.items():
+        by_location.setdefault(location, []).append(camera_id)
+    start = datetime(2025, 1, 1)
+    end = hours * 3600.0
+    events = []
+    for location, members in by_location.items():
+        t = rng.uniform(0, 600)
+        while t < end:
+            # One episode: something keeps happening for a few minutes and every camera that sees it re-fires
+            length = rng.expovariate(1 / 240.0)
+            kind = rng.choice(("Rapid Escalation", "Rapid Escalation", "Loitering Detected"))
+            watching = rng.sample(members, rng.randint(1, len(members)))
+            severity = "Medium"
+            at = t
+            while at < t + length:
+                if rng.random() < 0.03:
+                    severity = "High" if severity == "Medium" else "Critical"
+                for camera_id in watching:
+                    stamp = start + timedelta(seconds=at + rng.uniform(0, 1.5))
+                    events.append({"camera_id": camera_id, "owner_id": "bench", "type": kind, "severity": severity,
+                                   "escalation_score": round(rng.uniform(0.5, 1.0), 3),
+                                   "timestamp": stamp.isoformat()})
+                at += cooldown + rng.uniform(0, 2.0)
+            t += length + rng.expovariate(1 / 900.0)
+    events.sort(key=lambda e: e["timestamp"])
+    return events, placement
+
+
+def recorded_events(path):
+    with open(path) as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    for event in events:
+        event["camera_id"] = str(event.get("camera_id"))
+        event["timestamp"] = str(event["timestamp"]).replace(" ", "T")
+    events.sort(key=lambda e: e["timestamp"])
+    return events
+
+
+def correlate(events, placement, window, by_location):
+    """Feeds `events` through an IncidentCorrelator in simulated time; returns (correlator, broadcasts, per-event us)."""
+    clock = SimulatedClock(0.0)
+    alerts = []
+    progress = []
+
+    async def broadcast(message):
+        progress.append(message)
+
+    correlator = IncidentCorrelator(persist=lambda meta: object(), update=lambda handle, **fields: None,
+                                    broadcast_callback=broadcast, window=window, by_location=by_location, clock=clock)
+    for camera_id, location in placement.items():
+        correlator.set_group(camera_id, location)
+
+    timings = []
+    last_sweep = None
+    for event in events:
+        clock.now = datetime.fromisoformat(event["timestamp"]).timestamp()
+        if last_sweep is None or clock.now - last_sweep >= 5.0:
+            correlator.sweep() # What the background thread does every few seconds
+            last_sweep = clock.now
+        start = time.perf_counter()
+        correlator.submit(event)
+        if correlator.should_broadcast(event):
+            alerts.append(event)
+        timings.append((time.perf_counter() - start) * 1e6)
+    correlator.close_all()
+    timings.sort()
+    return correlator, len(alerts) + correlator.counters["progress_messages"], timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cameras", type=int, default=24)
+    parser.add_argument("--locations", type=int, default=8)
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--events", default=None, help="NDJSON stream of recorded incidents to replay")
+    parser.add_argument("--window", type=float, default=config.CORRELATION_WINDOW)
+    args = parser.parse_args()
+
+    if args.events:
+        events = recorded_events(args.events)
+        placement = {}
+        source = args.events
+    else:
+        events, placement = synthetic_events(args.cameras, args.locations, args.hours)
+        source = f"synthetic: {args.cameras} cameras in {args.locations} locations, {args.hours:g} h"
+    print(f"{len(events)} events ({source}), window {args.window:g}s, flush every {config.CORRELATION_FLUSH_INTERVAL:g}s")
+
+    print(f"\n{'grouping':<12} {'incidents':>10} {'inserts':>9} {'updates':>9} {'DB writes':>10} {'broadcasts':>11} "
+          f"{'p50 us':>7} {'p99 us':>7}")
+    print(f"{'none':<12} {len(events):>10} {len(events):>9} {0:>9} {len(events):>10} {len(events):>11}")
+    for label, by_location in (("per camera", False), ("by location", True)):
+        correlator, broadcasts, timings = correlate(events, placement, args.window, by_location)
+        c = correlator.counters
+        writes = c["opened"] + c["updates"]
+        print(f"{label:<12} {c['opened']:>10} {c['opened']:>9} {c['updates']:>9} {writes:>10} {broadcasts:>11} "
+              f"{statistics.median(timings):7.1f} {timings[int(len(timings) * 0.99)]:7.1f}"
+              f"   writes -{1 - writes / len(events):.0%}, broadcasts -{1 - broadcasts / len(events):.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Throughput and latency of DetectionScheduler per max batch size.
+
+Simulates many cameras submitting frames at a fixed rate. With the default
+stub backend, inference cost is modelled as a fixed per-call cost plus a
+per-frame cost (typical of CPU inference); pass --backend ultralytics to
+measure the real model instead.
+
+Usage: python -m benchmarks.bench_detector [--cameras 16 --fps 5] [--batches 1 2 4 8 16] [--backend stub]
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import numpy as np
+
+from backend.ai.detector import DetectionScheduler, StubDetector, create_detector
+
+
+def run(detector, cameras, fps, max_batch, max_wait, seconds):
+    scheduler = DetectionScheduler(detector, max_batch=max_batch, max_wait=max_wait)
+    scheduler.start()
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 180, (480, 640, 3), dtype=np.uint8)
+    frame[100:220, 300:360] = 255
+    latencies, lock, done = [], threading.Lock(), [0]
+    pending = [False] * cameras
+
+    def callback_for(cam):
+        def callback(detections, submitted):
+            with lock:
+                latencies.append(time.perf_counter() - submitted)
+                done[0] += 1
+            pending[cam] = False
+        return callback
+
+    callbacks = [callback_for(cam) for cam in range(cameras)]
+    start = time.perf_counter()
+    tick = 0
+    while time.perf_counter() - start < seconds:
+        for cam in range(cameras):
+            # Like AIProcessor: at most one frame per camera in flight
+            if not pending[cam]:
+                pending[cam] = scheduler.submit(cam, frame, time.perf_counter(), callbacks[cam])
+        tick += 1
+        time.sleep(max(0.0, start + tick / fps - time.perf_counter()))
+    elapsed = time.perf_counter() - start
+    time.sleep(0.5)
+    scheduler.stop()
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0
+    sizes = scheduler.batch_stats
+    mean_batch = sum(k * v.count for k, v in sizes.items()) / max(1, sum(v.count for v in sizes.values()))
+    return done[0] / elapsed, statistics.median(latencies) if latencies else 0, p99, mean_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backend", default="stub")
+    parser.add_argument("--cameras", type=int, default=16)
+    parser.add_argument("--fps", type=float, default=5)
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--max-wait", type=float, default=0.03)
+    parser.add_argument("--seconds", type=float, default=4)
+    parser.add_argument("--batch-cost", type=float, default=0.020, help="Stub: fixed seconds per inference call")
+    parser.add_argument("--frame-cost", type=float, default=0.004, help="Stub: seconds per frame in a call")
+    args = parser.parse_args()
+
+    if args.backend == "stub":
+        detector = StubDetector(batch_cost=args.batch_cost, frame_cost=args.frame_cost)
+    else:
+        detector = create_detector(args.backend)
+    print(f"{args.cameras} cameras at {args.fps} fps offered ({args.cameras * args.fps:.0f} frames/s), backend {detector.name}")
+    print(f"{'max batch':>9} {'mean batch':>10} {'frames/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for max_batch in args.batches:
+        throughput, p50, p99, mean_batch = run(detector, args.cameras, args.fps, max_batch, args.max_wait, args.seconds)
+        print(f"{max_batch:>9} {mean_batch:>10.1f} {throughput:>9.1f} {p50 * 1000:>8.1f} {p99 * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Bulk incident export: rows/s and peak RSS, streaming vs. building the list in memory.
+
+Seeds a scratch database (reused with --keep), then exports every row in a
+fresh child process per method so each peak RSS stands alone:
+
+- list:   what `GET /incidents/` does, all rows through the ORM into one JSON body
+- ndjson: `backend.services.export`, `yield_per` chunks encoded as NDJSON
+- csv:    the same stream encoded as CSV
+
+Usage: python -m benchmarks.bench_export [--rows 2000000] [--db bench_export.db] [--keep]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.models.database import Base
+from backend.api.routes.incidents import INCIDENT_FIELDS, build_incident_query
+from backend.services.export import export_incidents
+from benchmarks.bench_incident_queries import has_rows, seed
+
+METHODS = ("list", "ndjson", "csv")
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # KiB on Linux
+
+
+def child(method, db_path):
+    """Exports everything to /dev/null and prints {rows, bytes, seconds, rss_mb, base_mb} as JSON."""
+    db = sessionmaker(bind=create_engine(f"sqlite:///{db_path}"))()
+    base = peak_rss_mb()
+    start = time.perf_counter()
+    written = rows = 0
+    with open(os.devnull, "wb") as out:
+        if method == "list":
+            result = [row._asdict() for row in build_incident_query(db, fields=INCIDENT_FIELDS).all()]
+            body = json.dumps(result, default=str).encode()
+            rows, written = len(result), len(body)
+            out.write(body)
+        else:
+            for chunk in export_incidents(db, method, archive=None):
+                out.write(chunk)
+                written += len(chunk)
+                rows += chunk.count(b"\n")
+            rows -= method == "csv" # Header line
+    print(json.dumps({"rows": rows, "bytes": written, "seconds": time.perf_counter() - start,
+                      "rss_mb": peak_rss_mb(), "base_mb": base}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--db", default="bench_export.db")
+    parser.add_argument("--keep", action="store_true", help="Reuse an existing seeded database")
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    parser.add_argument("--child", choices=METHODS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child, args.db)
+
+    if os.path.exists(args.db) and not args.keep:
+        os.remove(args.db)
+    engine = create_engine(f"sqlite:///{args.db}")
+    if not has_rows(engine):
+        Base.metadata.create_all(bind=engine)
+        start = time.perf_counter()
+        seed(engine, args.rows)
+        print(f"Seeded {args.rows} incidents in {time.perf_counter() - start:.1f}s")
+    engine.dispose()
+
+    print(f"\n{'method':<8} {'rows':>10} {'MB out':>9} {'seconds':>8} {'rows/s':>10} {'peak RSS MB':>12} {'(imports)':>10}")
+    for method in args.methods:
+        output = subprocess.run([sys.executable, "-m", "benchmarks.bench_export", "--child", method, "--db", args.db],
+                                capture_output=True, text=True, check=True).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        print(f"{method:<8} {r['rows']:>10} {r['bytes'] / 2**20:9.1f} {r['seconds']:8.1f} "
+              f"{r['rows'] / r['seconds']:10,.0f} {r['rss_mb']:12.0f} {r['base_mb']:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Per-frame cost of MotionHeatmap.update and of rendering the PNG overlay.
+
+Feeds the masks MotionAnalyzer produces for a synthetic clip (analysis
+resolution, optionally zoned) into the heatmap and times the update alone,
+next to a straightforward NumPy decay over a full-resolution float map
+for reference.
+
+Usage: python -m benchmarks.bench_heatmap [--frames 600] [--width 1280 --height 720] [--grid 64]
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from backend import config
+from backend.ai.heatmap import MotionHeatmap, render_png
+from backend.ai.motion import MotionAnalyzer
+from backend.ai.replay import synthetic_frames
+from backend.ai.zones import load_zones
+
+
+class NumpyHeatmap:
+    """Decaying map at analysis resolution with plain NumPy arithmetic (allocates per frame)."""
+
+    def __init__(self, half_life):
+        self.half_life = half_life
+        self.live = None
+        self.updated = None
+
+    def update(self, mask, roi, size, timestamp):
+        if self.live is None:
+            self.live = np.zeros((size[1], size[0]), np.float32)
+        x, y, w, h = roi
+        alpha = 1.0 - 0.5 ** (max(timestamp - (self.updated or timestamp), 1e-3) / self.half_life)
+        self.live *= 1.0 - alpha
+        self.live[y:y + h, x:x + w] += alpha * (mask / 255.0).astype(np.float32)
+        self.updated = timestamp
+
+
+def masks(args, zones):
+    """(mask copy, roi, size) per frame, as the processor would pass them."""
+    motion = MotionAnalyzer(zones=zones)
+    out = []
+    for frame in synthetic_frames(args.width, args.height, count=args.frames, burst_every=8.0, burst_length=4.0):
+        motion.score(frame)
+        if motion.roi is not None:
+            out.append((motion.mask.copy(), motion.roi, motion.size))
+    return out
+
+
+def per_frame_us(heatmap, samples, fps=15.0):
+    timings = []
+    for i, (mask, roi, size) in enumerate(samples):
+        start = time.perf_counter()
+        heatmap.update(mask, roi, size, 1_700_000_000 + i / fps)
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--grid", type=int, default=config.HEATMAP_WIDTH)
+    args = parser.parse_args()
+
+    zoned = load_zones([{"name": "door", "points": [[0.1, 0.2], [0.6, 0.2], [0.6, 0.9], [0.1, 0.9]]}])
+    print(f"{args.frames} frames {args.width}x{args.height}, analysis width {config.ANALYSIS_WIDTH}, grid width {args.grid}")
+    print(f"  {'map':<34} {'p50 us':>8} {'p99 us':>8}")
+    for label, zones in (("full frame", None), ("zoned", zoned)):
+        samples = masks(args, zones)
+        heatmap = MotionHeatmap(width=args.grid)
+        p50, p99 = per_frame_us(heatmap, samples)
+        print(f"  {'MotionHeatmap (' + label + ')':<34} {p50:8.1f} {p99:8.1f}")
+        p50, p99 = per_frame_us(NumpyHeatmap(config.HEATMAP_HALF_LIFE), samples)
+        print(f"  {'NumPy full-res map (' + label + ')':<34} {p50:8.1f} {p99:8.1f}")
+
+    _, grid = heatmap.grid("live")
+    start = time.perf_counter()
+    for _ in range(50):
+        png = render_png(grid, width=args.width)
+    print(f"\nPNG overlay at {args.width}px: {(time.perf_counter() - start) / 50 * 1000:.2f} ms, {len(png) / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
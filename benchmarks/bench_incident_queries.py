@@ -0,0 +1,104 @@
+"""Seeds a large incidents table and reports p50/p99 latency per query shape.
+
+Uses the same query builder as GET /incidents/ against a scratch SQLite file.
+
+Usage: python -m benchmarks.bench_incident_queries [--rows 1000000] [--iterations 200] [--db bench_incidents.db]
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.models.database import Base, Incident
+from backend.api.routes.incidents import build_incident_query, parse_fields
+
+OWNERS = ["admin"] + [f"operator_{i:03d}" for i in range(1, 20)]
+SEVERITIES = ["Low", "Medium", "High"]
+TYPES = ["Rapid Escalation", "Loitering", "Intrusion"]
+START = datetime(2025, 1, 1)
+
+
+def seed(engine, rows, batch=50000):
+    rng = random.Random(42)
+    table = Incident.__table__
+    span = 365 * 24 * 3600
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch):
+            conn.execute(table.insert(), [{
+                "timestamp": START + timedelta(seconds=rng.randrange(span)),
+                "camera_id": str(rng.randrange(200)),
+                "type": rng.choice(TYPES),
+                "severity": rng.choice(SEVERITIES),
+                "description": "Sustained motion anomaly detected in secure zone. " * 4,
+                "ai_summary": "Temporal sentinel analysis confirmed after sustained anomaly detection. " * 6,
+                "confidence": rng.random(),
+                "owner_id": rng.choice(OWNERS),
+            } for _ in range(min(batch, rows - offset))])
+
+
+def has_rows(engine):
+    if not inspect(engine).has_table("incidents"):
+        return False
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT 1 FROM incidents LIMIT 1")).first() is not None
+
+
+def shapes(rng):
+    """Each shape returns the build_incident_query kwargs for one request."""
+    def deep_cursor():
+        return START + timedelta(days=rng.randrange(1, 365)), 10**9
+    return {
+        "latest page (admin)": lambda: {},
+        "latest page (operator)": lambda: {"owner_id": rng.choice(OWNERS[1:])},
+        "camera filter": lambda: {"camera_id": str(rng.randrange(200))},
+        "operator + camera": lambda: {"owner_id": rng.choice(OWNERS[1:]), "camera_id": str(rng.randrange(200))},
+        "severity + type": lambda: {"severity": rng.choice(SEVERITIES), "incident_type": rng.choice(TYPES)},
+        "time range (1 day)": lambda: (lambda d: {"since": d, "until": d + timedelta(days=1)})(START + timedelta(days=rng.randrange(364))),
+        "deep cursor page": lambda: {"cursor": deep_cursor()},
+        "sparse fields": lambda: {"fields": parse_fields("type,severity,camera_id")},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--db", default="bench_incidents.db")
+    parser.add_argument("--keep", action="store_true", help="Reuse an existing seeded database")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db) and not args.keep:
+        os.remove(args.db)
+    engine = create_engine(f"sqlite:///{args.db}")
+    fresh = not has_rows(engine)
+    Base.metadata.create_all(bind=engine)
+    if fresh:
+        start = time.perf_counter()
+        seed(engine, args.rows)
+        print(f"Seeded {args.rows} incidents in {time.perf_counter() - start:.1f}s")
+    Session = sessionmaker(bind=engine)
+
+    rng = random.Random(1)
+    db = Session()
+    print(f"{'shape':<24} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, make in shapes(rng).items():
+        timings = []
+        for _ in range(args.iterations):
+            kwargs = make()
+            start = time.perf_counter()
+            build_incident_query(db, **kwargs).limit(args.limit + 1).all()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        print(f"{name:<24} {statistics.median(timings):9.2f} {p99:9.2f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""/incidents/stats from rollups vs. aggregating the incidents table, and the write-side cost.
+
+Seeds a scratch database where, as in production, every camera belongs to
+one owner, rebuilds the rollups, then times one stats request per bucket
+size both ways and checks that they agree. Hour and day buckets are rolled
+up; minute stats group the incidents in their (short) window either way, so
+the minute rows time the same table. Fails unless there are fewer day
+rollup rows than incidents, hour stats are no slower than the scan and day
+stats are at least twice as fast. Also reports how much the rollup upsert
+adds to an incident writer batch.
+
+Usage: python -m benchmarks.bench_incident_stats [--rows 1000000] [--cameras 50] [--days 90] [--iterations 20]
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from backend.models.database import Base, Incident, IncidentRollup
+from backend.services.rollups import apply_rollups, query_stats, rebuild_rollups, resolve_window, rollup_counts
+from benchmarks.bench_incident_queries import SEVERITIES, START, TYPES, has_rows
+
+OWNERS = ["operator_001", "operator_002", "operator_003", "operator_004"]
+# Window per bucket size, counted back from the end of the seeded range
+SPANS = {"minute": timedelta(hours=6), "hour": timedelta(days=30), "day": timedelta(days=90)}
+_SQL_FORMATS = {"minute": "%Y-%m-%d %H:%M:00", "hour": "%Y-%m-%d %H:00:00", "day": "%Y-%m-%d 00:00:00"}
+
+
+def seed(engine, rows, cameras, days, batch=50000):
+    rng = random.Random(42)
+    table = Incident.__table__
+    span = days * 24 * 3600
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch):
+            chunk = []
+            for _ in range(min(batch, rows - offset)):
+                camera = rng.randrange(cameras)
+                chunk.append({
+                    "timestamp": START + timedelta(seconds=rng.randrange(span)),
+                    "camera_id": str(camera),
+                    "owner_id": OWNERS[camera % len(OWNERS)],
+                    "type": rng.choice(TYPES),
+                    "severity": rng.choice(SEVERITIES),
+                    "description": "Sustained motion anomaly detected in secure zone.",
+                    "confidence": rng.random(),
+                })
+            conn.execute(table.insert(), chunk)
+
+
+def scan_stats(db, owner_id, bucket, since, until):
+    """What the dashboard would otherwise need: GROUP BY over the raw incidents, folded into the same response."""
+    start = func.strftime(_SQL_FORMATS[bucket], Incident.timestamp)
+    query = (select(start, Incident.camera_id, Incident.severity, Incident.type, func.count())
+             .where(Incident.timestamp >= since, Incident.timestamp < until))
+    if owner_id != "admin":
+        query = query.where(Incident.owner_id == owner_id)
+    totals = [Counter(), Counter(), Counter()]
+    series = {}
+    for point_start, camera, severity, kind, count in db.execute(query.group_by(start, Incident.camera_id, Incident.severity,
+                                                                               Incident.type)):
+        point = series.setdefault(point_start, [0, Counter(), Counter(), Counter()])
+        point[0] += count
+        for counter, value in zip(point[1:], (camera, severity, kind)):
+            counter[value] += count
+        for counter, value in zip(totals, (camera, severity, kind)):
+            counter[value] += count
+    return {
+        "bucket": bucket, "since": since.isoformat(), "until": until.isoformat(),
+        "total": sum(totals[1].values()),
+        "by_camera": dict(totals[0]), "by_severity": dict(totals[1]), "by_type": dict(totals[2]),
+        "series": [{"start": datetime.strptime(point_start, "%Y-%m-%d %H:%M:%S").isoformat(), "count": point[0],
+                    "by_camera": dict(point[1]), "by_severity": dict(point[2]), "by_type": dict(point[3])}
+                   for point_start, point in sorted(series.items())],
+    }
+
+
+def timed(fn, iterations):
+    timings = []
+    for _ in range(iterations):
+        begin = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - begin) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--cameras", type=int, default=50)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--db", default="bench_incident_stats.db")
+    parser.add_argument("--keep", action="store_true", help="Reuse an existing seeded database")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db) and not args.keep:
+        os.remove(args.db)
+    engine = create_engine(f"sqlite:///{args.db}")
+    fresh = not has_rows(engine)
+    Base.metadata.create_all(bind=engine)
+    if fresh:
+        seed(engine, args.rows, args.cameras, args.days)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+
+    begin = time.perf_counter()
+    rollup_rows = rebuild_rollups(db)
+    incidents = db.scalar(select(func.count()).select_from(Incident))
+    print(f"Rebuilt {rollup_rows} rollup rows from {incidents} incidents in {time.perf_counter() - begin:.1f}s")
+    per_bucket = dict(db.execute(select(IncidentRollup.bucket, func.count()).group_by(IncidentRollup.bucket)).all())
+    for bucket, rows in sorted(per_bucket.items()):
+        print(f"  {bucket:<6} {rows:>9} rows ({rows / incidents:.1%} of incidents)")
+    print()
+    assert per_bucket["day"] < incidents, "there should be fewer day rollup rows than the incidents they count"
+
+    print(f"{'bucket':<8} {'owner':<14} {'scan ms':>9} {'stats ms':>9}")
+    end = START + timedelta(days=args.days)
+    speedups = {"hour": [], "day": []}
+    for bucket, span in SPANS.items():
+        since, until = resolve_window(bucket, end - span, end)
+        for owner in ("admin", OWNERS[0]):
+            assert scan_stats(db, owner, bucket, since, until) == query_stats(db, owner, bucket, since, until), bucket
+            scan = timed(lambda: scan_stats(db, owner, bucket, since, until), args.iterations)
+            rollup = timed(lambda: query_stats(db, owner, bucket, since, until), args.iterations)
+            print(f"{bucket:<8} {owner:<14} {scan:9.1f} {rollup:9.1f}   x{scan / rollup:.1f}")
+            if bucket in speedups:
+                speedups[bucket].append(scan / rollup)
+    assert min(speedups["hour"]) >= 1, f"hour stats from rollups should not be slower than the scan: {speedups['hour']}"
+    assert min(speedups["day"]) >= 2, f"day stats from rollups should be at least 2x faster than the scan: {speedups['day']}"
+
+    # Write side: what the upsert adds to one writer batch (rolled back, so repeatable)
+    batch = [Incident(timestamp=datetime(2025, 6, 1) + timedelta(seconds=i * 13), camera_id=str(i % 50),
+                      type="Intrusion", severity="High", owner_id="admin") for i in range(200)]
+    upsert = timed(lambda: (apply_rollups(db, rollup_counts(batch)), db.rollback()), args.iterations)
+    print(f"\nRollup upsert for a batch of {len(batch)} incidents: {upsert:.2f} ms")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Pipeline throughput, stage latency, memory and incident counts from headless replays.
+
+Runs the synthetic scenario (or recorded files) through AIProcessor in
+simulated time for every resolution x camera count, with cameras replayed
+concurrently on a pool sized like the live camera pool. Results are written
+as JSON so runs can be compared for regressions.
+
+Usage: python -m benchmarks.bench_replay [--resolutions 640x360 1280x720] [--cameras 1 4] [--frames 450]
+                                         [--json results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import platform
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend import config
+from backend.ai.replay import peak_rss_mb, replay, synthetic_frames, video_frames
+
+
+def run_case(width, height, cameras, frames, fps, encode_every, videos):
+    def one(i):
+        if videos:
+            source, _ = video_frames(videos[i % len(videos)], frames)
+        else:
+            source = synthetic_frames(width, height, frames, fps, seed=7 + i)
+        return replay(source, fps, f"CAM-{i + 1:02d}", encode_every=encode_every)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(cameras, config.MAX_WORKERS)) as pool:
+        results = list(pool.map(one, range(cameras)))
+    elapsed = time.perf_counter() - start
+
+    def mean_ms(stage):
+        values = [r["stages"][stage]["mean_ms"] for r in results if stage in r["stages"]]
+        return round(sum(values) / len(values), 3) if values else None
+
+    return {
+        "resolution": f"{width}x{height}",
+        "cameras": cameras,
+        "frames_per_camera": frames,
+        "total_fps": round(sum(r["frames"] for r in results) / elapsed, 1),
+        "realtime_factor": round(results[0]["simulated_seconds"] / elapsed, 1),
+        "analysis_mean_ms": mean_ms("analysis"),
+        "encode_mean_ms": mean_ms("encode"),
+        "incidents": sum(r["incidents"] for r in results),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(c["resolution"], c["cameras"]): c for c in json.load(f)["cases"]}
+    print(f"\nvs {baseline_path}")
+    for case in results:
+        old = baseline.get((case["resolution"], case["cameras"]))
+        if old is None:
+            continue
+        delta = (case["total_fps"] - old["total_fps"]) / old["total_fps"] * 100
+        flag = "  REGRESSION" if delta < -10 else ""
+        print(f"  {case['resolution']:>10} x{case['cameras']:<3} {old['total_fps']:>9.1f} -> {case['total_fps']:>9.1f} frames/s ({delta:+.1f}%)"
+              f"  incidents {old['incidents']} -> {case['incidents']}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", nargs="+", default=["640x360", "1280x720", "1920x1080"])
+    parser.add_argument("--cameras", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--frames", type=int, default=450, help="Frames per camera (450 = 30 s at 15 fps)")
+    parser.add_argument("--fps", type=float, default=15.0)
+    parser.add_argument("--encode-every", type=int, default=1, help="JPEG-encode every Nth frame (0 = never)")
+    parser.add_argument("--videos", nargs="*", default=None, help="Replay recorded files instead of synthetic frames")
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    parser.add_argument("--compare", help="Baseline results file to compare against")
+    args = parser.parse_args()
+
+    cases = []
+    print(f"{'resolution':>10} {'cams':>4} {'frames/s':>9} {'x realtime':>10} {'analysis ms':>11} {'encode ms':>9} {'incidents':>9} {'RSS MB':>7}")
+    for resolution in args.resolutions:
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        for cameras in args.cameras:
+            case = run_case(width, height, cameras, args.frames, args.fps, args.encode_every, args.videos)
+            cases.append(case)
+            print(f"{case['resolution']:>10} {cameras:>4} {case['total_fps']:>9.1f} {case['realtime_factor']:>10.1f} "
+                  f"{case['analysis_mean_ms']:>11} {str(case['encode_mean_ms']):>9} {case['incidents']:>9} {case['peak_rss_mb']:>7}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "max_workers": config.MAX_WORKERS,
+                "cases": cases,
+            }, f, indent=2)
+        print(f"Results written to {args.json_path}")
+    if args.compare:
+        compare(cases, args.compare)
+
+
+if __name__ == "__main__":
+    main()
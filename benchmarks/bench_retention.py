@@ -0,0 +1,141 @@
+"""Incident retention: archive throughput, write-lock impact, file size and query latency.
+
+Seeds a scratch database with a year of incidents, then runs one retention
+pass that archives everything older than --keep-days while a background
+thread keeps inserting incidents the way the incident writer does. Reports
+the insert latency seen during the pass, the database size before and
+after, the archive size, and GET /incidents/-style query latency for a
+recent window (database) and an archived one (archive scan).
+
+Usage: python -m benchmarks.bench_retention [--rows 1000000] [--days 365] [--keep-days 90] [--batch 1000]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend.api.routes.incidents import INCIDENT_FIELDS, build_incident_query
+from backend.models.database import Base, Incident, set_sqlite_pragmas
+from backend.services.retention import IncidentArchive, IncidentArchiver
+from benchmarks.bench_incident_queries import OWNERS, SEVERITIES, START, TYPES
+
+
+def seed(engine, rows, days, batch=50000):
+    rng = random.Random(42)
+    span = days * 24 * 3600
+    stamps = sorted(START + timedelta(seconds=rng.randrange(span)) for _ in range(rows))
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch):
+            conn.execute(Incident.__table__.insert(), [{
+                "timestamp": stamp,
+                "camera_id": str(rng.randrange(50)),
+                "owner_id": rng.choice(OWNERS),
+                "type": rng.choice(TYPES),
+                "severity": rng.choice(SEVERITIES),
+                "description": "Sustained motion anomaly detected in secure zone.",
+                "confidence": rng.random(),
+            } for stamp in stamps[offset:offset + batch]])
+
+
+def db_bytes(path):
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def dir_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, n)) for root, _, names in os.walk(path) for n in names)
+
+
+def percentiles(values):
+    values = sorted(values)
+    return statistics.median(values), values[int(len(values) * 0.99)], values[-1]
+
+
+def inserter(Session, now, stop, latencies):
+    """Single-row commits, like a quiet incident writer, timing how long each waits for the lock."""
+    while not stop.is_set():
+        db = Session()
+        begin = time.perf_counter()
+        db.add(Incident(timestamp=now, camera_id="1", owner_id="admin", type="Intrusion", severity="High"))
+        db.commit()
+        latencies.append((time.perf_counter() - begin) * 1000)
+        db.close()
+        time.sleep(0.01)
+
+
+def timed(fn, iterations):
+    timings = []
+    for _ in range(iterations):
+        begin = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - begin) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--keep-days", type=int, default=90)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "retention.db")
+        engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 30})
+        event.listen(engine, "connect", set_sqlite_pragmas)
+        Session = sessionmaker(bind=engine)
+        Base.metadata.create_all(engine)
+        start = time.perf_counter()
+        seed(engine, args.rows, args.days)
+        print(f"Seeded {args.rows} incidents over {args.days} days in {time.perf_counter() - start:.1f}s")
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        size_before = db_bytes(path)
+
+        now = START + timedelta(days=args.days)
+        recent = lambda db: build_incident_query(db, "admin", since=now - timedelta(days=7), fields=INCIDENT_FIELDS).limit(100).all()
+        db = Session()
+        recent_before = timed(lambda: recent(db), args.iterations)
+        db.close()
+
+        archive = IncidentArchive(os.path.join(tmp, "archive"))
+        archiver = IncidentArchiver(archive, Session, engine, retention_days=args.keep_days, batch_size=args.batch)
+        stop, latencies = threading.Event(), []
+        thread = threading.Thread(target=inserter, args=(Session, now, stop, latencies))
+        thread.start()
+        result = archiver.run_once(now)
+        stop.set()
+        thread.join()
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        print(f"\nRetention pass (cutoff {result['cutoff'][:10]}, batches of {args.batch}):")
+        print(f"  archived {result['archived']} incidents in {result['seconds']:.1f}s "
+              f"({result['archived'] / max(result['seconds'], 1e-9):,.0f} rows/s), freed {result['freed_pages']} pages")
+        p50, p99, worst = percentiles(latencies)
+        print(f"  concurrent single-row inserts: {len(latencies)}, latency p50 {p50:.1f} ms  p99 {p99:.1f} ms  max {worst:.1f} ms")
+        print(f"  database {size_before / 2**20:8.1f} MB -> {db_bytes(path) / 2**20:8.1f} MB")
+        print(f"  archives {dir_bytes(archive.directory) / 2**20:8.1f} MB in {len(archive.index()['months'])} monthly files")
+
+        db = Session()
+        recent_after = timed(lambda: recent(db), args.iterations)
+        db.close()
+        month_ago = archive.archived_before - timedelta(days=30)
+        archived = timed(lambda: archive.scan(since=month_ago, limit=101), max(1, args.iterations // 4))
+        deep = timed(lambda: archive.scan(since=START, until=START + timedelta(days=7), limit=101), max(1, args.iterations // 4))
+        print("\nQuery latency (median, 100 rows):")
+        print(f"  last 7 days, database     before {recent_before:7.2f} ms   after {recent_after:7.2f} ms")
+        print(f"  newest archived month     {archived:7.1f} ms (archive scan)")
+        print(f"  oldest archived week      {deep:7.1f} ms (archive scan)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Per-frame cost of evaluating per-camera detection rules, compiled vs. interpreted.
+
+Generates random rule sets (thresholds, confirmation windows, cooldowns,
+severity maps, half of them on weekly schedules) and drives every camera
+with a bursty motion score at 15 fps of simulated time. Each frame is
+smoothed and run through the camera's escalation rules:
+
+- compiled:    backend.ai.rules RuleSet (sorted parallel lists, bisect, per-minute schedule cache)
+- interpreted: walks the rules JSON every frame, parsing schedule times and looking up dict keys
+
+Both must raise the same incidents; the timings are per camera-frame.
+
+Usage: python -m benchmarks.bench_rules [--frames 3000] [--layouts 1x2 50x8 20x50 2x500]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from backend.ai.rules import DAYS, DEFAULT_RULES, compile_rules, parse_rules
+
+START = 1_700_000_000.0 # A Tuesday, 22:13 UTC
+
+
+def random_rules(count, rng):
+    rules = []
+    for i in range(count):
+        rule = {"name": f"r{i}", "trigger": "escalation", "threshold": round(rng.uniform(0.2, 0.9), 3),
+                "confirm": round(rng.uniform(0.5, 5.0), 1), "cooldown": round(rng.uniform(5.0, 60.0), 1),
+                "severity": [[0.8, "Critical"], [0.6, "High"], [0.0, "Medium"]][rng.randint(0, 2):]}
+        if rng.random() < 0.5:
+            start = rng.randint(0, 23)
+            rule["schedule"] = [{"days": rng.sample(DAYS, rng.randint(1, 7)), "start": f"{start:02d}:00",
+                                 "end": f"{(start + rng.randint(1, 12)) % 24:02d}:30"}]
+        rules.append(rule)
+    return parse_rules({"smoothing": 0.7, "rules": rules})
+
+
+def scores(frames, rng):
+    """Bursty target activity: mostly idle, with episodes of sustained motion."""
+    level, left = 0.0, 0
+    for _ in range(frames):
+        if left <= 0:
+            level, left = (rng.uniform(0.4, 1.0), rng.randint(30, 300)) if rng.random() < 0.3 else (0.05, rng.randint(30, 600))
+        left -= 1
+        yield min(1.0, max(0.0, level + rng.gauss(0, 0.05)))
+
+
+class Interpreted:
+    """Reference evaluator over the raw rules document, as a straightforward implementation would do it."""
+
+    def __init__(self, rules, now):
+        self.doc = rules
+        self.started = {}
+        self.last = {rule["name"]: now for rule in rules["rules"]}
+
+    def _scheduled(self, rule, timestamp):
+        if not rule["schedule"]:
+            return True
+        local = timestamp + self.doc["utc_offset"] * 3600
+        day = DAYS[(int(local // 86400) + 3) % 7]
+        previous = DAYS[(int(local // 86400) + 2) % 7]
+        of_day = int(local % 86400 // 60)
+        for window in rule["schedule"]:
+            sh, sm = window["start"].split(":")
+            eh, em = window["end"].split(":")
+            start, end = int(sh) * 60 + int(sm), int(eh) * 60 + int(em)
+            if start < end:
+                if day in window["days"] and start <= of_day < end:
+                    return True
+            elif (day in window["days"] and of_day >= start) or (previous in window["days"] and of_day < end):
+                return True
+        return False
+
+    def evaluate(self, score, timestamp):
+        fired = []
+        for rule in self.doc["rules"]:
+            if rule["trigger"] != "escalation":
+                continue
+            name = rule["name"]
+            if score <= rule["threshold"]:
+                self.started.pop(name, None)
+                continue
+            start = self.started.setdefault(name, timestamp)
+            if (timestamp - start >= rule["confirm"] and timestamp - self.last[name] > rule["cooldown"]
+                    and self._scheduled(rule, timestamp)):
+                self.last[name] = timestamp
+                del self.started[name]
+                severity = next(level for low, level in rule["severity"] if score >= low or low == 0)
+                fired.append((name, severity))
+        return fired
+
+
+def run(layout, frames, seed, compiled):
+    """Per camera-frame timings (us) and the incidents raised, for `layout` = (cameras, rules per camera)."""
+    cameras, per_camera = layout
+    rng = random.Random(seed)
+    docs = [DEFAULT_RULES if per_camera == 2 else random_rules(per_camera, rng) for _ in range(cameras)]
+    streams = [list(scores(frames, rng)) for _ in range(cameras)]
+    engines = [compile_rules(doc, START) if compiled else Interpreted(doc, START) for doc in docs]
+    smoothed = [0.0] * cameras
+    timings, incidents = [], 0
+    for f in range(frames):
+        timestamp = START + f / 15.0
+        for c in range(cameras):
+            engine, target = engines[c], streams[c][f]
+            start = time.perf_counter()
+            if compiled:
+                smoothed[c] = smoothed[c] * engine.keep + target * engine.gain
+                escalation = engine.escalation
+                fired = escalation.evaluate(smoothed[c], timestamp)
+                if fired:
+                    fired = [(escalation.names[i], escalation.severity(i, smoothed[c])) for i, _ in fired]
+            else:
+                keep = engine.doc["smoothing"]
+                smoothed[c] = smoothed[c] * keep + target * (1.0 - keep)
+                fired = engine.evaluate(smoothed[c], timestamp)
+            timings.append((time.perf_counter() - start) * 1e6)
+            incidents += len(fired) if fired else 0
+    timings.sort()
+    return timings, incidents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--layouts", nargs="+", default=["1x2", "50x8", "20x50", "2x500"],
+                        help="CAMERASxRULES; 2 rules = the defaults")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    print(f"{args.frames} frames per camera; per camera-frame timings")
+    print(f"{'cameras x rules':<16} {'evaluator':<12} {'p50 us':>8} {'p99 us':>8} {'mean us':>8} {'incidents':>10}")
+    for layout in args.layouts:
+        cameras, per_camera = (int(v) for v in layout.lower().split("x"))
+        for compiled in (True, False):
+            timings, incidents = run((cameras, per_camera), args.frames, args.seed, compiled)
+            p99 = timings[int(len(timings) * 0.99)]
+            print(f"{layout:<16} {'compiled' if compiled else 'interpreted':<12} {statistics.median(timings):8.2f} "
+                  f"{p99:8.2f} {statistics.fmean(timings):8.2f} {incidents:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Startup cost: module import time and how soon a fresh server answers.
+
+1. Runs `python -X importtime -c "import backend.main"` and lists the
+   slowest imports (cumulative, as reported by importtime).
+2. Starts uvicorn on a scratch directory (fresh database) and measures the
+   time until `/health/live` answers, until `/health/ready` reports ready,
+   and the latency of the first `/incidents/` request.
+
+Usage: python -m benchmarks.bench_startup [--runs 3] [--top 15] [--source path/to/video]
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(env):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import backend.main"],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            rows.append((int(match.group(2)), int(match.group(1)), match.group(4)))
+    return rows
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get(url, timeout=1.0):
+    """Status code, or None if nothing is listening yet."""
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return None
+
+
+def wait_for(url, want, deadline):
+    while time.perf_counter() < deadline:
+        if get(url) == want:
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def server_run(env, timeout):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as workdir:
+        env = {**env, "PYTHONPATH": ROOT + os.pathsep + env.get("PYTHONPATH", "")}
+        start = time.perf_counter()
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port),
+                                   "--log-level", "warning"], cwd=workdir, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            deadline = start + timeout
+            live = wait_for(f"{base}/health/live", 200, deadline) and time.perf_counter() - start
+            ready = wait_for(f"{base}/health/ready", 200, deadline) and time.perf_counter() - start
+            first = time.perf_counter()
+            status = get(f"{base}/incidents/?limit=10", timeout=timeout)
+            first = (time.perf_counter() - first) if status == 200 else None
+        finally:
+            server.terminate()
+            server.wait(10)
+    return live, ready, first
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--source", default="missing-camera.mp4", help="SENTINEL_DEFAULT_SOURCE for the server runs")
+    args = parser.parse_args()
+    env = {**os.environ, "SENTINEL_DEFAULT_SOURCE": args.source}
+
+    rows = import_times(env)
+    total = next((cumulative for cumulative, _, name in rows if name == "backend.main"), None)
+    print(f"import backend.main: {total / 1000 if total else float('nan'):.0f} ms (cumulative)")
+    print(f"  {'module':<48} {'cumulative ms':>14} {'self ms':>9}")
+    for cumulative, own, name in sorted(rows, reverse=True)[1:args.top + 1]:
+        print(f"  {name:<48} {cumulative / 1000:14.1f} {own / 1000:9.1f}")
+
+    results = [server_run(env, args.timeout) for _ in range(args.runs)]
+    print(f"\nFresh server, median of {args.runs} run(s):")
+    for label, index in (("/health/live answers", 0), ("/health/ready is 200", 1), ("first /incidents/ request", 2)):
+        values = [r[index] for r in results if r[index]]
+        text = f"{statistics.median(values) * 1000:8.0f} ms" if values else "   never"
+        print(f"  {label:<28} {text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""MJPEG vs the acknowledged WebSocket transport over a bandwidth-limited link.
+
+A fake client receives frames through a simulated link of fixed bandwidth
+and acknowledges each one when it has fully arrived. MJPEG pushes every
+frame at full size like /video_feed does, so on a slow link the backlog (and
+the viewer's delay) keeps growing; the WebSocket transport adapts quality,
+size and frame rate to what the link delivers.
+
+Usage: python -m benchmarks.bench_video_transport [--mbps 2 8 50] [--seconds 10] [--codec jpeg]
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from fastapi import WebSocketDisconnect
+
+from backend.ai.frame_buffer import FrameBroadcaster
+from backend.ai.replay import synthetic_frames
+from backend.api.video_transport import h264_available, stream_video
+
+
+class LinkWebSocket:
+    """Serialises sends over a link of `bandwidth` bytes/s; acks come back once a frame has arrived."""
+
+    def __init__(self, bandwidth, ack=True):
+        self.bandwidth = bandwidth
+        self.ack = ack
+        self.link_free = time.monotonic()
+        self.acks = asyncio.Queue()
+        self.delivered = 0
+        self.bytes = 0
+        self.latencies = []
+        self.params = None
+
+    async def send_text(self, text):
+        self.params = text
+
+    async def send_bytes(self, data):
+        now = time.monotonic()
+        self.link_free = max(now, self.link_free) + len(data) / self.bandwidth
+        self.bytes += len(data)
+        asyncio.get_running_loop().call_at(self.link_free, self._arrived, now)
+
+    def _arrived(self, sent_at):
+        self.delivered += 1
+        self.latencies.append(time.monotonic() - sent_at)
+        if self.ack:
+            self.acks.put_nowait("ack")
+
+    async def receive_text(self):
+        text = await self.acks.get()
+        if text is None:
+            raise WebSocketDisconnect()
+        return text
+
+    def backlog(self):
+        return max(0.0, self.link_free - time.monotonic())
+
+
+async def publish(frames, fps, width, height, stop):
+    for frame in synthetic_frames(width, height, count=10 ** 9, fps=fps):
+        if stop.is_set():
+            return
+        frames.publish(frame.copy())
+        await asyncio.sleep(1.0 / fps)
+
+
+async def run_mjpeg(bandwidth, args):
+    frames = FrameBroadcaster()
+    link = LinkWebSocket(bandwidth, ack=False)
+    stop = asyncio.Event()
+    publisher = asyncio.create_task(publish(frames, args.fps, args.width, args.height, stop))
+    start = time.perf_counter()
+
+    async def consume():
+        async for data in frames.frames(quality=80, max_fps=args.fps):
+            await link.send_bytes(data)
+    consumer = asyncio.create_task(consume())
+    await asyncio.sleep(args.seconds)
+    stop.set()
+    consumer.cancel()
+    publisher.cancel()
+    return link, time.perf_counter() - start
+
+
+async def run_ws(bandwidth, args):
+    frames = FrameBroadcaster()
+    link = LinkWebSocket(bandwidth)
+    stop = asyncio.Event()
+    engine = SimpleNamespace(frames=frames)
+    publisher = asyncio.create_task(publish(frames, args.fps, args.width, args.height, stop))
+    start = time.perf_counter()
+    streamer = asyncio.create_task(stream_video(link, lambda: engine, fps=args.fps, codec=args.codec))
+    await asyncio.sleep(args.seconds)
+    stop.set()
+    link.acks.put_nowait(None) # Disconnect
+    await streamer
+    publisher.cancel()
+    return link, time.perf_counter() - start
+
+
+def report(name, link, elapsed):
+    latencies = sorted(link.latencies) or [0.0]
+    p95 = latencies[int(len(latencies) * 0.95) - 1 if len(latencies) > 1 else 0]
+    print(f"  {name:<8} {link.delivered / elapsed:6.1f} fps delivered  {link.bytes / elapsed / 1024:8.0f} KiB/s  "
+          f"p95 delivery {p95 * 1000:7.0f} ms  backlog at end {link.backlog():6.1f} s")
+
+
+async def main_async(args):
+    if args.codec == "h264" and not h264_available():
+        print("PyAV is not installed; the WebSocket runs fall back to JPEG.")
+    for mbps in args.mbps:
+        bandwidth = mbps * 1_000_000 / 8
+        print(f"\n{mbps} Mbit/s, {args.width}x{args.height} at {args.fps:.0f} fps for {args.seconds:.0f}s:")
+        report("mjpeg", *await run_mjpeg(bandwidth, args))
+        link, elapsed = await run_ws(bandwidth, args)
+        report("ws", link, elapsed)
+        print(f"           final params {link.params}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mbps", type=float, nargs="+", default=[2.0, 8.0, 50.0])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--fps", type=float, default=15.0)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--codec", choices=["jpeg", "h264"], default="jpeg")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
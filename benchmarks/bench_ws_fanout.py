@@ -0,0 +1,96 @@
+"""Load test for ConnectionManager fan-out with a mix of fast, slow and stalled clients.
+
+Publishes stats at a fixed rate plus periodic alerts and reports how long
+`broadcast` holds the event loop, what fast clients received, and how the
+queues of slow/stalled clients behaved.
+
+Usage: python -m benchmarks.bench_ws_fanout [--fast 300 --slow 150 --stalled 50] [--seconds 5]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from backend.api.websocket_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self, delay):
+        self.delay = delay # None = never completes a send
+        self.received = 0
+        self.alerts = 0
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.delay is None:
+            await asyncio.Event().wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received += 1
+        if '"incident"' in text:
+            self.alerts += 1
+
+    async def close(self):
+        self.closed = True
+
+
+async def run(args):
+    manager = ConnectionManager(send_timeout=args.send_timeout)
+    groups = {
+        "fast": [FakeWebSocket(0) for _ in range(args.fast)],
+        "slow": [FakeWebSocket(args.slow_delay) for _ in range(args.slow)],
+        "stalled": [FakeWebSocket(None) for _ in range(args.stalled)],
+    }
+    for sockets in groups.values():
+        for ws in sockets:
+            await manager.connect(ws)
+
+    stats = {"type": "stats", "cameras": [{"cam": str(i), "score": 0.1, "owner_id": "admin"} for i in range(args.cameras)]}
+    broadcast_ms = []
+    alerts_sent = 0
+    ticks = int(args.seconds * args.rate)
+    peak_depth = 0
+    for tick in range(ticks):
+        start = time.perf_counter()
+        await manager.broadcast(stats)
+        if tick % args.rate == 0:
+            await manager.broadcast({"msg_type": "incident", "camera_id": "1", "owner_id": "admin"})
+            alerts_sent += 1
+        broadcast_ms.append((time.perf_counter() - start) * 1000)
+        peak_depth = max(peak_depth, manager.stats()["max_queue_depth"])
+        await asyncio.sleep(1.0 / args.rate)
+    await asyncio.sleep(args.send_timeout + 0.5) # Let writers drain / time out
+
+    print(f"{sum(len(g) for g in groups.values())} clients, {ticks} stats ticks at {args.rate} Hz, {alerts_sent} alerts")
+    print(f"  broadcast p50 {statistics.median(broadcast_ms):.3f} ms  max {max(broadcast_ms):.3f} ms  (peak queue depth {peak_depth})")
+    for name, sockets in groups.items():
+        if not sockets:
+            continue
+        received = statistics.mean(ws.received for ws in sockets)
+        alerts = statistics.mean(ws.alerts for ws in sockets)
+        closed = sum(ws.closed for ws in sockets)
+        print(f"  {name:<8} avg received {received:7.1f}  avg alerts {alerts:5.1f}/{alerts_sent}  closed {closed}/{len(sockets)}")
+    print(f"  manager  {manager.stats()}")
+
+    for ws in list(manager.active_connections):
+        manager.disconnect(ws)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fast", type=int, default=300)
+    parser.add_argument("--slow", type=int, default=150)
+    parser.add_argument("--stalled", type=int, default=50)
+    parser.add_argument("--slow-delay", type=float, default=0.5)
+    parser.add_argument("--send-timeout", type=float, default=1.0)
+    parser.add_argument("--cameras", type=int, default=24)
+    parser.add_argument("--rate", type=int, default=5)
+    parser.add_argument("--seconds", type=float, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
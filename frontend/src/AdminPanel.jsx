@@ -1,11 +1,13 @@
 import React, { useState, useEffect } from 'react';
-import { Camera, Shield, Users, Activity, ExternalLink, RefreshCw, Trash2, Edit, Plus, AlertTriangle, CheckCircle, Clock } from 'lucide-react';
+import { Camera, Shield, Users, Activity, ExternalLink, RefreshCw, Trash2, Edit, Plus, AlertTriangle, CheckCircle, Clock, Loader2 } from 'lucide-react';
 import axios from 'axios';
-import { getIncidents, setUserContext } from './services/api';
+import { allTimeSince, getIncidents, getIncidentStats, setUserContext } from './services/api';
 
 const AdminPanel = () => {
     const [cameras, setCameras] = useState([]);
     const [incidents, setIncidents] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [stats, setStats] = useState({ totalIncidents: 0, systemLoad: '24%', storage: '45%' });
 
     useEffect(() => {
@@ -20,6 +22,7 @@ const AdminPanel = () => {
                 const data = JSON.parse(event.data);
                 if (data.msg_type === 'incident') {
                     setIncidents(prev => [data, ...prev]);
+                    setStats(prev => ({ ...prev, totalIncidents: prev.totalIncidents + 1 }));
                 } else if (data.msg_type === 'incident_update') {
                     setIncidents(prev => prev.map(inc =>
                         inc.id === data.id ? { ...inc, status: data.status } : inc
@@ -33,14 +36,29 @@ const AdminPanel = () => {
 
     const fetchData = async () => {
         try {
-            const res = await getIncidents();
+            const [res, statsRes] = await Promise.all([getIncidents(), getIncidentStats('day', allTimeSince())]);
             setIncidents(res.data || []);
+            setNextCursor(res.nextCursor);
+            setStats(prev => ({ ...prev, totalIncidents: statsRes.data.total }));
             // axios.get('/api/cameras').then(res => setCameras(res.data));
         } catch (err) {
             console.error("Admin Fetch Error", err);
         }
     };
 
+    const loadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const response = await getIncidents({ cursor: nextCursor });
+            setIncidents(prev => [...prev, ...(response.data || [])]);
+            setNextCursor(response.nextCursor);
+        } catch (error) {
+            console.warn("Could not load older incidents", error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     return (
         <div className="min-h-screen p-8 bg-[#0a0a0c] text-slate-200 font-inter">
             <div className="max-w-7xl mx-auto space-y-8">
@@ -55,7 +73,7 @@ const AdminPanel = () => {
                 </header>
 
                 <div className="grid grid-cols-1 md:grid-cols-3 gap-6">
-                    <AdminStatCard title="Total Incidents" value={incidents.length} trend="+12% from last week" />
+                    <AdminStatCard title="Total Incidents" value={stats.totalIncidents} trend="+12% from last week" />
                     <AdminStatCard title="System Load" value="42%" trend="Stable" />
                     <AdminStatCard title="Active Streams" value="12/16" trend="4 offline" />
                 </div>
@@ -108,6 +126,15 @@ const AdminPanel = () => {
                                 )}
                             </tbody>
                         </table>
+                        {nextCursor && (
+                            <button
+                                onClick={loadMore}
+                                disabled={loadingMore}
+                                className="w-full py-4 text-xs font-black uppercase tracking-widest text-slate-500 hover:text-white hover:bg-white/5 transition flex items-center justify-center gap-2"
+                            >
+                                {loadingMore && <Loader2 className="animate-spin" size={14} />} Load older incidents
+                            </button>
+                        )}
                     </div>
                 </section>
 
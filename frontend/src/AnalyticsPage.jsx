@@ -1,33 +1,40 @@
 import React, { useState, useEffect } from 'react';
 import { BarChart3, TrendingUp, Users, Map as MapIcon, Calendar, Loader2, Clock, ShieldAlert } from 'lucide-react';
-import { getIncidents } from './services/api';
+import { allTimeSince, getIncidents, getIncidentStats } from './services/api';
 
 const AnalyticsPage = () => {
-    const [incidents, setIncidents] = useState([]);
+    const [totals, setTotals] = useState({ total: 0, by_type: {} });
+    const [series, setSeries] = useState([]);
+    const [latest, setLatest] = useState(null);
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
-        getIncidents().then(res => {
-            setIncidents(res.data);
+        Promise.all([
+            getIncidentStats('day', allTimeSince()),
+            getIncidentStats('hour', new Date(Date.now() - 11 * 60 * 60 * 1000)),
+            getIncidents({ limit: 1 })
+        ]).then(([totalRes, hourRes, latestRes]) => {
+            setTotals(totalRes.data);
+            setSeries(hourRes.data.series);
+            setLatest(latestRes.data[0] || null);
             setLoading(false);
         }).catch(() => setLoading(false));
     }, []);
 
-    // 1. Calculate Real Violation Types
-    const typeCounts = incidents.reduce((acc, curr) => {
-        acc[curr.type] = (acc[curr.type] || 0) + 1;
-        return acc;
-    }, {});
+    // 1. Violation Types (all-time counts from the rollups)
+    const typeCounts = totals.by_type;
 
-    const total = incidents.length || 1;
+    const total = totals.total || 1;
 
-    // 2. Trend Data (Mock logic replaced with Timestamp aggregation)
-    // Group incidents by hour for the last 12 hours
+    // 2. Trend Data: hourly buckets for the last 12 hours
     const trendData = new Array(12).fill(0);
-    incidents.forEach(inc => {
-        const hourDiff = Math.floor((new Date() - new Date(inc.timestamp)) / (1000 * 60 * 60));
+    const currentHour = new Date();
+    currentHour.setUTCMinutes(0, 0, 0);
+    series.forEach(point => {
+        // Bucket starts are naive UTC
+        const hourDiff = Math.round((currentHour - new Date(`${point.start}Z`)) / (1000 * 60 * 60));
         if (hourDiff < 12 && hourDiff >= 0) {
-            trendData[11 - hourDiff]++; // 11 is current hour, 0 is 11 hours ago
+            trendData[11 - hourDiff] += point.count; // 11 is current hour, 0 is 11 hours ago
         }
     });
 
@@ -55,7 +62,7 @@ const AnalyticsPage = () => {
                             <h3 className="font-bold flex items-center gap-2"><TrendingUp size={18} className="text-primary" /> Incident Frequency (Last 12h)</h3>
                         </div>
                         <div className="flex-1 flex items-end gap-4 px-4 overflow-hidden border-b border-white/5 pb-2">
-                            {incidents.length === 0 ? (
+                            {series.length === 0 ? (
                                 <div className="w-full text-center text-slate-500 text-sm flex flex-col items-center justify-center h-full">
                                     <BarChart3 className="mb-2 opacity-50" />
                                     No Data Available
@@ -102,13 +109,13 @@ const AnalyticsPage = () => {
                     {/* Dynamic Peak Hours */}
                     <div className="glass rounded-3xl p-6 space-y-6">
                         <h3 className="font-bold text-sm">Peak Activity Windows</h3>
-                        {incidents.length > 0 ? (
+                        {latest ? (
                             <div className="flex justify-between items-center p-3 bg-white/5 rounded-xl border border-white/5">
                                 <div className="flex items-center gap-3">
                                     <Clock size={16} className="text-primary" />
                                     <span className="text-sm">Latest Detection</span>
                                 </div>
-                                <span className="text-xs font-bold text-slate-300">{new Date(incidents[0].timestamp).toLocaleTimeString()}</span>
+                                <span className="text-xs font-bold text-slate-300">{new Date(latest.timestamp).toLocaleTimeString()}</span>
                             </div>
                         ) : (
                             <p className="text-xs text-slate-500">No activity recorded to analyze peak usage.</p>
@@ -118,13 +125,13 @@ const AnalyticsPage = () => {
                     <div className="glass rounded-3xl p-6 bg-gradient-to-br from-primary/10 to-transparent">
                         <ShieldAlert size={32} className="text-primary mb-4" />
                         <h3 className="font-bold mb-2">System Health</h3>
-                        {incidents.length === 0 ? (
+                        {totals.total === 0 ? (
                             <p className="text-xs text-slate-400 leading-relaxed">
                                 System is active and monitoring. No anomalies detected.
                             </p>
                         ) : (
                             <p className="text-xs text-slate-400 leading-relaxed">
-                                {incidents.length} anomalies have been flagged for review.
+                                {totals.total} anomalies have been flagged for review.
                             </p>
                         )}
                     </div>
@@ -4,12 +4,12 @@ import {
     TrendingUp, Clock, ShieldAlert, Loader2
 } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
-import { getCameras, getIncidents } from './services/api';
+import { allTimeSince, getCameras, getIncidents, getIncidentStats, startOfToday } from './services/api';
 
 const SurveillanceDashboard = () => {
     const [incidents, setIncidents] = useState([]);
     const [cameras, setCameras] = useState([]);
-    const [stats, setStats] = useState({ activeCameras: 0, alertsToday: 0, health: '100%' });
+    const [stats, setStats] = useState({ activeCameras: 0, alertsToday: 0, totalAlerts: 0, health: '100%' });
     const [loading, setLoading] = useState(true);
     const [motionScore, setMotionScore] = useState(0);
 
@@ -26,20 +26,21 @@ const SurveillanceDashboard = () => {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const [camsRes, incsRes] = await Promise.all([getCameras(), getIncidents()]);
+                const [camsRes, incsRes, totalRes, todayRes] = await Promise.all([
+                    getCameras(),
+                    getIncidents({ limit: 10 }),
+                    getIncidentStats('day', allTimeSince()),
+                    getIncidentStats('hour', startOfToday())
+                ]);
                 const realCams = camsRes.data || [];
-                const allIncs = incsRes.data || [];
 
                 setCameras(realCams);
-                setIncidents(allIncs.slice(0, 10));
+                setIncidents(incsRes.data || []);
 
                 setStats({
                     activeCameras: realCams.length,
-                    alertsToday: allIncs.filter(i => {
-                        try {
-                            return new Date(i.timestamp).toDateString() === new Date().toDateString();
-                        } catch (e) { return false; }
-                    }).length,
+                    alertsToday: todayRes.data.total,
+                    totalAlerts: totalRes.data.total,
                     health: realCams.length > 0 ? '100%' : 'Offline'
                 });
             } catch (error) {
@@ -65,6 +66,7 @@ const SurveillanceDashboard = () => {
                     setStats(prev => ({
                         ...prev,
                         alertsToday: prev.alertsToday + 1,
+                        totalAlerts: prev.totalAlerts + 1,
                         health: 'Active'
                     }));
                 }
@@ -96,7 +98,7 @@ const SurveillanceDashboard = () => {
             <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-6">
                 <StatBox icon={<Camera size={20} />} label="Video Input" value={cameras.length > 0 ? "Connected" : "Standby"} color="text-blue-400" />
                 <StatBox icon={<Activity size={20} />} label="AI Core" value={cameras.length > 0 ? "Active" : "Standby"} color="text-green-400" />
-                <StatBox icon={<AlertTriangle size={20} />} label="Total Alerts" value={incidents.length} color="text-red-400" />
+                <StatBox icon={<AlertTriangle size={20} />} label="Total Alerts" value={stats.totalAlerts} color="text-red-400" />
                 <StatBox icon={<Clock size={20} />} label="Last Event" value={safeTime(incidents[0]?.timestamp)} color="text-purple-400" />
             </div>
 
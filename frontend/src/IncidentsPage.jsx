@@ -10,6 +10,8 @@ const IncidentsPage = ({ userRole }) => {
     const [incidents, setIncidents] = useState([]);
     const [loading, setLoading] = useState(true);
     const [selectedIncident, setSelectedIncident] = useState(null);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     // Safe Date Formatter
     const formatDate = (dateStr) => {
@@ -28,6 +30,7 @@ const IncidentsPage = ({ userRole }) => {
             try {
                 const response = await getIncidents();
                 setIncidents(response.data || []);
+                setNextCursor(response.nextCursor);
             } catch (error) {
                 console.warn("Backend Unresponsive - Defaulting to Empty State");
                 setIncidents([]);
@@ -66,6 +69,19 @@ const IncidentsPage = ({ userRole }) => {
         return () => ws.close();
     }, []);
 
+    const loadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const response = await getIncidents({ cursor: nextCursor });
+            setIncidents(prev => [...prev, ...(response.data || [])]);
+            setNextCursor(response.nextCursor);
+        } catch (error) {
+            console.warn("Could not load older incidents", error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const handleHide = (id) => setIncidents(prev => prev.map(inc => inc.id === id ? { ...inc, status: 'Hidden' } : inc));
     const handleRestore = (id) => setIncidents(prev => prev.map(inc => inc.id === id ? { ...inc, status: 'Active' } : inc));
 
@@ -186,6 +202,15 @@ const IncidentsPage = ({ userRole }) => {
                         )}
                     </tbody>
                 </table>
+                {nextCursor && (
+                    <button
+                        onClick={loadMore}
+                        disabled={loadingMore}
+                        className="w-full py-4 text-xs font-black uppercase tracking-widest text-slate-500 hover:text-white hover:bg-white/5 transition flex items-center justify-center gap-2"
+                    >
+                        {loadingMore && <Loader2 className="animate-spin" size={14} />} Load older incidents
+                    </button>
+                )}
             </div>
 
             {/* MODAL LAYER */}
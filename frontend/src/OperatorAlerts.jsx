@@ -5,6 +5,8 @@ import { getIncidents, setUserContext, updateIncidentStatus } from './services/a
 const OperatorAlerts = ({ userId }) => {
     const [incidents, setIncidents] = useState([]);
     const [loading, setLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         setUserContext(userId);
@@ -33,6 +35,7 @@ const OperatorAlerts = ({ userId }) => {
         try {
             const res = await getIncidents();
             setIncidents(res.data || []);
+            setNextCursor(res.nextCursor);
         } catch (err) {
             console.error("Alerts Fetch Error", err);
         } finally {
@@ -40,6 +43,19 @@ const OperatorAlerts = ({ userId }) => {
         }
     };
 
+    const loadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const response = await getIncidents({ cursor: nextCursor });
+            setIncidents(prev => [...prev, ...(response.data || [])]);
+            setNextCursor(response.nextCursor);
+        } catch (error) {
+            console.warn("Could not load older incidents", error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const handleStatusChange = async (id, status) => {
         try {
             await updateIncidentStatus(id, status);
@@ -110,6 +126,15 @@ const OperatorAlerts = ({ userId }) => {
                             </div>
                         </div>
                     ))}
+                    {nextCursor && (
+                        <button
+                            onClick={loadMore}
+                            disabled={loadingMore}
+                            className="w-full py-4 text-xs font-black uppercase tracking-widest text-slate-500 hover:text-white hover:bg-white/5 transition flex items-center justify-center gap-2"
+                        >
+                            {loadingMore && <Loader2 className="animate-spin" size={14} />} Load older incidents
+                        </button>
+                    )}
                 </div>
             )}
         </div>
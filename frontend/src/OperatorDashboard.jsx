@@ -1,19 +1,25 @@
 import React, { useState, useEffect } from 'react';
 import { Camera, ShieldAlert, Activity, Clock, Loader2, Video, List } from 'lucide-react';
-import { getCameras, getIncidents, setUserContext } from './services/api';
+import { getCameras, getIncidents, getIncidentStats, setUserContext, startOfToday } from './services/api';
 
 const OperatorDashboard = ({ userId }) => {
     const [incidents, setIncidents] = useState([]);
     const [cameras, setCameras] = useState([]);
+    const [alertsToday, setAlertsToday] = useState(0);
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
         setUserContext(userId);
         const fetchData = async () => {
             try {
-                const [camsRes, incsRes] = await Promise.all([getCameras(), getIncidents()]);
+                const [camsRes, incsRes, todayRes] = await Promise.all([
+                    getCameras(),
+                    getIncidents({ limit: 3 }),
+                    getIncidentStats('hour', startOfToday())
+                ]);
                 setCameras(camsRes.data || []);
                 setIncidents(incsRes.data || []);
+                setAlertsToday(todayRes.data.total);
             } catch (err) {
                 console.error("Dashboard Load Error", err);
             } finally {
@@ -23,10 +29,6 @@ const OperatorDashboard = ({ userId }) => {
         fetchData();
     }, [userId]);
 
-    const activeIncidentsToday = incidents.filter(i =>
-        new Date(i.timestamp).toDateString() === new Date().toDateString()
-    ).length;
-
     if (loading) return (
         <div className="flex flex-col items-center justify-center h-[60vh] text-slate-500">
             <Loader2 className="animate-spin text-primary mb-4" size={40} />
@@ -66,7 +68,7 @@ const OperatorDashboard = ({ userId }) => {
                 <OperatorStatBox
                     icon={<ShieldAlert size={20} />}
                     label="Alerts Today"
-                    value={activeIncidentsToday}
+                    value={alertsToday}
                     sub="Target Detections"
                     color="text-red-400"
                 />
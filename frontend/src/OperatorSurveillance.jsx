@@ -56,7 +56,7 @@ const OperatorSurveillance = ({ userId }) => {
                 // Sync Context to Backend AI Engine
                 await setAIContext({
                     owner_id: userId,
-                    camera_id: mode === 'webcam' ? 'LOCAL-WEBCAM' : (selectedCamera?.name || 'PRIVATE_NODE')
+                    camera_id: mode === 'webcam' ? 'WEB-01' : String(selectedCamera?.id ?? 'WEB-01')
                 });
 
                 setTimeout(() => {
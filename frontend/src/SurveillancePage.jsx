@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { Camera, Activity, Loader2, Building, EyeOff, ShieldCheck, AlertTriangle } from 'lucide-react';
 import { motion } from 'framer-motion';
-import { getCameras, getIncidents } from './services/api';
+import { allTimeSince, getCameras, getIncidentStats } from './services/api';
 
 // NO MOCK DATA - STRICT REAL-TIME ONLY
 const SurveillancePage = ({ userRole }) => {
@@ -23,8 +23,8 @@ const SurveillancePage = ({ userRole }) => {
             const timeoutPromise = new Promise((_, reject) => setTimeout(() => reject(new Error('Timeout')), 3000));
             try {
                 // Fetch Cameras & Incidents for Stats
-                const [camRes, incRes] = await Promise.race([
-                    Promise.all([getCameras(), getIncidents()]),
+                const [camRes, statsRes] = await Promise.race([
+                    Promise.all([getCameras(), getIncidentStats('day', allTimeSince())]),
                     timeoutPromise
                 ]);
 
@@ -53,7 +53,7 @@ const SurveillancePage = ({ userRole }) => {
                 }
 
                 // Initial Event Count
-                setDetectionStats(prev => ({ ...prev, events: incRes.data.length }));
+                setDetectionStats(prev => ({ ...prev, events: statsRes.data.total }));
 
             } catch (error) {
                 console.warn("System Unresponsive or Empty");
@@ -9,7 +9,26 @@ export const setUserContext = (userId) => {
     api.defaults.headers.common['X-User-ID'] = userId;
 };
 
-export const getIncidents = () => api.get('/incidents');
+// Columns the list views render; the rest (ai_summary, evidence paths...) stay on the server
+const LIST_FIELDS = 'camera_id,type,severity,description,confidence,owner_id';
+const PAGE_SIZE = 50;
+
+// One page of incidents, newest first. Pass `nextCursor` back as `cursor` to load the next (older) page.
+export const getIncidents = async (params = {}) => {
+    const response = await api.get('/incidents/', { params: { limit: PAGE_SIZE, fields: LIST_FIELDS, ...params } });
+    return { ...response, nextCursor: response.headers['x-next-cursor'] || null };
+};
+// Incident counts per `bucket` (minute | hour | day) from `since`, by camera, severity and type.
+// Served from the rollup table, so counters and charts never need the incident list.
+export const getIncidentStats = (bucket, since, params = {}) =>
+    api.get('/incidents/stats', { params: { bucket, since: since?.toISOString(), ...params } });
+// Start of the window for all-time day totals (the server caps a request at STATS_MAX_BUCKETS buckets)
+export const allTimeSince = () => new Date(Date.now() - 1460 * 24 * 60 * 60 * 1000);
+export const startOfToday = () => {
+    const today = new Date();
+    today.setHours(0, 0, 0, 0);
+    return today;
+};
 export const getCameras = () => api.get('/cameras');
 export const addCamera = (camData) => api.post('/cameras/', null, { params: camData });
 export const deleteCamera = (id) => api.delete(`/cameras/${id}`);
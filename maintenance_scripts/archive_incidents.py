@@ -0,0 +1,33 @@
+"""Runs one incident retention pass now instead of waiting for the server's schedule.
+
+Moves incidents older than --days (default SENTINEL_INCIDENT_RETENTION_DAYS)
+into the monthly archives under SENTINEL_ARCHIVE_DIR and vacuums the freed
+pages. Databases created before retention existed need
+--enable-incremental-vacuum once (with the server stopped: it rewrites the
+whole file) before space can be reclaimed. Run from the project root.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.database import init_db
+from backend.services.retention import IncidentArchiver, enable_incremental_vacuum
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--days", type=int, default=None, help="Retention age in days")
+parser.add_argument("--enable-incremental-vacuum", action="store_true", help="One-off VACUUM that switches auto_vacuum to INCREMENTAL")
+args = parser.parse_args()
+
+init_db()
+if args.enable_incremental_vacuum:
+    print("Switched to incremental auto-vacuum" if enable_incremental_vacuum() else "Incremental auto-vacuum already enabled")
+
+archiver = IncidentArchiver(retention_days=args.days)
+result = archiver.run_once()
+if result is None:
+    print("Retention is disabled (0 days); nothing archived")
+else:
+    print(f"Archived {result['archived']} incidents older than {result['cutoff']}, "
+          f"freed {result['freed_pages']} pages in {result['seconds']:.1f}s")
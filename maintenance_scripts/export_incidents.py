@@ -0,0 +1,46 @@
+"""Exports incidents (archived ones included) as NDJSON or CSV, oldest first, with constant memory.
+
+Examples, from the project root:
+    python maintenance_scripts/export_incidents.py --format csv --since 2025-01-01 -o incidents.csv
+    python maintenance_scripts/export_incidents.py --owner operator_001 --camera 3 | gzip > cam3.ndjson.gz
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.database import SessionLocal
+from backend.services.export import EXPORT_FIELDS, export_incidents
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+parser.add_argument("--owner", default="admin", help="Only this owner's incidents (admin = everyone's)")
+parser.add_argument("--camera", default=None)
+parser.add_argument("--since", type=datetime.fromisoformat, default=None, help="ISO date/time, UTC")
+parser.add_argument("--until", type=datetime.fromisoformat, default=None, help="ISO date/time, UTC (exclusive)")
+parser.add_argument("--fields", default=None, help="Comma-separated columns (default: all)")
+parser.add_argument("-o", "--output", default=None, help="File to write (default: stdout)")
+args = parser.parse_args()
+
+fields = [f.strip() for f in args.fields.split(",")] if args.fields else EXPORT_FIELDS
+unknown = [f for f in fields if f not in EXPORT_FIELDS]
+if unknown:
+    parser.error(f"Unknown fields: {', '.join(unknown)}")
+
+out = open(args.output, "wb") if args.output else sys.stdout.buffer
+db = SessionLocal()
+start = time.perf_counter()
+written = 0
+try:
+    for chunk in export_incidents(db, args.format, fields, owner_id=args.owner, camera_id=args.camera,
+                                  since=args.since, until=args.until):
+        out.write(chunk)
+        written += len(chunk)
+finally:
+    db.close()
+    if args.output:
+        out.close()
+print(f"Exported {written / 2**20:.1f} MB in {time.perf_counter() - start:.1f}s", file=sys.stderr)
@@ -15,5 +15,43 @@ try:
 except Exception as e:
     print(f"Incidents: {e}")
 
+try:
+    cursor.execute("ALTER TABLE incidents ADD COLUMN clip_path TEXT")
+    print("Added clip_path to incidents")
+except Exception as e:
+    print(f"Incidents: {e}")
+
+try:
+    cursor.execute("ALTER TABLE cameras ADD COLUMN zones TEXT")
+    print("Added zones to cameras")
+except Exception as e:
+    print(f"Cameras: {e}")
+
+try:
+    cursor.execute("ALTER TABLE cameras ADD COLUMN rules TEXT")
+    print("Added rules to cameras")
+except Exception as e:
+    print(f"Cameras: {e}")
+
+for column, ddl in (("duration", "REAL DEFAULT 0.0"), ("event_count", "INTEGER DEFAULT 1"), ("peak", "REAL")):
+    try:
+        cursor.execute(f"ALTER TABLE incidents ADD COLUMN {column} {ddl}")
+        print(f"Added {column} to incidents")
+    except Exception as e:
+        print(f"Incidents: {e}")
+
+try:
+    cursor.execute("ALTER TABLE cameras ADD COLUMN analysis_fps REAL")
+    print("Added analysis_fps to cameras")
+except Exception as e:
+    print(f"Cameras: {e}")
+
+try:
+    # Rollups are kept per hour and day; minute stats are grouped from incidents
+    cursor.execute("DELETE FROM incident_rollups WHERE bucket = 'minute'")
+    print(f"Dropped {cursor.rowcount} minute rollup rows")
+except Exception as e:
+    print(f"Rollups: {e}")
+
 conn.commit()
 conn.close()
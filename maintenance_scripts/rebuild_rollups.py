@@ -0,0 +1,26 @@
+"""Recomputes the incident_rollups table (behind /incidents/stats) from the incidents table.
+
+Run once after upgrading an existing database, or whenever incidents were
+inserted or deleted outside the incident writer. Buckets older than the
+retention cutoff are kept, since their incidents now live in the archive.
+Run from the project root.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.models.database import SessionLocal, init_db
+from backend.services.retention import incident_archive
+from backend.services.rollups import rebuild_rollups
+
+init_db() # Creates the rollup table on databases that predate it
+
+db = SessionLocal()
+try:
+    start = time.perf_counter()
+    rows = rebuild_rollups(db, since=incident_archive.archived_before)
+    print(f"Rebuilt {rows} rollup rows in {time.perf_counter() - start:.1f}s")
+finally:
+    db.close()
@@ -0,0 +1,15 @@
+from backend.ai.camera_pool import LOCAL_CAMERA_ID, CameraPool
+
+
+class Camera:
+    def __init__(self, id, source_url):
+        self.id, self.source_url, self.owner_id, self.zones = id, source_url, "admin", None
+
+
+def test_first_real_camera_replaces_the_webcam_fallback():
+    pool = CameraPool()
+    pool.attach(LOCAL_CAMERA_ID, 0) # Not running: only records the source
+    pool.attach_camera(Camera(7, ""))
+    assert LOCAL_CAMERA_ID in pool.sources # A camera without a source attaches nothing
+    pool.attach_camera(Camera(8, "rtsp://cam/8"))
+    assert list(pool.sources) == ["8"]
@@ -0,0 +1,33 @@
+import os
+import time
+
+from backend.ai.recorder import ClipStore
+
+
+def stored(store):
+    return sorted(name for _, _, names in os.walk(store.directory) for name in names)
+
+
+def test_writes_within_budget_do_not_rescan(tmp_path, monkeypatch):
+    store = ClipStore(directory=str(tmp_path), max_bytes=10_000, sweep_interval=3600, workers=1)
+    store.write_snapshot("1", 1_700_000_000.0, b"x" * 1000)
+    scans = []
+    monkeypatch.setattr(os, "walk", lambda *args: scans.append(args) or iter(()))
+    for i in range(1, 5):
+        store.write_snapshot("1", 1_700_000_000.0 + i, b"x" * 1000)
+    assert scans == []
+    assert store._total == 5000
+    store.shutdown()
+
+
+def test_going_over_budget_deletes_the_oldest(tmp_path):
+    store = ClipStore(directory=str(tmp_path), max_bytes=3500, sweep_interval=3600, workers=1)
+    now = time.time()
+    for i in range(5):
+        path = store.write_snapshot("1", 1_700_000_000.0 + i, b"x" * 1000)
+        os.utime(path, (now - 10 + i, now - 10 + i))
+    assert stored(store) == ["221322_000.jpg", "221323_000.jpg", "221324_000.jpg"]
+    assert store._total == 3000
+    store.discard(path)
+    assert store._total == 2000
+    store.shutdown()
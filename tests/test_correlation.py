@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from backend.services.correlation import IncidentCorrelator
+
+START = datetime(2025, 1, 1, 12, 0, 0)
+
+
+def event(camera_id, owner_id, seconds, severity="High"):
+    return {"camera_id": camera_id, "owner_id": owner_id, "type": "Rapid Escalation", "severity": severity,
+            "escalation_score": 0.7, "timestamp": (START + timedelta(seconds=seconds)).isoformat()}
+
+
+def make_correlator():
+    saved = []
+
+    def persist(meta):
+        saved.append(meta)
+        return len(saved)
+
+    correlator = IncidentCorrelator(persist=persist, window=60, max_duration=1800, flush_interval=30,
+                                    by_location=True, clock=lambda: 0.0)
+    return correlator, saved
+
+
+def test_merges_cameras_of_one_owner_sharing_a_location():
+    correlator, saved = make_correlator()
+    correlator.set_group("1", "Entrance")
+    correlator.set_group("2", "entrance ")
+    assert correlator.submit(event("1", "alice", 0)) == 1
+    assert correlator.submit(event("2", "alice", 10)) is None
+    assert len(saved) == 1
+    assert correlator.open[("alice", "location:entrance", "Rapid Escalation")].count == 2
+
+
+def test_owners_sharing_a_location_name_are_never_merged():
+    correlator, saved = make_correlator()
+    correlator.set_group("1", "Entrance") # alice's camera
+    correlator.set_group("2", "Entrance") # bob's camera
+    assert correlator.submit(event("1", "alice", 0)) == 1
+    assert correlator.submit(event("2", "bob", 5)) == 2
+    assert correlator.submit(event("2", "bob", 15)) is None
+    assert [meta["owner_id"] for meta in saved] == ["alice", "bob"]
+    alice = correlator.open[("alice", "location:entrance", "Rapid Escalation")]
+    bob = correlator.open[("bob", "location:entrance", "Rapid Escalation")]
+    assert (alice.count, bob.count) == (1, 2)
+    assert alice.cameras == {"1"} and bob.cameras == {"2"}
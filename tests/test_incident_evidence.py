@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.api.routes import incidents
+from backend.models.database import Base, Incident
+
+
+def client_with_incident(tmp_path, owner_id):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    snapshot = tmp_path / "snapshot.jpg"
+    snapshot.write_bytes(b"jpeg")
+    with Session() as db:
+        db.add(Incident(id=1, timestamp=datetime(2025, 1, 1), camera_id="1", owner_id=owner_id, type="Loitering",
+                        severity="Medium", snapshot_path=str(snapshot), clip_path=str(snapshot)))
+        db.commit()
+
+    def get_db():
+        with Session() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(incidents.router)
+    app.dependency_overrides[incidents.get_db] = get_db
+    return TestClient(app)
+
+
+def test_evidence_is_only_served_to_its_owner(tmp_path):
+    client = client_with_incident(tmp_path, "alice")
+    for kind in ("snapshot", "clip"):
+        assert client.get(f"/incidents/1/{kind}", headers={"X-User-ID": "alice"}).content == b"jpeg"
+        assert client.get(f"/incidents/1/{kind}", headers={"X-User-ID": "admin"}).status_code == 200
+        assert client.get(f"/incidents/1/{kind}", headers={"X-User-ID": "bob"}).status_code == 404
+
+
+def test_list_window_is_compared_in_utc(tmp_path):
+    client = client_with_incident(tmp_path, "alice") # Stored at 2025-01-01 00:00 UTC
+    listed = lambda **params: [row["id"] for row in client.get("/incidents/", params=params).json()]
+    assert listed(since="2025-01-01T01:00:00+02:00") == [1] # 2024-12-31 23:00 UTC
+    assert listed(until="2025-01-01T01:00:00+02:00") == []
+    assert listed(since="2025-01-01T01:00:00+00:00") == []
@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import sessionmaker
+
+from backend.models.database import Base, Incident
+from backend.services.rollups import apply_rollups, query_stats, resolve_window, rollup_counts
+
+
+def test_hour_and_day_stats_come_from_rollups_and_minute_from_incidents():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    incidents = [Incident(timestamp=datetime(2025, 1, 1, 10, minute), camera_id="1", owner_id="alice",
+                          severity="High", type="Loitering") for minute in (5, 6, 50)]
+    db.add_all(incidents)
+    apply_rollups(db, rollup_counts(incidents))
+    db.commit()
+    now = datetime(2025, 1, 1, 11)
+
+    minute = query_stats(db, "alice", "minute", *resolve_window("minute", now=now))
+    assert [(point["start"], point["count"]) for point in minute["series"]] == [
+        ("2025-01-01T10:05:00", 1), ("2025-01-01T10:06:00", 1), ("2025-01-01T10:50:00", 1)]
+
+    db.execute(delete(Incident)) # As if archived: hour and day stats never read the table
+    db.commit()
+    hour = query_stats(db, "alice", "hour", *resolve_window("hour", now=now))
+    assert hour["series"] == [{"start": "2025-01-01T10:00:00", "count": 3, "by_camera": {"1": 3},
+                               "by_severity": {"High": 3}, "by_type": {"Loitering": 3}}]
+    assert query_stats(db, "alice", "day", *resolve_window("day", now=now))["total"] == 3
+    assert query_stats(db, "bob", "day", *resolve_window("day", now=now))["total"] == 0
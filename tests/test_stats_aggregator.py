@@ -0,0 +1,56 @@
+import asyncio
+import json
+
+from backend.api.stats_aggregator import StatsAggregator
+from backend.api.websocket_manager import ClientConnection, ConnectionManager
+
+
+class FakeWebSocket:
+    pass
+
+
+def delivered_cameras(subscriptions):
+    """Camera ids per stats message each client would be sent, keyed like `subscriptions`."""
+    async def run():
+        manager = ConnectionManager()
+        clients = {}
+        for name, topics in subscriptions.items():
+            client = ClientConnection(FakeWebSocket(), topics)
+            manager.connections[client.websocket] = client
+            clients[name] = client
+        aggregator = StatsAggregator(manager)
+        aggregator.update({"cam": "1", "owner_id": "alice", "score": 0.4})
+        aggregator.update({"cam": "2", "owner_id": "bob", "score": 0.9})
+        for message, subscribed in aggregator.snapshot():
+            await manager.broadcast(message, subscribed=subscribed)
+        return {name: [sorted(s["cam"] for s in json.loads(text)["cameras"]) for text in client.droppable]
+                for name, client in clients.items()}
+    return asyncio.run(run())
+
+
+def test_subscribed_clients_only_get_their_owners_cameras():
+    sent = delivered_cameras({"alice": ["owner:alice"], "camera": ["camera:2"], "everything": None})
+    assert sent["alice"] == [["1"]]
+    assert sent["camera"] == [["2"]]
+    assert sent["everything"] == [["1", "2"]]
+
+
+def test_a_failed_tick_does_not_stop_publishing():
+    async def run():
+        sent = []
+
+        class Manager:
+            async def broadcast(self, message, subscribed=None):
+                if message["score"] is None:
+                    raise TypeError("not serialisable")
+                sent.append(message["score"])
+
+        aggregator = StatsAggregator(Manager(), rate_hz=100)
+        aggregator.start()
+        aggregator.update({"cam": "1", "owner_id": "alice", "score": None})
+        await asyncio.sleep(0.05)
+        aggregator.update({"cam": "1", "owner_id": "alice", "score": 0.5})
+        await asyncio.sleep(0.05)
+        await aggregator.stop()
+        return sent
+    assert 0.5 in asyncio.run(run())